@@ -0,0 +1,115 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+from pydantic import BaseModel
+
+
+class BenchmarkScale(BaseModel):
+    # total number of environment files, including the ones below
+    environments: int
+    # length of depends_on chain: layers/layer{n} depends on layers/layer{n-1}
+    chain_depth: int
+    # number of environments "wide" depends on directly
+    fan_in: int
+    # number of se.call nodes in "calls" environment
+    call_nodes: int
+    # number of se.call nodes calling stub callable with the same arguments (coalesced into one call)
+    call_group_size: int = 10
+
+
+SCALES = {
+    "smoke": BenchmarkScale(environments=40, chain_depth=5, fan_in=5, call_nodes=20),
+    "default": BenchmarkScale(environments=2000, chain_depth=50, fan_in=200, call_nodes=300),
+    "large": BenchmarkScale(environments=10000, chain_depth=200, fan_in=1000, call_nodes=1000),
+}
+
+DEEP_ENV_NAME = "layers/layer{index}"
+WIDE_ENV_NAME = "wide"
+CALLS_ENV_NAME = "calls"
+ALL_ENV_NAME = "all"
+
+
+def _write_yaml(path: Path, content: Dict[str, Any]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(yaml.safe_dump(content, sort_keys=False))
+
+
+def _create_layer(index: int) -> Dict[str, Any]:
+    content = dict()
+    if index > 0:
+        content["depends_on"] = [f"/{DEEP_ENV_NAME.format(index=index - 1)}"]
+    # every layer overrides value of previous layer and adds its own
+    content["params"] = {"level": index, f"p{index}": f"layer-{index}"}
+    content["envs"] = {"LEVEL": "${params.level}", f"P{index}": f"${{params.p{index}}}"}
+    return content
+
+
+def _create_shared(index: int) -> Dict[str, Any]:
+    return {
+        "params": {"shared": index, f"s{index}": f"shared-{index}"},
+        "envs": {"SHARED": "${params.shared}", f"S{index}": f"${{params.s{index}}}"}
+    }
+
+
+def _create_calls(scale: BenchmarkScale, latency: float) -> Dict[str, Any]:
+    secrets = dict()
+    envs = dict()
+    for index in range(scale.call_nodes):
+        group = index // scale.call_group_size
+        group_names = [f"n{x}" for x in range(group * scale.call_group_size, min((group + 1) * scale.call_group_size, scale.call_nodes))]
+        secrets[f"n{index}"] = {
+            "value": "${se.call:benchmarks.stubs.get_stub_secrets}",
+            "selector": f"n{index}",
+            "kwargs": {"names": group_names, "latency": latency},
+            "cache": {
+                "local": {
+                    "name": f"bench-n{index}",
+                    "provider": "benchmarks.stubs.StubCache",
+                    "init_params": {"kwargs": {"store": "bench", "latency": latency}}
+                }
+            }
+        }
+        envs[f"N{index}"] = f"${{secrets.n{index}.value}}"
+    return {"secrets": secrets, "envs": envs}
+
+
+def _create_app(index: int, scale: BenchmarkScale) -> Dict[str, Any]:
+    return {
+        "depends_on": [
+            f"/{DEEP_ENV_NAME.format(index=index % scale.chain_depth)}",
+            f"/shared/shared{index % scale.fan_in}"
+        ],
+        "params": {"app": f"app-{index}"},
+        "envs": {"APP": "${params.app}"}
+    }
+
+
+def get_deep_env_name(scale: BenchmarkScale) -> str:
+    return DEEP_ENV_NAME.format(index=scale.chain_depth - 1)
+
+
+def generate_config_tree(config_dir: Path, scale: BenchmarkScale, latency: float = 0) -> List[str]:
+    # returns names of generated environments
+    names = []
+    def add(name: str, content: Dict[str, Any]):
+        _write_yaml(config_dir.joinpath(f"{name}.yaml"), content)
+        names.append(name)
+
+    for index in range(scale.chain_depth):
+        add(DEEP_ENV_NAME.format(index=index), _create_layer(index))
+    for index in range(scale.fan_in):
+        add(f"shared/shared{index}", _create_shared(index))
+    add(WIDE_ENV_NAME, {
+        "depends_on": [f"/shared/shared{index}" for index in range(scale.fan_in)],
+        "envs": {"WIDE": "true"}
+    })
+    add(CALLS_ENV_NAME, _create_calls(scale, latency))
+    add(ALL_ENV_NAME, {
+        "depends_on": [f"/{get_deep_env_name(scale)}", f"/{WIDE_ENV_NAME}", f"/{CALLS_ENV_NAME}"]
+    })
+    # remaining environments share layers and shared environments
+    app_count = max(scale.environments - len(names), 0)
+    for index in range(app_count):
+        add(f"apps/group{index // 100}/app{index}", _create_app(index, scale))
+    return names
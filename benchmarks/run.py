@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import typer
+
+from safe_env import __version__
+from safe_env.envmanager import EnvironmentManager
+
+from .generator import SCALES, BenchmarkScale, generate_config_tree, get_deep_env_name, WIDE_ENV_NAME, CALLS_ENV_NAME, ALL_ENV_NAME
+from .stubs import StubCache
+
+
+RESULTS_VERSION = 1
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def measure(name: str, func: Callable[[], Any], repeats: int, setup: Callable[[], Any] = None) -> Dict[str, Any]:
+    # setup is called before every repeat and is not included into measured time
+    durations = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        "name": name,
+        "repeats": repeats,
+        "min_ms": round(min(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "max_ms": round(max(durations), 3)
+    }
+
+
+def _create_envman(config_dir: Path, lazy: bool = True) -> EnvironmentManager:
+    envman = EnvironmentManager()
+    envman.load_from_folder(config_dir, lazy=lazy)
+    return envman
+
+
+def _run_cli(config_dir: Path, *args: str):
+    env = dict(os.environ)
+    # stub callables and cache providers are imported from benchmarks package
+    env["PYTHONPATH"] = os.pathsep.join([str(REPO_ROOT)] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    env["SAFE_ENV_CONFIG_DIR"] = str(config_dir)
+    env["SAFE_ENV_AGENT"] = "false"
+    subprocess.run([sys.executable, "-m", "safe_env", *args], env=env, check=True, capture_output=True)
+
+
+def run_benchmarks(config_dir: Path, scale: BenchmarkScale, repeats: int = 5, include_cli: bool = True) -> List[Dict[str, Any]]:
+    deep_env_name = get_deep_env_name(scale)
+    results = []
+
+    results.append(measure("discovery.scan", lambda: _create_envman(config_dir, lazy=False).list(), repeats))
+
+    for case_name, names in [("deep_chain", [deep_env_name]), ("fan_in", [WIDE_ENV_NAME]), ("all", [ALL_ENV_NAME])]:
+        results.append(measure(f"load.{case_name}.cold", lambda names=names: _create_envman(config_dir).load(names), repeats))
+        envman = _create_envman(config_dir)
+        envman.load(names)
+        # parsed documents are reused, only chain and merge are measured
+        results.append(measure(f"load.{case_name}.warm", lambda envman=envman, names=names: envman.load(names), repeats))
+
+    envman = _create_envman(config_dir)
+    results.append(measure("resolve.deep_chain", lambda: envman.resolve(envman.load([deep_env_name])), repeats))
+    for max_workers in [1, 8]:
+        results.append(measure(
+            f"resolve.calls.cold_cache.workers{max_workers}",
+            lambda max_workers=max_workers: envman.resolve(envman.load([CALLS_ENV_NAME]), max_workers=max_workers),
+            repeats,
+            setup=StubCache.clear
+        ))
+        results.append(measure(
+            f"resolve.calls.warm_cache.workers{max_workers}",
+            lambda max_workers=max_workers: envman.resolve(envman.load([CALLS_ENV_NAME]), max_workers=max_workers),
+            repeats
+        ))
+
+    resolved_config = envman.resolve(envman.load([ALL_ENV_NAME]))
+    results.append(measure("get_env_variables.all", lambda: envman.get_env_variables(resolved_config), repeats))
+
+    if include_cli:
+        # end to end, including interpreter startup and imports
+        cli_repeats = max(1, min(repeats, 3))
+        results.append(measure("cli.version", lambda: _run_cli(config_dir, "--version"), cli_repeats))
+        results.append(measure("cli.list", lambda: _run_cli(config_dir, "list"), cli_repeats))
+        results.append(measure("cli.activate.all", lambda: _run_cli(config_dir, "activate", ALL_ENV_NAME), cli_repeats))
+    return results
+
+
+def create_report(scale_name: str, scale: BenchmarkScale, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "version": RESULTS_VERSION,
+        "safe_env_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_on": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "scale_name": scale_name,
+        "scale": scale.model_dump(),
+        "results": results
+    }
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], max_slowdown: float) -> List[Dict[str, Any]]:
+    # returns benchmarks, whose median is slower than in baseline more than max_slowdown times
+    baseline_results = {x["name"]: x for x in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        baseline_result = baseline_results.get(result["name"])
+        if baseline_result is None or baseline_result["median_ms"] <= 0:
+            continue
+        slowdown = result["median_ms"] / baseline_result["median_ms"]
+        if slowdown > max_slowdown:
+            regressions.append({
+                "name": result["name"],
+                "median_ms": result["median_ms"],
+                "baseline_median_ms": baseline_result["median_ms"],
+                "slowdown": round(slowdown, 2)
+            })
+    return regressions
+
+
+app = typer.Typer()
+
+@app.command(help="Run benchmarks on generated config tree and write results as JSON.")
+def main(
+        scale_name: str = typer.Option("default", "--scale", help=f"Size of generated config tree (supported: {', '.join(SCALES)})."),
+        repeats: int = typer.Option(5, "--repeats", help="Number of measurements of each benchmark."),
+        latency: float = typer.Option(0, "--latency", help="Simulated latency (seconds) of stub callables and cache providers."),
+        no_cli: bool = typer.Option(False, "--no-cli", help="Do not measure CLI commands (started in subprocess)."),
+        output: Optional[Path] = typer.Option(None, "--output", "-o", help="File where results are written. Written to stdout if not set."),
+        baseline: Optional[Path] = typer.Option(None, "--baseline", help="Results of previous run to compare with."),
+        max_slowdown: float = typer.Option(1.5, "--max-slowdown", help="Fail, if median of any benchmark is slower than in baseline more than this ratio.")
+    ):
+    scale = SCALES.get(scale_name)
+    if scale is None:
+        raise typer.BadParameter(f"Scale not known: '{scale_name}'", param_hint="--scale")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_dir = Path(tmp_dir).joinpath("envs")
+        generate_config_tree(config_dir, scale, latency)
+        results = run_benchmarks(config_dir, scale, repeats, include_cli=not(no_cli))
+    report = create_report(scale_name, scale, results)
+
+    report_json = json.dumps(report, indent=2)
+    if output is None:
+        typer.echo(report_json)
+    else:
+        output.write_text(report_json)
+
+    if baseline is not None:
+        regressions = compare_reports(report, json.loads(baseline.read_text()), max_slowdown)
+        for regression in regressions:
+            typer.echo(f"Regression: {regression['name']} {regression['baseline_median_ms']} ms -> {regression['median_ms']} ms (x{regression['slowdown']})", err=True)
+        if regressions:
+            raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
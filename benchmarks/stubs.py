@@ -0,0 +1,55 @@
+import json
+import time
+import threading
+from typing import Any, Dict, List
+
+from safe_env.cache_providers import BaseCacheProvider
+
+
+def get_stub_secrets(names: List[str], latency: float = 0) -> Dict[str, Any]:
+    # local replacement of secret store callables (e.g. get_azure_key_vault_secrets)
+    if latency:
+        time.sleep(latency)
+    return {name: f"value-of-{name}" for name in names}
+
+
+class StubCache(BaseCacheProvider):
+    # in-memory cache provider, that supports batched lookups same as remote cache providers
+    _stores = dict()    # type: Dict[str, Dict[str, Any]]
+    _stores_lock = threading.Lock()
+
+    def __init__(self, store: str = "default", latency: float = 0):
+        super().__init__(as_json=True)
+        self.latency = latency
+        with __class__._stores_lock:
+            self.values = __class__._stores.setdefault(store, dict())
+
+    @staticmethod
+    def clear():
+        with __class__._stores_lock:
+            for values in __class__._stores.values():
+                values.clear()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _get(self, name: str) -> Any:
+        self._wait()
+        return self.values.get(name)
+
+    def _set(self, name: str, value: Any):
+        self._wait()
+        self.values[name] = value
+
+    def _delete(self, name: str):
+        self._wait()
+        self.values.pop(name, None)
+
+    def get_many(self, names: List[str], *args, **kwargs) -> Dict[str, Any]:
+        # one round trip for all names
+        self._wait()
+        values = {name: self.values.get(name) for name in names}
+        if self.store_as_json:
+            values = {k: (json.loads(v) if v is not None else None) for k, v in values.items()}
+        return values
@@ -1,6 +1,13 @@
 from .version import __version__
-from .api import activate
 
 __all__ = ["__version__", "activate"]
 
 __app_name__ = "Safe Environment Manager (safe-env)"
+
+
+def __getattr__(name: str):
+    # api is imported on first use, so "se --version" or agent client does not load config machinery
+    if name == "activate":
+        from .api import activate
+        return activate
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
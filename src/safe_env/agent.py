@@ -0,0 +1,321 @@
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import logging
+import tempfile
+import threading
+import subprocess
+import socketserver
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+AGENT_SOCKET_ENV_VAR = "SAFE_ENV_AGENT_SOCKET"
+AGENT_TIMEOUT_ENV_VAR = "SAFE_ENV_AGENT_TIMEOUT"
+AGENT_PROTOCOL_VERSION = 1
+# seconds client waits for agent response, before resolving environment locally
+AGENT_REQUEST_TIMEOUT = 30
+# seconds request waits for agent, while it resolves request of another client
+AGENT_BUSY_TIMEOUT = 1
+
+
+class LocalResolutionRequired(Exception):
+    # agent cannot process the request (e.g. user must sign in), client should resolve it locally
+    pass
+
+
+def is_agent_supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def get_default_socket_path() -> Path:
+    socket_path = os.environ.get(AGENT_SOCKET_ENV_VAR)
+    if socket_path:
+        return Path(socket_path)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir).joinpath("safe-env", "agent.sock")
+    return Path(tempfile.gettempdir()).joinpath(f"safe-env-{os.getuid()}", "agent.sock")
+
+
+def _ensure_private_dir(dir_path: Path):
+    # socket directory must be accessible only by current user
+    dir_path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    stat = os.stat(dir_path)
+    if stat.st_uid != os.getuid():
+        raise Exception(f"Agent socket directory '{dir_path}' is owned by another user.")
+    if stat.st_mode & 0o077:
+        os.chmod(dir_path, 0o700)
+
+
+def _get_peer_uid(connection: socket.socket) -> Optional[int]:
+    if not(hasattr(socket, "SO_PEERCRED")):
+        # peer credentials are not available (e.g. macOS) - access is restricted by socket directory permissions
+        return None
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid
+
+
+def get_request_timeout() -> float:
+    timeout = os.environ.get(AGENT_TIMEOUT_ENV_VAR)
+    if timeout:
+        return float(timeout)
+    return AGENT_REQUEST_TIMEOUT
+
+
+def _requires_local_resolution(ex: BaseException) -> bool:
+    # agent process has no terminal - prompts for user input fail with EOFError;
+    # resolver errors are wrapped by omegaconf, so the whole chain of causes is checked
+    from .resolvers.auth import InteractiveAuthRequired
+    while ex is not None:
+        if isinstance(ex, (EOFError, InteractiveAuthRequired, LocalResolutionRequired)):
+            return True
+        ex = ex.__cause__ or ex.__context__
+    return False
+
+
+def send_request(request: Dict[str, Any], socket_path: Path = None, timeout: float = None) -> Dict[str, Any]:
+    socket_path = get_default_socket_path() if socket_path is None else socket_path
+    request = dict(request, version=AGENT_PROTOCOL_VERSION)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(str(socket_path))
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with connection.makefile("rb") as f:
+            response_line = f.readline()
+    if not(response_line):
+        raise Exception("Agent closed connection without response.")
+    response = json.loads(response_line)
+    if not(response.get("ok")):
+        if response.get("local"):
+            raise LocalResolutionRequired(f"Agent cannot process request: {response.get('error')}")
+        raise Exception(f"Agent failed to process request: {response.get('error')}")
+    return response
+
+
+def try_send_request(request: Dict[str, Any], socket_path: Path = None, timeout: float = None) -> Optional[Dict[str, Any]]:
+    # returns None if agent is not running, does not respond in time or cannot process the request,
+    # so the request can be processed locally
+    if not(is_agent_supported()):
+        return None
+    socket_path = get_default_socket_path() if socket_path is None else socket_path
+    if not(socket_path.exists()):
+        return None
+    timeout = get_request_timeout() if timeout is None else timeout
+    try:
+        return send_request(request, socket_path, timeout)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # agent is not running, but socket file was not removed
+        return None
+    except socket.timeout:
+        logging.warning(f"Agent did not respond within {timeout} seconds, resolving locally.")
+        return None
+    except LocalResolutionRequired as ex:
+        logging.info(f"{ex} Resolving locally.")
+        return None
+
+
+def create_resolve_request(command: str,
+                           names: List[str],
+                           config_dir: Path,
+                           disable_plugins: bool = False,
+                           disable_unregistered_callables: bool = False,
+                           load_known_callables_from_modules: List[str] = None,
+                           config_cache_dir: Path = None,
+                           token_cache_provider: str = None,
+                           **kwargs) -> Dict[str, Any]:
+    # agent resolves configuration in the context of the client: working directory and environment variables
+    return {
+        "command": command,
+        "names": list(names),
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "settings": {
+            "config_dir": str(Path(config_dir).absolute()),
+            "disable_plugins": bool(disable_plugins),
+            "disable_unregistered_callables": bool(disable_unregistered_callables),
+            "load_known_callables_from_modules": list(load_known_callables_from_modules or []),
+            "config_cache_dir": None if config_cache_dir is None else str(Path(config_cache_dir).absolute()),
+            "token_cache_provider": token_cache_provider
+        },
+        "options": kwargs
+    }
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    def send_response(self, response: Dict[str, Any]):
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        self.wfile.flush()
+        self.response_sent = True
+
+    def handle(self):
+        agent = self.server.agent   # type: AgentServer
+        self.response_sent = False
+        try:
+            peer_uid = _get_peer_uid(self.connection)
+            if (peer_uid is not None) and (peer_uid != os.getuid()):
+                raise Exception("Access denied.")
+            request = json.loads(self.rfile.readline())
+            response = agent.handle_request(request, self.send_response)
+        except Exception as ex:
+            logging.exception("Cannot process agent request.")
+            response = {"ok": False, "error": str(ex), "local": _requires_local_resolution(ex)}
+        if not(self.response_sent):
+            self.send_response(response)
+
+
+class AgentSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class AgentServer():
+    # Long-running process, that keeps environment managers (parsed configs, plugins, access tokens)
+    # and in-memory caches warm, and resolves environments for clients over Unix domain socket.
+    def __init__(self, socket_path: Path = None):
+        self.socket_path = get_default_socket_path() if socket_path is None else socket_path
+        self.app_contexts = dict()
+        # requests are processed one by one, since they change working directory and environment variables of the process;
+        # clients, that would wait too long, resolve their requests locally
+        self.lock = threading.Lock()
+        self.busy_timeout = AGENT_BUSY_TIMEOUT
+        self.server = None  # type: AgentSocketServer
+        self.started_on = time.time()
+        self.processed_requests = 0
+
+    def _get_app_context(self, settings: Dict[str, Any]):
+        from .appcontext import AppContext
+        key = json.dumps(settings, sort_keys=True)
+        app_context = self.app_contexts.get(key)
+        if app_context is None:
+            app_context = AppContext(
+                config_dir=Path(settings["config_dir"]),
+                disable_plugins=settings["disable_plugins"],
+                disable_unregistered_callables=settings["disable_unregistered_callables"],
+                load_known_callables_from_modules=settings["load_known_callables_from_modules"],
+                config_cache_dir=None if settings["config_cache_dir"] is None else Path(settings["config_cache_dir"]),
+                token_cache_provider=settings["token_cache_provider"],
+                # agent has no terminal, user can sign in only when resolving locally
+                disable_interactive_auth=True
+            )
+            app_context.load()
+            self.app_contexts[key] = app_context
+        else:
+            # plugins of every config dir are loaded as separate module, edited plugins are loaded again
+            app_context.envman.reload_plugins_if_changed()
+        return app_context
+
+    def _resolve(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        app_context = self._get_app_context(request["settings"])
+        envman = app_context.envman
+        options = request.get("options", dict())
+        config = envman.load(request["names"])
+        config = envman.resolve(config,
+                                force_reload=options.get("force_reload", False),
+                                no_cache=options.get("no_cache", False),
+                                flush_caches=options.get("flush_caches", False),
+                                max_workers=options.get("max_workers", 1),
+                                incremental=options.get("incremental", False))
+        if request["command"] == "activate":
+            return {"ok": True, "envs": envman.get_env_variables(config)}
+        return {"ok": True, "yaml": envman.resolved_config_to_yaml(config)}
+
+    def _resolve_in_client_context(self, request: Dict[str, Any], send_response: Callable[[Dict[str, Any]], None]):
+        saved_cwd = os.getcwd()
+        saved_env = dict(os.environ)
+        try:
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            response = self._resolve(request)
+            # client does not wait for refreshes of stale cached values, but they still run with its working directory
+            # and environment variables (e.g. credentials), so the next request is processed once they are done
+            send_response(response)
+            self._wait_for_background_refreshes()
+        finally:
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+    def _wait_for_background_refreshes(self):
+        background_refresh_module = sys.modules.get("safe_env.resolvers.backgroundrefresh")
+        if background_refresh_module is not None:
+            background_refresh_module.wait_for_background_refreshes()
+
+    def handle_request(self, request: Dict[str, Any], send_response: Callable[[Dict[str, Any]], None] = None) -> Optional[Dict[str, Any]]:
+        # response of resolve requests is sent via send_response, before the request is finished
+        if request.get("version") != AGENT_PROTOCOL_VERSION:
+            raise Exception(f"Agent protocol version not supported: '{request.get('version')}'")
+        command = request.get("command")
+        if command == "status":
+            return {
+                "ok": True,
+                "pid": os.getpid(),
+                "started_on": self.started_on,
+                "processed_requests": self.processed_requests,
+                "config_dirs": sorted(set(x.config_dir.as_posix() for x in self.app_contexts.values()))
+            }
+        if command == "stop":
+            threading.Thread(target=self.server.shutdown).start()
+            return {"ok": True}
+        if command in ["activate", "resolve"]:
+            if not(self.lock.acquire(timeout=self.busy_timeout)):
+                raise LocalResolutionRequired("Agent is busy.")
+            try:
+                self.processed_requests += 1
+                responses = []
+                self._resolve_in_client_context(request, send_response or responses.append)
+                return None if send_response else responses[0]
+            finally:
+                self.lock.release()
+        raise Exception(f"Agent command not known: '{command}'")
+
+    def _remove_stale_socket(self):
+        if not(self.socket_path.exists()):
+            return
+        if try_send_request({"command": "status"}, self.socket_path) is not None:
+            raise Exception(f"Agent is already running: '{self.socket_path}'")
+        self.socket_path.unlink()
+
+    def serve(self):
+        if not(is_agent_supported()):
+            raise Exception("Agent is not supported on this platform.")
+        _ensure_private_dir(self.socket_path.parent)
+        self._remove_stale_socket()
+        self.server = AgentSocketServer(str(self.socket_path), AgentRequestHandler)
+        self.server.agent = self
+        try:
+            os.chmod(self.socket_path, 0o600)
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+
+def start_agent_process(socket_path: Path = None, timeout: float = 10) -> Dict[str, Any]:
+    # starts agent in background process and waits until it accepts requests
+    socket_path = get_default_socket_path() if socket_path is None else socket_path
+    status = try_send_request({"command": "status"}, socket_path)
+    if status is not None:
+        return status
+    env = dict(os.environ)
+    env[AGENT_SOCKET_ENV_VAR] = str(socket_path)
+    subprocess.Popen(
+        [sys.executable, "-m", "safe_env", "agent", "serve"],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = try_send_request({"command": "status"}, socket_path)
+        if status is not None:
+            return status
+        time.sleep(0.1)
+    raise Exception(f"Agent did not start within {timeout} seconds.")
@@ -1,7 +1,36 @@
 import os
 from pathlib import Path
-from typing import List, Union
+from typing import List, Union, Dict, Tuple
 from .appcontext import AppContext
+from .profiler import Profiler
+
+
+# app contexts kept between incremental activations in the same process (e.g. notebook kernel), by their settings
+INCREMENTAL_APP_CONTEXTS = dict()    # type: Dict[Tuple, AppContext]
+
+
+def _create_app_context(**kwargs) -> AppContext:
+    app_context = AppContext(**kwargs)
+    app_context.load()
+    return app_context
+
+
+def _get_incremental_app_context(**kwargs) -> AppContext:
+    config_dir = kwargs["config_dir"]
+    config_cache_dir = kwargs["config_cache_dir"]
+    key = (
+        str(Path(config_dir if config_dir else "envs").absolute()),
+        kwargs["disable_plugins"],
+        kwargs["disable_unregistered_callables"],
+        tuple(kwargs["load_known_callables_from_modules"] or []),
+        None if config_cache_dir is None else str(Path(config_cache_dir).absolute()),
+        kwargs["token_cache_provider"]
+    )
+    app_context = INCREMENTAL_APP_CONTEXTS.get(key)
+    if app_context is None:
+        app_context = _create_app_context(**kwargs)
+        INCREMENTAL_APP_CONTEXTS[key] = app_context
+    return app_context
 
 
 def activate(
@@ -13,28 +42,71 @@ def activate(
         load_known_callables_from_modules: List[str] = None,
         force_reload: bool = False,
         no_cache: bool = False,
-        flush_caches: bool = False
+        flush_caches: bool = False,
+        config_cache_dir: Union[str, Path] = None,
+        max_workers: int = 1,
+        token_cache_provider: str = None,
+        use_agent: bool = False,
+        profiler: Profiler = None,
+        incremental: bool = False
     ):
-    if isinstance(config_dir, str):
-        config_dir = Path(config_dir)
+    # spans of activation phases are recorded in profiler, if it is provided
+    if profiler is not None:
+        profiler.set_as_active_profiler()
+    try:
+        if isinstance(config_dir, str):
+            config_dir = Path(config_dir)
+
+        if isinstance(config_cache_dir, str):
+            config_cache_dir = Path(config_cache_dir)
     
-    if isinstance(names, str):
-        names = [x.strip() for x in names.split(" ")]
-        names = list([x for x in names if x])
-
-    app_context = AppContext(
-        config_dir=config_dir,
-        verbose=verbose,
-        disable_plugins=disable_plugins,
-        disable_unregistered_callables=disable_unregistered_callables,
-        load_known_callables_from_modules=load_known_callables_from_modules
-    )
-    app_context.load()
-    envman = app_context.envman
-    config = envman.load(names)
-    config = envman.resolve(config,
-                            force_reload=force_reload,
-                            no_cache=no_cache,
-                            flush_caches=flush_caches)
-    env_variables = envman.get_env_variables(config)
-    os.environ.update(env_variables)
+        if isinstance(names, str):
+            names = [x.strip() for x in names.split(" ")]
+            names = list([x for x in names if x])
+
+        if use_agent:
+            # resolve via background agent if it is running
+            from . import agent
+            response = agent.try_send_request(agent.create_resolve_request(
+                "activate",
+                names,
+                config_dir if config_dir else Path("envs"),
+                disable_plugins,
+                disable_unregistered_callables,
+                load_known_callables_from_modules,
+                config_cache_dir,
+                token_cache_provider,
+                force_reload=force_reload,
+                no_cache=no_cache,
+                flush_caches=flush_caches,
+                max_workers=max_workers,
+                incremental=incremental
+            ))
+            if response is not None:
+                os.environ.update(response["envs"])
+                return
+
+        # in incremental mode environment manager is kept, so only changed se.call nodes are resolved next time
+        get_app_context = _get_incremental_app_context if incremental else _create_app_context
+        app_context = get_app_context(
+            config_dir=config_dir,
+            verbose=verbose,
+            disable_plugins=disable_plugins,
+            disable_unregistered_callables=disable_unregistered_callables,
+            load_known_callables_from_modules=load_known_callables_from_modules,
+            config_cache_dir=config_cache_dir,
+            token_cache_provider=token_cache_provider
+        )
+        envman = app_context.envman
+        config = envman.load(names)
+        config = envman.resolve(config,
+                                force_reload=force_reload,
+                                no_cache=no_cache,
+                                flush_caches=flush_caches,
+                                max_workers=max_workers,
+                                incremental=incremental)
+        env_variables = envman.get_env_variables(config)
+        os.environ.update(env_variables)
+    finally:
+        if profiler is not None:
+            Profiler.reset_active_profiler()
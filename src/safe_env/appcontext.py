@@ -2,7 +2,7 @@ import sys
 import logging
 from pathlib import Path
 from typing import List
-from .envmanager import EnvironmentManager
+from . import profiler
 
 class AppContext():
     def __init__(self, 
@@ -10,7 +10,11 @@ class AppContext():
                  verbose: bool = False,
                  disable_plugins: bool = False,
                  disable_unregistered_callables: bool = False,
-                 load_known_callables_from_modules: List[str] = None):
+                 load_known_callables_from_modules: List[str] = None,
+                 config_cache_dir: Path = None,
+                 token_cache_provider: str = None,
+                 use_agent: bool = False,
+                 disable_interactive_auth: bool = False):
         if not(config_dir):
             config_dir = Path("envs")
             
@@ -20,7 +24,12 @@ class AppContext():
         self.disable_plugins = disable_plugins
         self.disable_unregistered_callables = disable_unregistered_callables
         self.load_known_callables_from_modules = load_known_callables_from_modules
+        self.config_cache_dir = config_cache_dir
+        self.token_cache_provider = token_cache_provider
+        self.use_agent = use_agent
+        self.disable_interactive_auth = disable_interactive_auth
         self.command_mode = False
+        self.detach_background_refreshes = False
         self.envman = None
 
 
@@ -34,8 +43,12 @@ class AppContext():
 
 
     def _load_env_man(self):
-        self.envman = EnvironmentManager(self.disable_plugins, self.disable_unregistered_callables, self.load_known_callables_from_modules)
-        self.envman.load_from_folder(self.config_dir)
+        with profiler.span("create environment manager", "startup"):
+            # imported here, since commands served by agent do not need it
+            from .envmanager import EnvironmentManager
+            self.envman = EnvironmentManager(self.disable_plugins, self.disable_unregistered_callables, self.load_known_callables_from_modules, self.config_cache_dir, self.token_cache_provider, self.disable_interactive_auth)
+        # environments are discovered on demand - full config directory scan is done only when listing all environments
+        self.envman.load_from_folder(self.config_dir, lazy=True)
         self.envman.load_plugins(self.plugins_dir)
 
 
@@ -1,11 +1,28 @@
+from importlib import import_module
 from .base_cache_provider import BaseCacheProvider
-from .memory_cache import MemoryCache
-from .keyring_cache import KeyringCache
-from .azure_keyvault_cache import AzureKeyVaultSecretCache
+
+# providers are imported on first access, since some of them depend on heavy SDKs
+_LAZY_PROVIDER_MODULES = {
+    "MemoryCache": ".memory_cache",
+    "KeyringCache": ".keyring_cache",
+    "AzureKeyVaultSecretCache": ".azure_keyvault_cache",
+    "EncryptedFileCache": ".encrypted_file_cache",
+    "SQLiteCache": ".sqlite_cache"
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_PROVIDER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    return getattr(import_module(module_name, __name__), name)
+
 
 __all__ = [
     "BaseCacheProvider",
     "MemoryCache",
     "KeyringCache",
-    "AzureKeyVaultSecretCache"
-]
\ No newline at end of file
+    "AzureKeyVaultSecretCache",
+    "EncryptedFileCache",
+    "SQLiteCache"
+]
@@ -1,14 +1,17 @@
 from azure.keyvault.secrets import SecretClient
-from typing import Any
+from typing import Any, Dict, List
 import logging
 from .base_cache_provider import BaseCacheProvider
+from .. import clientpool
+from .. import utils
 
 class AzureKeyVaultSecretCache(BaseCacheProvider):
-    def __init__(self, url: str = None, credential: Any = None, **kwargs):
+    def __init__(self, url: str = None, credential: Any = None, max_workers: int = 8, **kwargs):
         super().__init__(**kwargs)
         self.url = url
         self.credential = credential
-        self.client = SecretClient(vault_url=self.url, credential=self.credential)
+        self.max_workers = max_workers
+        self.client = clientpool.get_client(SecretClient, self.url, self.credential)
     
     def _get(self, name: str) -> str:
         value = None
@@ -30,3 +33,10 @@ class AzureKeyVaultSecretCache(BaseCacheProvider):
         logging.error("Deleting is not yet supported from Azure KeyVault.")
         # self.client.begin_delete_secret(name)
         # self.client.purge_deleted_secret(name)
+
+    def get_many(self, names: List[str], *args, **kwargs) -> Dict[str, Any]:
+        values = utils.map_concurrently(lambda name: self.get(name, *args, **kwargs), names, self.max_workers)
+        return dict(zip(names, values))
+
+    def set_many(self, values: Dict[str, Any], *args, **kwargs):
+        utils.map_concurrently(lambda item: self.set(item[0], item[1], *args, **kwargs), values.items(), self.max_workers)
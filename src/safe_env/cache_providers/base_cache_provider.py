@@ -1,9 +1,28 @@
 from abc import abstractmethod
-from typing import Any
+from typing import Any, Dict, List, Tuple, Optional, Union
+import os
 import json
+import time
+from pathlib import Path
+
+
+# marks cached values stored together with the time they were cached
+CACHE_ENTRY_MARKER = "__safe_env_cache_entry__"
+# beginning of cache entry serialized to string, for providers storing only strings
+CACHE_ENTRY_STRING_PREFIX = f'{{"{CACHE_ENTRY_MARKER}"'
+
+
+def get_default_cache_dir() -> Path:
+    # default directory for file based caches
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    base_dir = Path(cache_home) if cache_home else Path.home().joinpath(".cache")
+    return base_dir.joinpath("safe-env")
 
 
 class BaseCacheProvider():
+    # set by providers keeping values as objects (not serialized), even if as_json is False
+    stores_objects = False
+
     def __init__(self, as_json: bool = True):
         self.store_as_json = as_json
         
@@ -34,3 +53,41 @@ class BaseCacheProvider():
 
     def delete(self, name: str, *args, **kwargs):
         self._delete(name, *args, **kwargs)
+
+    # bulk operations, cache providers supporting batching or concurrent requests can override them
+    def get_many(self, names: List[str], *args, **kwargs) -> Dict[str, Any]:
+        return {name: self.get(name, *args, **kwargs) for name in names}
+
+    def set_many(self, values: Dict[str, Any], *args, **kwargs):
+        for name, value in values.items():
+            self.set(name, value, *args, **kwargs)
+
+    def delete_many(self, names: List[str], *args, **kwargs):
+        for name in names:
+            self.delete(name, *args, **kwargs)
+
+    def flush_writes(self):
+        # writes buffered changes, called once resolution is finished; providers buffering writes override it
+        pass
+
+    # cache entry envelope, used to store values of caches with expiration
+    @staticmethod
+    def wrap_value(value: Any, cached_on: float = None, as_string: bool = False) -> Union[Dict[str, Any], str]:
+        entry = {
+            CACHE_ENTRY_MARKER: 1,
+            "cached_on": time.time() if cached_on is None else cached_on,
+            "value": value
+        }
+        return json.dumps(entry) if as_string else entry
+
+    @staticmethod
+    def unwrap_value(stored_value: Any) -> Tuple[Any, Optional[float]]:
+        # returns value and time it was cached, values stored without envelope have no time
+        if isinstance(stored_value, str) and stored_value.startswith(CACHE_ENTRY_STRING_PREFIX):
+            try:
+                stored_value = json.loads(stored_value)
+            except ValueError:
+                return (stored_value, None)
+        if isinstance(stored_value, dict) and (stored_value.get(CACHE_ENTRY_MARKER) == 1):
+            return (stored_value.get("value"), stored_value.get("cached_on"))
+        return (stored_value, None)
@@ -0,0 +1,160 @@
+import os
+import json
+import atexit
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import keyring
+from keyring.errors import KeyringError
+from cryptography.fernet import Fernet, InvalidToken
+from .base_cache_provider import BaseCacheProvider, get_default_cache_dir
+
+
+FILE_CACHE_KEY_ENV_VAR = "SAFE_ENV_FILE_CACHE_KEY"
+FILE_CACHE_KEYRING_SERVICE_NAME = "safe-env"
+FILE_CACHE_KEYRING_KEY_NAME = "file-cache-key"
+FILE_CACHE_VERSION = 1
+
+
+def get_file_cache_key(key: str = None) -> bytes:
+    # encryption key is taken from parameter, environment variable or OS keyring (generated on first use)
+    if not(key):
+        key = os.environ.get(FILE_CACHE_KEY_ENV_VAR)
+    if not(key):
+        try:
+            key = keyring.get_password(FILE_CACHE_KEYRING_SERVICE_NAME, FILE_CACHE_KEYRING_KEY_NAME)
+            if key is None:
+                key = Fernet.generate_key().decode("utf-8")
+                keyring.set_password(FILE_CACHE_KEYRING_SERVICE_NAME, FILE_CACHE_KEYRING_KEY_NAME, key)
+        except KeyringError as ex:
+            raise Exception(f"Encryption key for file cache is not available. Set {FILE_CACHE_KEY_ENV_VAR} environment variable. {ex}") from ex
+    return key.encode("utf-8")
+
+
+class EncryptedFile():
+    # All values of the file cache. The file is read once per process and shared by all cache instances using it.
+    # Changes are kept in memory until flushed (once per resolution), then merged with the latest file content
+    # and written atomically, so concurrent processes do not corrupt it.
+    def __init__(self, path: Path, fernet: Fernet):
+        self.path = path
+        self.fernet = fernet
+        self.entries = None     # type: Dict[str, Any]
+        self.stamp = None       # type: Tuple[int, int]
+        # changes not written to the file yet (deleted names have None value)
+        self.pending = dict()   # type: Dict[str, Any]
+        self.lock = threading.Lock()
+
+    def _get_stamp(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read(self):
+        self.stamp = self._get_stamp()
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            self.entries = dict()
+            return
+        try:
+            content = json.loads(self.fernet.decrypt(data))
+        except (InvalidToken, ValueError) as ex:
+            # values cannot be loaded (e.g. encryption key was changed), so they are loaded from sources again
+            logging.warning(f"Cannot decrypt cache file '{self.path}', it is treated as empty. Encryption key is not valid or file is corrupted. {type(ex).__name__}")
+            self.entries = dict()
+            return
+        self.entries = content.get("entries", dict()) if content.get("version") == FILE_CACHE_VERSION else dict()
+
+    def _write(self):
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        content = {
+            "version": FILE_CACHE_VERSION,
+            "entries": self.entries
+        }
+        data = self.fernet.encrypt(json.dumps(content).encode("utf-8"))
+        # temporary file is created with 0600 permissions
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self.stamp = self._get_stamp()
+
+    def _apply(self, changes: Dict[str, Any]):
+        for name, value in changes.items():
+            if value is None:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = value
+
+    def get(self, name: str) -> Any:
+        with self.lock:
+            if self.entries is None:
+                self._read()
+            return self.entries.get(name)
+
+    def update(self, values: Dict[str, Any] = None, deleted_names: List[str] = None):
+        changes = dict(values or {})
+        changes.update({name: None for name in (deleted_names or [])})
+        with self.lock:
+            if self.entries is None:
+                self._read()
+            self._apply(changes)
+            self.pending.update(changes)
+
+    def flush_writes(self):
+        with self.lock:
+            if not(self.pending):
+                return
+            if self._get_stamp() != self.stamp:
+                # file was changed by another process
+                self._read()
+                self._apply(self.pending)
+            self._write()
+            self.pending = dict()
+
+
+class EncryptedFileCache(BaseCacheProvider):
+    _files = dict()     # type: Dict[Tuple[str, str], EncryptedFile]
+    _files_lock = threading.Lock()
+
+    def __init__(self, path: str = None, key: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path).expanduser() if path else get_default_cache_dir().joinpath("cache.bin")
+        file_key = (str(self.path.absolute()), key)
+        with __class__._files_lock:
+            encrypted_file = __class__._files.get(file_key)
+            if encrypted_file is None:
+                encrypted_file = EncryptedFile(self.path, Fernet(get_file_cache_key(key)))
+                # changes, which were not flushed by resolution (e.g. when the cache is used directly), are written on exit
+                atexit.register(encrypted_file.flush_writes)
+                __class__._files[file_key] = encrypted_file
+        self.file = encrypted_file
+
+    def _get(self, name: str) -> Any:
+        return self.file.get(name)
+
+    def _set(self, name: str, value: Any):
+        self.file.update(values={name: value})
+
+    def _delete(self, name: str):
+        self.file.update(deleted_names=[name])
+
+    def set_many(self, values: Dict[str, Any], *args, **kwargs):
+        # all values are written at once
+        if self.store_as_json:
+            values = {k: (json.dumps(v) if v is not None else None) for k, v in values.items()}
+        self.file.update(values=values)
+
+    def delete_many(self, names: List[str], *args, **kwargs):
+        self.file.update(deleted_names=names)
+
+    def flush_writes(self):
+        self.file.flush_writes()
@@ -1,12 +1,14 @@
-from typing import Any
+from typing import Any, Dict, List
 import keyring
 from .base_cache_provider import BaseCacheProvider
+from .. import utils
 
 class KeyringCache(BaseCacheProvider):
-    def __init__(self, keyring_type: str = None, service_name: str = None, **kwargs):
+    def __init__(self, keyring_type: str = None, service_name: str = None, max_workers: int = 4, **kwargs):
         super().__init__(**kwargs)
         self.keyring_type = keyring_type
         self.default_service_name = service_name
+        self.max_workers = max_workers
 
         # TODO: Currently is using default OS keyring.
         #       Implement custom keyrings with keyring.set_keyring() with correct keyring type.
@@ -26,3 +28,14 @@ class KeyringCache(BaseCacheProvider):
         if not(service_name):
             service_name = self.default_service_name
         keyring.delete_password(service_name, name)
+
+    def get_many(self, names: List[str], *args, **kwargs) -> Dict[str, Any]:
+        # OS keyring calls can be slow (e.g. via D-Bus), so they are sent concurrently
+        values = utils.map_concurrently(lambda name: self.get(name, *args, **kwargs), names, self.max_workers)
+        return dict(zip(names, values))
+
+    def set_many(self, values: Dict[str, Any], *args, **kwargs):
+        utils.map_concurrently(lambda item: self.set(item[0], item[1], *args, **kwargs), values.items(), self.max_workers)
+
+    def delete_many(self, names: List[str], *args, **kwargs):
+        utils.map_concurrently(lambda name: self.delete(name, *args, **kwargs), names, self.max_workers)
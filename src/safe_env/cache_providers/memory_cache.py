@@ -1,18 +1,121 @@
-from typing import Any
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
 from .base_cache_provider import BaseCacheProvider
 
-class MemoryCache(BaseCacheProvider):
-    _cache_dict = dict()
 
+def get_value_size(value: Any) -> int:
+    # approximate memory size of value, including nested containers
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(get_value_size(k) + get_value_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(get_value_size(x) for x in value)
+    return size
+
+
+class MemoryCacheNamespace():
+    # values of single namespace in least recently used order, shared by all MemoryCache instances using it
     def __init__(self):
+        self.entries = OrderedDict()    # type: OrderedDict[str, Tuple[Any, int, float]]
+        self.total_bytes = 0
+        # limits are kept with values, the strictest limits of all instances using the namespace apply
+        self.max_entries = None   # type: int
+        self.max_bytes = None     # type: int
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def apply_limits(self, max_entries: int = None, max_bytes: int = None):
+        if (max_entries is not None) and ((self.max_entries is None) or (max_entries < self.max_entries)):
+            self.max_entries = max_entries
+        if (max_bytes is not None) and ((self.max_bytes is None) or (max_bytes < self.max_bytes)):
+            self.max_bytes = max_bytes
+        self.evict()
+
+    def evict(self):
+        # remove least recently used values, until namespace fits into limits
+        while self.entries and (
+            ((self.max_entries is not None) and (len(self.entries) > self.max_entries))
+            or ((self.max_bytes is not None) and (self.total_bytes > self.max_bytes))
+        ):
+            oldest_name = next(iter(self.entries))
+            self.remove(oldest_name)
+            self.evictions += 1
+
+    def remove(self, name: str) -> bool:
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            return False
+        self.total_bytes -= entry[1]
+        return True
+
+
+class MemoryCache(BaseCacheProvider):
+    # values are kept for the lifetime of the process, so they are shared by all activations
+    _namespaces = dict()    # type: Dict[str, MemoryCacheNamespace]
+    _namespaces_lock = threading.Lock()
+    stores_objects = True
+
+    def __init__(self, namespace: str = None, max_entries: int = 1000, max_bytes: int = None, ttl: float = None):
         super().__init__(as_json=False)
-    
+        self.namespace_name = namespace or ""
+        self.ttl = ttl
+        with __class__._namespaces_lock:
+            self.namespace = __class__._namespaces.setdefault(self.namespace_name, MemoryCacheNamespace())
+        with self.namespace.lock:
+            self.namespace.apply_limits(max_entries, max_bytes)
+
     def _get(self, name: str):
-        return __class__._cache_dict.get(name)
+        namespace = self.namespace
+        with namespace.lock:
+            entry = namespace.entries.get(name)
+            if (entry is not None) and (entry[2] is not None) and (entry[2] <= time.time()):
+                # expired
+                namespace.remove(name)
+                entry = None
+            if entry is None:
+                namespace.misses += 1
+                return None
+            namespace.hits += 1
+            namespace.entries.move_to_end(name)
+            return entry[0]
 
     def _set(self, name: str, value: Any):
-        __class__._cache_dict[name] = value
-    
+        size = get_value_size(value)
+        expires_on = None if self.ttl is None else time.time() + self.ttl
+        namespace = self.namespace
+        with namespace.lock:
+            namespace.remove(name)
+            if (namespace.max_bytes is not None) and (size > namespace.max_bytes):
+                # value would evict everything else and still not fit
+                namespace.evictions += 1
+                return
+            namespace.entries[name] = (value, size, expires_on)
+            namespace.total_bytes += size
+            namespace.evict()
+
     def _delete(self, name: str):
-        pass
+        namespace = self.namespace
+        with namespace.lock:
+            namespace.remove(name)
+
+    def clear(self):
+        namespace = self.namespace
+        with namespace.lock:
+            namespace.entries.clear()
+            namespace.total_bytes = 0
 
+    def stats(self) -> Dict[str, int]:
+        namespace = self.namespace
+        with namespace.lock:
+            return {
+                "entries": len(namespace.entries),
+                "bytes": namespace.total_bytes,
+                "hits": namespace.hits,
+                "misses": namespace.misses,
+                "evictions": namespace.evictions
+            }
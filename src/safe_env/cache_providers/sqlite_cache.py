@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+from .base_cache_provider import BaseCacheProvider, get_default_cache_dir
+
+
+SQLITE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,
+    updated_on REAL NOT NULL,
+    expires_on REAL,
+    PRIMARY KEY (namespace, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_on ON cache_entries (expires_on);
+"""
+# max number of names in a single query
+SQLITE_BATCH_SIZE = 500
+
+
+class SQLiteCache(BaseCacheProvider):
+    # Keeps cached values in SQLite database in WAL mode, so many processes can read and write it concurrently.
+    # Values are encrypted with the same key as file.encrypted cache, unless encrypt is disabled explicitly
+    # (then they are protected only by file permissions).
+    _initialized_paths = set()
+    _initialized_paths_lock = threading.Lock()
+
+    def __init__(self,
+                 path: str = None,
+                 namespace: str = None,
+                 ttl: float = None,
+                 timeout: float = 30,
+                 encrypt: bool = True,
+                 key: str = None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path).expanduser() if path else get_default_cache_dir().joinpath("cache.db")
+        self.namespace = namespace or ""
+        self.ttl = ttl
+        self.timeout = timeout
+        self.fernet = None
+        if encrypt:
+            from cryptography.fernet import Fernet
+            from .encrypted_file_cache import get_file_cache_key
+            self.fernet = Fernet(get_file_cache_key(key))
+        # sqlite connections cannot be shared between threads
+        self.local = threading.local()
+        self._initialize()
+
+    def _initialize(self):
+        path_str = str(self.path.absolute())
+        with __class__._initialized_paths_lock:
+            if path_str in __class__._initialized_paths:
+                return
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            if not(self.path.exists()):
+                # create database file readable only by current user (WAL files get the same permissions)
+                os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+            connection = self._get_connection()
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.executescript(SQLITE_CACHE_SCHEMA)
+                connection.execute("DELETE FROM cache_entries WHERE expires_on <= ?", (time.time(),))
+            __class__._initialized_paths.add(path_str)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            self.local.connection = connection
+        return connection
+
+    def _encode(self, value: Any) -> Any:
+        if (value is not None) and (self.fernet is not None):
+            value = self.fernet.encrypt(value.encode("utf-8")).decode("utf-8")
+        return value
+
+    def _decode(self, name: str, value: Any) -> Any:
+        if (value is not None) and (self.fernet is not None):
+            from cryptography.fernet import InvalidToken
+            try:
+                value = self.fernet.decrypt(value.encode("utf-8")).decode("utf-8")
+            except InvalidToken:
+                # value cannot be decrypted (e.g. encryption key was changed or it was stored unencrypted),
+                # so it is loaded from sources again
+                logging.warning(f"Cannot decrypt value '{name}' in cache '{self.path}', it is treated as missing. Encryption key is not valid or value is not encrypted.")
+                value = None
+        return value
+
+    def _get_rows(self, names: List[str]) -> Dict[str, Any]:
+        connection = self._get_connection()
+        now = time.time()
+        values = dict()
+        for i in range(0, len(names), SQLITE_BATCH_SIZE):
+            batch = names[i:i + SQLITE_BATCH_SIZE]
+            rows = connection.execute(
+                "SELECT name, value FROM cache_entries "
+                f"WHERE namespace = ? AND name IN ({', '.join('?' * len(batch))}) AND (expires_on IS NULL OR expires_on > ?)",
+                [self.namespace] + batch + [now]
+            )
+            values.update((name, self._decode(name, value)) for name, value in rows)
+        return values
+
+    def _upsert_rows(self, values: Dict[str, Any]):
+        now = time.time()
+        expires_on = None if self.ttl is None else now + self.ttl
+        connection = self._get_connection()
+        with connection:
+            connection.executemany(
+                "INSERT INTO cache_entries (namespace, name, value, updated_on, expires_on) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, name) DO UPDATE SET "
+                "value = excluded.value, updated_on = excluded.updated_on, expires_on = excluded.expires_on",
+                [(self.namespace, name, self._encode(value), now, expires_on) for name, value in values.items()]
+            )
+
+    def _delete_rows(self, names: List[str]):
+        connection = self._get_connection()
+        with connection:
+            connection.executemany(
+                "DELETE FROM cache_entries WHERE namespace = ? AND name = ?",
+                [(self.namespace, name) for name in names]
+            )
+
+    def _get(self, name: str) -> Any:
+        return self._get_rows([name]).get(name)
+
+    def _set(self, name: str, value: Any):
+        self._upsert_rows({name: value})
+
+    def _delete(self, name: str):
+        self._delete_rows([name])
+
+    def get_many(self, names: List[str], *args, **kwargs) -> Dict[str, Any]:
+        values = self._get_rows(list(names))
+        if self.store_as_json:
+            values = {k: json.loads(v) for k, v in values.items() if v is not None}
+        return {name: values.get(name) for name in names}
+
+    def set_many(self, values: Dict[str, Any], *args, **kwargs):
+        if self.store_as_json:
+            values = {k: (json.dumps(v) if v is not None else None) for k, v in values.items()}
+        self._upsert_rows(values)
+
+    def delete_many(self, names: List[str], *args, **kwargs):
+        self._delete_rows(list(names))
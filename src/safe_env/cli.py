@@ -5,15 +5,15 @@ import shlex
 import runpy
 from typing import Optional, List, Annotated
 from pathlib import Path
-import fsspec
-from fsspec.utils import infer_storage_options
 import typer
 import json
 import glob
-from tqdm import tqdm
 
 from .appcontext import AppContext
 from . import utils
+from . import agent
+from . import profiler
+from .profiler import Profiler, PROFILE_FORMATS
 
 from . import __app_name__, __version__
 
@@ -24,8 +24,25 @@ def _version_callback(value: bool) -> None:
         typer.echo(f"{__app_name__} v{__version__}")
         raise typer.Exit()
 
+def _write_profile(active_profiler: Profiler, profile_format: str, profile_output: Optional[Path]):
+    Profiler.reset_active_profiler()
+    output = active_profiler.format(profile_format)
+    if profile_output is None:
+        # stdout can be used as command (e.g. output of activate), so profile is written to stderr
+        typer.echo(output, err=True)
+    else:
+        profile_output.write_text(output)
+
+def _finish_background_refreshes():
+    # stale cached values were already used, command exits and they are refreshed in detached process
+    # (resolvers are not imported, if the command did not resolve any environment)
+    background_refresh_module = sys.modules.get("safe_env.resolvers.backgroundrefresh")
+    if background_refresh_module is not None:
+        background_refresh_module.finish_background_refreshes()
+
 @app.callback()
 def main(
+    typer_ctx: typer.Context,
     verbose: bool = False,
     config_dir: Optional[Path] = typer.Option(
        "./envs",
@@ -52,6 +69,42 @@ def main(
         help="Comma separated list of module names, from which short names for callables should be loaded.",
         envvar="SAFE_ENV_REGISTER_MODULES"
     ),
+    config_cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--config-cache-dir",
+        help="Path to the directory where merged (not resolved) environment configurations are cached. Caching is disabled if not set.",
+        envvar="SAFE_ENV_CONFIG_CACHE_DIR"
+    ),
+    token_cache: Optional[str] = typer.Option(
+        None,
+        "--token-cache",
+        help="Persist access tokens of authentication providers between runs in specified cache (supported: keyring, file.encrypted, sqlite). Disabled if not set. Tokens are kept per credential configuration and detected account (tenant, client id, Azure CLI account); after switching accounts in other ways, tokens of the previous account are used until they expire.",
+        envvar="SAFE_ENV_TOKEN_CACHE"
+    ),
+    use_agent: Optional[bool] = typer.Option(
+        False,
+        "--agent/--no-agent",
+        help="Resolve environments via background agent, if it is running (see \"se agent --help\"). Environments requiring interactive sign in are resolved locally.",
+        envvar="SAFE_ENV_AGENT"
+    ),
+    profile: Optional[bool] = typer.Option(
+        False,
+        "--profile",
+        help="Record timings of discovery, plugins, merge, authentication, cache lookups and se.call nodes (values are never recorded).",
+        envvar="SAFE_ENV_PROFILE"
+    ),
+    profile_format: Optional[str] = typer.Option(
+        "table",
+        "--profile-format",
+        help=f"Profile output format (supported: {', '.join(PROFILE_FORMATS)}). Chrome format can be opened in chrome://tracing or Perfetto.",
+        envvar="SAFE_ENV_PROFILE_FORMAT"
+    ),
+    profile_output: Optional[Path] = typer.Option(
+        None,
+        "--profile-output",
+        help="File where profile is written. Written to stderr if not set.",
+        envvar="SAFE_ENV_PROFILE_OUTPUT"
+    ),
     version: Optional[bool] = typer.Option(
        None,
         "--version",
@@ -65,7 +118,18 @@ def main(
     if register_modules is not None:
         load_known_callables_from_modules += [x.strip() for x in register_modules.split(",")]
 
-    ctx = AppContext(config_dir, verbose, disable_plugins, disable_unregistered_callables, load_known_callables_from_modules)
+    if profile:
+        if profile_format not in PROFILE_FORMATS:
+            raise typer.BadParameter(f"Profile format not known: '{profile_format}'", param_hint="--profile-format")
+        active_profiler = Profiler()
+        active_profiler.set_as_active_profiler()
+        typer_ctx.call_on_close(lambda: _write_profile(active_profiler, profile_format, profile_output))
+    # called before profile is written, so it includes background refreshes awaited by the command
+    typer_ctx.call_on_close(_finish_background_refreshes)
+
+    ctx = AppContext(config_dir, verbose, disable_plugins, disable_unregistered_callables, load_known_callables_from_modules, config_cache_dir, token_cache, use_agent)
+    # CLI does not wait for refreshes of stale cached values, they run in detached process after command exits
+    ctx.detach_background_refreshes = True
     ctx.set_as_global_context()
     return
 
@@ -88,6 +152,9 @@ def _process_config(names: List[str], resolve: bool = False, get_envs: bool = Fa
     config = envman.load(names)
 
     if resolve:
+        if AppContext.GLOBAL_APP_CONTEXT.detach_background_refreshes:
+            from .resolvers.backgroundrefresh import BACKGROUND_REFRESHES
+            BACKGROUND_REFRESHES.detached = True
         config = envman.resolve(config, **kwargs)
 
         if get_envs:
@@ -95,6 +162,34 @@ def _process_config(names: List[str], resolve: bool = False, get_envs: bool = Fa
 
     return envman, config
 
+def _resolve_with_agent(command: str, names: List[str], **kwargs):
+    # returns None if agent is disabled or not running
+    ctx = AppContext.GLOBAL_APP_CONTEXT
+    if not(ctx.use_agent):
+        return None
+    request = agent.create_resolve_request(
+        command,
+        names,
+        ctx.config_dir,
+        ctx.disable_plugins,
+        ctx.disable_unregistered_callables,
+        ctx.load_known_callables_from_modules,
+        ctx.config_cache_dir,
+        ctx.token_cache_provider,
+        **kwargs
+    )
+    with profiler.span("agent request", "agent", command=command) as span:
+        response = agent.try_send_request(request)
+        span.set(served=response is not None)
+    return response
+
+def _get_env_variables(names: List[str], **kwargs):
+    response = _resolve_with_agent("activate", names, **kwargs)
+    if response is not None:
+        return response["envs"]
+    _, env_variables = _process_config(names, resolve=True, get_envs=True, **kwargs)
+    return env_variables
+
 @app.command("show", help="Show aggregated configuration YAML file for specified environments.")
 def show_env(names: Annotated[List[str], typer.Argument(envvar="SAFE_ENV_NAMES", help="Environment names.")]):
     envman, config = _process_config(names, resolve=False, get_envs=False)
@@ -114,38 +209,52 @@ def resolve_env(names: Annotated[List[str], typer.Argument(envvar="SAFE_ENV_NAME
                         "--no-cache",
                         "-n",
                         help="Do use caches to load/save values."
+                    ),
+                max_workers: Optional[int] = typer.Option(
+                        1,
+                        "--max-workers",
+                        "-w",
+                        help="Maximum number of se.call nodes resolved concurrently.",
+                        envvar="SAFE_ENV_MAX_WORKERS"
                     )
                 ):
+    response = _resolve_with_agent("resolve", names, force_reload=force_reload, no_cache=no_cache, max_workers=max_workers)
+    if response is not None:
+        typer.echo(response["yaml"])
+        return
     envman, config = _process_config(names,
                                      resolve=True,
                                      get_envs=False, force_reload=force_reload,
-                                     no_cache=no_cache)
+                                     no_cache=no_cache,
+                                     max_workers=max_workers)
     config_yaml = envman.resolved_config_to_yaml(config)
     typer.echo(config_yaml)
 
 @app.command("flush", help="Delete values stored in all caches for specified environments. Environments will need to be resolved during the process.")
 def flush_env(names: Annotated[List[str], typer.Argument(envvar="SAFE_ENV_NAMES", help="Environment names.")]):
-    envman, config = _process_config(names,
-                                     resolve=True,
-                                     get_envs=False,
-                                     flush_caches=True)
+    # caches of running agent (e.g. in-memory caches) are flushed as well
+    if _resolve_with_agent("resolve", names, flush_caches=True) is None:
+        _process_config(names,
+                        resolve=True,
+                        get_envs=False,
+                        flush_caches=True)
     typer.echo("Flushing caches completed.")
 
 
 def get_env_vars_script(names: List[str],
                         force_reload: bool=False,
                         no_cache: bool=False,
+                        max_workers: int=1,
                         is_bash: bool=False,
                         is_powershell: bool=False,
                         is_cmd: bool=False,
                         is_env: bool=False,
                         is_docker_env: bool=False,
                         is_unset: bool=False):
-    _, env_variables = _process_config(names,
-                                       resolve=True,
-                                       get_envs=True,
+    env_variables = _get_env_variables(names,
                                        force_reload=force_reload,
-                                       no_cache=no_cache)
+                                       no_cache=no_cache,
+                                       max_workers=max_workers)
     if is_bash:
         script = utils.print_env_export_script_bash(env_variables, unset=is_unset)
     elif is_powershell:
@@ -174,6 +283,13 @@ def load_env(names: Annotated[List[str], typer.Argument(envvar="SAFE_ENV_NAMES",
         "-n",
         help="Do not use caches to load/save values."
     ),
+    max_workers: Optional[int] = typer.Option(
+       1,
+        "--max-workers",
+        "-w",
+        help="Maximum number of se.call nodes resolved concurrently.",
+        envvar="SAFE_ENV_MAX_WORKERS"
+    ),
     is_bash: Optional[bool] = typer.Option(
         None,
             "--bash",
@@ -213,6 +329,7 @@ def load_env(names: Annotated[List[str], typer.Argument(envvar="SAFE_ENV_NAMES",
     script = get_env_vars_script(names,
                                 force_reload,
                                 no_cache,
+                                max_workers,
                                 is_bash,
                                 is_powershell,
                                 is_cmd,
@@ -255,13 +372,21 @@ def run_in_env(names: Annotated[List[str], typer.Argument(envvar="SAFE_ENV_NAMES
             "--no-cache",
             "-n",
             help="Do not use caches to load/save values."
+        ),
+        max_workers: Optional[int] = typer.Option(
+            1,
+            "--max-workers",
+            "-w",
+            help="Maximum number of se.call nodes resolved concurrently.",
+            envvar="SAFE_ENV_MAX_WORKERS"
         )
     ):
-    _, env_variables = _process_config(names,
-                                       resolve=True,
-                                       get_envs=True,
+    # refreshes of stale cached values run while the command is running
+    AppContext.GLOBAL_APP_CONTEXT.detach_background_refreshes = False
+    env_variables = _get_env_variables(names,
                                        force_reload=force_reload,
-                                       no_cache=no_cache)
+                                       no_cache=no_cache,
+                                       max_workers=max_workers)
 
     cmd_args = shlex.split(cmd)
     if no_host_env_variables:
@@ -326,6 +451,11 @@ def push_envs(names: Annotated[Optional[List[str]], typer.Argument()] = None,
         config_dir = AppContext.GLOBAL_APP_CONTEXT.config_dir
         plugins_dir = AppContext.GLOBAL_APP_CONTEXT.plugins_dir
 
+        # remote storage libraries are imported only by push/pull, to keep startup of other commands fast
+        import fsspec
+        from fsspec.utils import infer_storage_options
+        from tqdm import tqdm
+
         storage_options = infer_storage_options(url)
 
         source_path = config_dir
@@ -377,6 +507,9 @@ def pull_envs(
         )
     ):
 
+    import fsspec
+    from fsspec.utils import infer_storage_options
+
     storage_options = infer_storage_options(url)
     remote_path = storage_options.get("host", "") + storage_options.get("path")
     local_path = AppContext.GLOBAL_APP_CONTEXT.config_dir
@@ -390,5 +523,34 @@ def pull_envs(
     fs = fsspec.filesystem(**storage_options)
     fs.get(remote_path, local_path, recursive=True, overwrite=overwrite)
 
+agent_app = typer.Typer(help="Manage background agent, that keeps environments, credentials and in-memory caches warm and resolves environments for other commands.")
+app.add_typer(agent_app, name="agent")
+
+@agent_app.command("start", help="Start agent in background.")
+def start_agent():
+    status = agent.start_agent_process()
+    typer.echo(f"Agent is running (pid: {status['pid']}, socket: {agent.get_default_socket_path()}).")
+
+@agent_app.command("serve", help="Run agent in foreground.")
+def serve_agent():
+    agent.AgentServer().serve()
+
+@agent_app.command("stop", help="Stop agent.")
+def stop_agent():
+    if agent.try_send_request({"command": "stop"}) is None:
+        typer.echo("Agent is not running.")
+    else:
+        typer.echo("Agent stopped.")
+
+@agent_app.command("status", help="Show agent status.")
+def agent_status():
+    status = agent.try_send_request({"command": "status"})
+    if status is None:
+        typer.echo("Agent is not running.")
+        return
+    typer.echo(f"Agent is running (pid: {status['pid']}, socket: {agent.get_default_socket_path()}, processed requests: {status['processed_requests']}).")
+    for config_dir in status["config_dirs"]:
+        typer.echo(f"  {config_dir}")
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,84 @@
+import logging
+import threading
+import contextvars
+from typing import Any, Dict, Tuple, Type
+
+
+class ClientPool():
+    # Shares SDK clients and HTTP sessions between all resolver calls and cache providers in one resolution,
+    # so connections are reused instead of creating new HTTP pipeline for every call.
+    def __init__(self):
+        self.clients = dict()     # type: Dict[Tuple[Type, str, int], Tuple[Any, Any]]
+        self.http_session = None  # type: requests.Session
+        self.lock = threading.Lock()
+
+    def _get_credential_identity(self, credential: Any) -> Any:
+        # credentials wrapped with token cache are identified by their configuration
+        credential_key = getattr(credential, "credential_key", None)
+        if credential_key is not None:
+            return credential_key
+        return id(credential)
+
+    def get_client(self, client_class: Type, url: str, credential: Any) -> Any:
+        key = (client_class, url, self._get_credential_identity(credential))
+        with self.lock:
+            entry = self.clients.get(key)
+            if entry is None:
+                client = client_class(vault_url=url, credential=credential)
+                # keep reference to credential, so its id is not reused by another object while client is in the pool
+                entry = (credential, client)
+                self.clients[key] = entry
+        return entry[1]
+
+    def get_http_session(self) -> Any:
+        with self.lock:
+            if self.http_session is None:
+                import requests
+                self.http_session = requests.Session()
+        return self.http_session
+
+    def close(self):
+        with self.lock:
+            for _, client in self.clients.values():
+                try:
+                    client.close()
+                except Exception as ex:
+                    logging.info(f"Cannot close client: {ex}")
+            self.clients = dict()
+            if self.http_session is not None:
+                self.http_session.close()
+                self.http_session = None
+
+    # active pool is contextual, so concurrent resolutions (threads, tasks) do not use or close pools of each other
+    # (executors run tasks in copy of the context they are submitted from)
+    ACTIVE_CLIENT_POOL = contextvars.ContextVar("safe_env_active_client_pool", default=None) # type: contextvars.ContextVar
+    def set_as_active_pool(self) -> contextvars.Token:
+        return ClientPool.ACTIVE_CLIENT_POOL.set(self)
+
+    @staticmethod
+    def get_active_pool() -> "ClientPool":
+        return ClientPool.ACTIVE_CLIENT_POOL.get()
+
+    @staticmethod
+    def reset_active_pool(token: contextvars.Token = None):
+        # restores pool, which was active before set_as_active_pool returned the token
+        if token is None:
+            ClientPool.ACTIVE_CLIENT_POOL.set(None)
+        else:
+            ClientPool.ACTIVE_CLIENT_POOL.reset(token)
+
+
+def get_client(client_class: Type, url: str, credential: Any) -> Any:
+    pool = ClientPool.get_active_pool()
+    if pool is None:
+        return client_class(vault_url=url, credential=credential)
+    return pool.get_client(client_class, url, credential)
+
+
+def get_http_session() -> Any:
+    pool = ClientPool.get_active_pool()
+    if pool is None:
+        # requests module has the same request() method as a session
+        import requests
+        return requests
+    return pool.get_http_session()
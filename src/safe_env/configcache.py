@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, List, Dict, Union, Optional
+from omegaconf import OmegaConf, ListConfig, DictConfig
+
+
+class ConfigCache():
+    # Stores merged, but NOT resolved environment configurations on disk.
+    # Cache entry is valid only while content of every environment file in the chain and every plugin file is unchanged.
+    version = 1
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def _get_entry_path(self, config_dir: Path, names: List[str]) -> Path:
+        key = json.dumps([str(Path(config_dir).absolute()), names])
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.cache_dir.joinpath(f"{key_hash}.json")
+
+    def _hash_file(self, file_path: Union[str, Path]) -> Optional[str]:
+        try:
+            with open(file_path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    def _hash_files(self, file_paths: List[Union[str, Path]]) -> Dict[str, str]:
+        return {str(x): self._hash_file(x) for x in file_paths}
+
+    def _is_valid(self, file_hashes: Dict[str, str]) -> bool:
+        for file_path, file_hash in file_hashes.items():
+            if self._hash_file(file_path) != file_hash:
+                return False
+        return True
+
+    def _has_only_string_keys(self, value: Any) -> bool:
+        # JSON converts other keys (e.g. int keys of YAML mappings) to strings, so such config would change after loading
+        if isinstance(value, dict):
+            return all(isinstance(k, str) and self._has_only_string_keys(v) for k, v in value.items())
+        if isinstance(value, list):
+            return all(self._has_only_string_keys(x) for x in value)
+        return True
+
+    def get(self,
+            config_dir: Path,
+            names: List[str],
+            plugin_files: List[Union[str, Path]]) -> Union[None, ListConfig, DictConfig]:
+        entry_path = self._get_entry_path(config_dir, names)
+        try:
+            with open(entry_path, 'r', encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != self.version:
+            return None
+
+        # plugin files could be added or removed, so compare the list of files first
+        if sorted(entry["plugins"].keys()) != sorted(str(x) for x in plugin_files):
+            return None
+
+        if not(self._is_valid(entry["files"])) or not(self._is_valid(entry["plugins"])):
+            return None
+
+        logging.info(f"Loaded merged configuration from cache: {entry_path}")
+        return OmegaConf.create(entry["config"], flags={"allow_objects": True})
+
+    def set(self,
+            config_dir: Path,
+            names: List[str],
+            env_files: List[Union[str, Path]],
+            plugin_files: List[Union[str, Path]],
+            config: Union[ListConfig, DictConfig]):
+        entry = {
+            "version": self.version,
+            "names": names,
+            "files": self._hash_files(env_files),
+            "plugins": self._hash_files(plugin_files),
+            # interpolations are not resolved, so no secrets are stored in the cache
+            "config": OmegaConf.to_container(config, resolve=False)
+        }
+        if not(self._has_only_string_keys(entry["config"])):
+            logging.info("Merged configuration cannot be cached: it contains non-string keys")
+            return
+        try:
+            entry_json = json.dumps(entry)
+        except (TypeError, ValueError) as ex:
+            logging.info(f"Merged configuration cannot be cached: {ex}")
+            return
+
+        self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        entry_path = self._get_entry_path(config_dir, names)
+        # write to temporary file first and replace, so concurrent readers never see partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding="utf-8") as f:
+                f.write(entry_json)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
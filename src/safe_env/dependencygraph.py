@@ -0,0 +1,65 @@
+import threading
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+
+class DependencyGraph():
+    # Dependencies of environments (adjacency lists) and computed dependency chains, kept for one config dir.
+    # Entries are invalidated when modification time or size of any environment file they were computed from changes.
+    def __init__(self,
+                 get_stamp: Callable[[str], Any],
+                 load_dependencies: Callable[[str], List[str]]):
+        # get_stamp returns stamp of environment file (raises, if environment does not exist)
+        # load_dependencies returns names of environments, that environment depends on (in depends_on order)
+        self.get_stamp = get_stamp
+        self.load_dependencies = load_dependencies
+        self.dependencies = dict()  # type: Dict[str, Tuple[Any, List[str]]]
+        self.chains = dict()        # type: Dict[Tuple[Tuple[str, ...], bool], Tuple[List[str], Dict[str, Any]]]
+        self.lock = threading.Lock()
+
+    def get_dependencies(self, name: str) -> List[str]:
+        stamp = self.get_stamp(name)
+        entry = self.dependencies.get(name)
+        if (entry is None) or (entry[0] != stamp):
+            entry = (stamp, self.load_dependencies(name))
+            self.dependencies[name] = entry
+        return entry[1]
+
+    def walk(self, names: List[str], current_chain: List[str] = None, skip_dependency_loops: bool = False) -> List[str]:
+        # Depth-first walk, starting with the last name and the last dependency (top layer).
+        # Every environment is added before its dependencies, so the reversed result is the order in which they are applied.
+        # Reaching an environment that is already in the chain is reported as potential loop, unless loops are skipped.
+        chain = [] if current_chain is None else current_chain
+        visited = set(chain)    # type: Set[str]
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in visited:
+                if skip_dependency_loops:
+                    continue
+                raise Exception(f"Potential dependency loop detected. Environment name is already in dependency chain: '{name}'.")
+            visited.add(name)
+            chain.append(name)
+            # dependencies are pushed in depends_on order, so the last one is walked first
+            stack.extend(self.get_dependencies(name))
+        return chain
+
+    def _is_chain_valid(self, stamps: Dict[str, Any]) -> bool:
+        try:
+            return all(self.get_stamp(name) == stamp for name, stamp in stamps.items())
+        except Exception:
+            # environment file was removed or cannot be accessed - chain is computed again and reports the error
+            return False
+
+    def get_chain(self, names: List[str], skip_dependency_loops: bool = False) -> List[str]:
+        key = (tuple(names), skip_dependency_loops)
+        with self.lock:
+            entry = self.chains.get(key)
+        if (entry is not None) and self._is_chain_valid(entry[1]):
+            return list(entry[0])
+
+        chain = list(reversed(self.walk(names, skip_dependency_loops=skip_dependency_loops)))
+        # stamps were checked while walking the graph, so cached dependencies have the current ones
+        stamps = {name: self.dependencies[name][0] for name in chain}
+        with self.lock:
+            self.chains[key] = (chain, stamps)
+        return list(chain)
@@ -1,11 +1,15 @@
 import os
+import time
+import re
 from pathlib import Path
 import logging
 import yaml
-from typing import Type, List, Dict, Union
+from typing import Type, List, Dict, Union, Any, Optional, Tuple
 from pydantic import BaseModel, TypeAdapter
 
-from importlib.machinery import SourceFileLoader
+import sys
+import hashlib
+import importlib.util
 from omegaconf import OmegaConf, ListConfig, DictConfig
 
 from .models import (
@@ -16,36 +20,133 @@ from .models import (
 
 from . import utils
 from . import resolvers
+from . import profiler
+from .configcache import ConfigCache
+from .dependencygraph import DependencyGraph
+from .resolvers.tokencache import TokenCache, create_persistent_token_store
+from .resolvers.callgraph import CallGraph
+from .resolvers.canonical import get_canonical_hash
+
+
+# names of environment variables read by oc.env resolver
+ENV_RESOLVER_REGEX = re.compile(r"\$\{\s*oc\.env\s*:\s*([^,}\s]+)")
+
+
+def get_plugins_module_name(plugins_dir: Path) -> str:
+    # every plugins folder is loaded as separate module, so processes working with many config dirs (agent, API) do not mix them
+    # configurations still refer to plugins with "_plugins_" prefix
+    path_hash = hashlib.sha256(str(plugins_dir.absolute()).encode("utf-8")).hexdigest()[:16]
+    return f"_plugins_{path_hash}"
+
+
+def load_plugins_module(plugins_dir: Path, module_name: str):
+    # module previously loaded from the folder (and its submodules) is replaced, so changed plugin files are loaded again
+    for name in [x for x in sys.modules if (x == module_name) or x.startswith(f"{module_name}.")]:
+        del sys.modules[name]
+    spec = importlib.util.spec_from_file_location(
+        module_name,
+        plugins_dir.joinpath("__init__.py"),
+        submodule_search_locations=[str(plugins_dir)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    # plugins are loaded as a package, so they can use relative imports
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[module_name]
+        raise
+    return module
 
 
 class EnvironmentManager():
     def __init__(self,
                  disable_plugins: bool = False,
                  disable_unregistered_callables: bool = False,
-                 load_known_callables_from_modules: List[str] = None):
+                 load_known_callables_from_modules: List[str] = None,
+                 config_cache_dir: Path = None,
+                 token_cache_provider: str = None,
+                 disable_interactive_auth: bool = False):
         self.plugins_module_name = "_plugins_"
         self.resolver_manager = None
         self.disable_plugins = disable_plugins
         self.disable_unregistered_callables = disable_unregistered_callables
         self.load_known_callables_from_modules = load_known_callables_from_modules
+        self.disable_interactive_auth = disable_interactive_auth
+        self.config_cache = None if config_cache_dir is None else ConfigCache(config_cache_dir)
+        # access tokens are shared between resolutions, and with other processes if persistent token cache is configured
+        self.token_cache = TokenCache(persistent_store=create_persistent_token_store(token_cache_provider))
         self.reload()
 
     def reload(self):
         self.env_info_list = []
+        # indexes for fast lookups of environments by name and by path
+        self.env_info_by_name = dict()
+        self.env_info_by_path = dict()
+        self.config_dir = None
+        self.lazy_discovery = False
+        self.plugins_dir = None
+        # parsed yaml documents by file path, invalidated when file modification time or size changes
+        self.parsed_documents = dict()
         self.plugins_module = None
+        # modification times and sizes of plugin files, when plugins were loaded
+        self.plugins_stamp = None
         self.resolver_manager = None
+        self.dependency_graph = DependencyGraph(self._get_env_file_stamp, self._get_env_dependencies)
+        # results of se.call nodes from previous incremental resolution, with signatures of their inputs
+        # and time after which they expire (if the node is cached with ttl)
+        self.previous_call_results = dict()    # type: Dict[str, Tuple[str, Tuple[bool, Any], Optional[float]]]
 
-    def load_from_folder(self, config_dir: Path):
+    def load_from_folder(self, config_dir: Path, lazy: bool = False):
         if not(config_dir.exists()):
             raise Exception(f"Config directory '{config_dir}' cannot be found.")
         
-        for f in config_dir.glob("**/*.yaml"):
-            self.add(f, config_dir)
+        self.config_dir = config_dir
+        self.lazy_discovery = lazy
+        # dependency graph is built once per config dir
+        self.dependency_graph = DependencyGraph(self._get_env_file_stamp, self._get_env_dependencies)
+        self.previous_call_results = dict()
+        if not(lazy):
+            self._scan_folder()
+
+    def _scan_folder(self):
+        env_info_list = []
+        with profiler.span("scan config dir", "discovery") as span:
+            for f in self.config_dir.glob("**/*.yaml"):
+                # reuse environments that were already discovered on demand
+                env_info = self.env_info_by_path.get(str(f))
+                if env_info is None:
+                    env_info = self._create_env_info(f, self.config_dir)
+                    self._add_to_indexes(env_info)
+                env_info_list.append(env_info)
+            span.set(environments=len(env_info_list))
+        self.env_info_list = env_info_list
+        self.lazy_discovery = False
+
+    def _discover(self, name: str) -> Union[None, EnvironmentInfo]:
+        # map environment name directly to configuration file path, without scanning the whole config directory
+        if not(name) or os.path.isabs(name):
+            return None
+        normalized_name = self._normalize_env_or_dependency_name(os.path.normpath(name))
+        if (normalized_name != name) or (normalized_name.split("/")[0] == ".."):
+            return None
+        path = self.config_dir.joinpath(self.get_filename_from_env_name(name))
+        if not(path.is_file()):
+            return None
+        # on case-insensitive file systems make sure that file name matches exactly, same as with folder scan
+        if path.name not in os.listdir(path.parent):
+            return None
+        return self.add(path, self.config_dir)
 
     def load_plugins(self, plugins_dir: Path):
+        self.plugins_dir = plugins_dir
         if self.disable_plugins:
             logging.info("Plugins are disabled. Skip loading plugins.")
             return
+        self.plugins_stamp = self._get_plugins_stamp()
+        # callables from plugins could have changed
+        self.plugins_module = None
+        self.previous_call_results = dict()
 
         if not(plugins_dir.exists()):
             logging.info("Plugins folder does not exist. Skip loading plugins.")
@@ -56,10 +157,22 @@ class EnvironmentManager():
             logging.error(f"Cannot load plugins, since there is no __init__.py file in plugins folder: {init_file_path}")
             return
         
-        plugins_module = SourceFileLoader(self.plugins_module_name, str(init_file_path)).load_module()
+        with profiler.span("load plugins", "plugins", path=str(plugins_dir)):
+            plugins_module = load_plugins_module(plugins_dir, get_plugins_module_name(plugins_dir))
         self.plugins_module = plugins_module
 
-    def load_resolvers(self, force_reload: bool=False, no_cache: bool=False, flush_caches: bool=False):
+    def _get_plugins_stamp(self) -> List[Tuple[str, Any]]:
+        return [(str(path), self._get_file_stamp(path)) for path in self._get_plugin_files()]
+
+    def reload_plugins_if_changed(self) -> bool:
+        # used by long-running processes (agent, incremental activation), so edited plugins are picked up without restart
+        if (self.plugins_dir is None) or self.disable_plugins or (self._get_plugins_stamp() == self.plugins_stamp):
+            return False
+        logging.info("Plugin files have changed. Reloading plugins.")
+        self.load_plugins(self.plugins_dir)
+        return True
+
+    def load_resolvers(self, force_reload: bool=False, no_cache: bool=False, flush_caches: bool=False, max_workers: int=1):
         self.resolver_manager = resolvers.ResolverManager(
             self.plugins_module_name,
             self.plugins_module,
@@ -67,15 +180,19 @@ class EnvironmentManager():
             no_cache,
             flush_caches,
             self.disable_unregistered_callables,
-            self.load_known_callables_from_modules
+            self.load_known_callables_from_modules,
+            max_workers,
+            self.token_cache,
+            self.disable_interactive_auth
         )
-        self.resolver_manager.register_resolvers()
+        with profiler.span("register resolvers", "resolve"):
+            self.resolver_manager.register_resolvers()
 
     def _normalize_env_or_dependency_name(self, name: str):
         # ensure that env and dependency names have consistent "/" on windows and linux
         return name.replace("\\", "/")
 
-    def add(self, path: Path, config_dir: Path):
+    def _create_env_info(self, path: Path, config_dir: Path) -> EnvironmentInfo:
         env_file_name = os.path.relpath(path, config_dir)
         env_name = os.path.splitext(env_file_name)[0]
         env_name = self._normalize_env_or_dependency_name(env_name)
@@ -84,26 +201,57 @@ class EnvironmentManager():
             path=path,
             name = env_name
         )
+        return env
+
+    def _add_to_indexes(self, env: EnvironmentInfo):
+        # keep the first environment registered with the same name, same as with a linear scan
+        self.env_info_by_name.setdefault(env.name, env)
+        self.env_info_by_path.setdefault(str(env.path), env)
+
+    def add(self, path: Path, config_dir: Path) -> EnvironmentInfo:
+        env = self._create_env_info(path, config_dir)
         self.env_info_list.append(env)
+        self._add_to_indexes(env)
+        return env
 
 
     def list(self):
+        if self.lazy_discovery:
+            self._scan_folder()
         return self.env_info_list
 
 
     def get(self, name: str) -> EnvironmentInfo:
-        env_info = next((x for x in self.env_info_list if x.name == name), None)
+        env_info = self.env_info_by_name.get(name)
+        if not(env_info) and self.lazy_discovery:
+            with profiler.span("discover environment", "discovery", environment=name) as span:
+                env_info = self._discover(name)
+                span.set(found=env_info is not None)
         if not(env_info):
             raise Exception(f"Environment '{name}' cannot be found.")
         return env_info
 
 
+    def get_by_path(self, path: Union[str, Path]) -> EnvironmentInfo:
+        env_info = self.env_info_by_path.get(str(path))
+        if not(env_info) and self.lazy_discovery:
+            self._scan_folder()
+            env_info = self.env_info_by_path.get(str(path))
+        if not(env_info):
+            raise Exception(f"Environment with path '{path}' cannot be found.")
+        return env_info
+
+
     def _load_env_yaml(self, name: str, target_type: Type[BaseModel]):
         env_info = self.get(name)
         return self._load_yaml(env_info.path, target_type)
 
 
-    def _load_yaml(self, file_path: str, target_type: Type[BaseModel]):
+    def _get_file_stamp(self, file_path: str):
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _parse_yaml(self, file_path: str):
         conf = None
         parsed_yaml = None
         try:
@@ -122,27 +270,138 @@ class EnvironmentManager():
         if parsed_yaml:
             # TODO check how to handle OmegaConf exceptions
             conf = OmegaConf.create(parsed_yaml, flags={"allow_objects": True})
+        return conf
+
+    def _get_parsed_document(self, file_path: str) -> Dict:
+        key = str(file_path)
+        stamp = self._get_file_stamp(file_path)
+        document = self.parsed_documents.get(key)
+        if (document is None) or (document["stamp"] != stamp):
+            # file was not parsed yet or has changed since it was parsed
+            with profiler.span("parse yaml", "parse", path=key):
+                conf = self._parse_yaml(file_path)
+            document = {
+                "stamp": stamp,
+                "conf": conf,
+                "objects": dict()
+            }
+            self.parsed_documents[key] = document
+        return document
+
+    def _load_yaml(self, file_path: str, target_type: Type[BaseModel]):
+        document = self._get_parsed_document(file_path)
+        conf = document["conf"]
         if conf is None:
             return None
         elif target_type is None:
             return conf
         else:
-            ta = TypeAdapter(target_type)
-            obj = ta.validate_python(conf)
+            obj = document["objects"].get(target_type)
+            if obj is None:
+                ta = TypeAdapter(target_type)
+                obj = ta.validate_python(conf)
+                document["objects"][target_type] = obj
             return obj
 
+    def _get_plugin_files(self) -> List[Path]:
+        if (self.plugins_dir is None) or not(self.plugins_dir.exists()):
+            return []
+        return sorted(self.plugins_dir.glob("**/*.py"))
+
     def load(self, names: List[str]) -> Union[ListConfig, DictConfig]:
-        chain = self.get_env_list_chain(names)
-        merged_config = self.get_merged_config(chain)
+        if self.config_cache is not None:
+            with profiler.span("config cache", "merge") as span:
+                plugin_files = self._get_plugin_files()
+                merged_config = self.config_cache.get(self.config_dir, names, plugin_files)
+                span.set(hit=merged_config is not None)
+            if merged_config is not None:
+                return merged_config
+
+        with profiler.span("dependency chain", "chain", environments=" ".join(names)):
+            chain = self.get_env_list_chain(names)
+        with profiler.span("merge", "merge", environments=" ".join(chain)):
+            merged_config = self.get_merged_config(chain)
+
+        if self.config_cache is not None:
+            env_files = [self.get(name).path for name in chain]
+            self.config_cache.set(self.config_dir, names, env_files, plugin_files, merged_config)
         return merged_config
 
+    def _get_call_signatures(self, call_graph: CallGraph) -> Dict[str, str]:
+        # signature of se.call node changes, when the node or any config value used to resolve it changes
+        signatures = dict()
+        for node in call_graph.nodes.values():
+            if (node.dependencies is None) or not(call_graph.is_node_key_supported(node)):
+                # inputs of the node cannot be detected, so it is always resolved
+                continue
+            values = [call_graph.leaves[node.tokens]] + [call_graph.leaves[tokens] for tokens in sorted(node.inputs)]
+            env_names = sorted(set(
+                name for value in values if isinstance(value, str) for name in ENV_RESOLVER_REGEX.findall(value)
+            ))
+            signatures[node.key] = get_canonical_hash([
+                [list(tokens) for tokens in sorted(node.inputs)],
+                values,
+                {name: os.environ.get(name) for name in env_names}
+            ])
+        return signatures
+
+    def _get_reusable_call_results(self, call_graph: CallGraph, signatures: Dict[str, str]) -> Dict[str, Tuple[bool, Any]]:
+        # results of nodes, which signature has not changed and which do not depend on changed nodes
+        nodes = {node.key: node for node in call_graph.nodes.values()}
+        reusable = dict()   # type: Dict[str, bool]
+        visiting = set()
+        now = time.time()
+        def is_reusable(key: str) -> bool:
+            if key in reusable:
+                return reusable[key]
+            previous = self.previous_call_results.get(key)
+            result = (
+                (previous is not None)
+                and (previous[0] == signatures.get(key))
+                # cached values with ttl are reloaded (e.g. rotated secrets), once the shortest ttl has passed
+                and ((previous[2] is None) or (previous[2] > now))
+            )
+            if result:
+                visiting.add(key)
+                result = all((x not in visiting) and is_reusable(x) for x in nodes[key].dependencies)
+                visiting.discard(key)
+            reusable[key] = result
+            return result
+        return {key: self.previous_call_results[key][1] for key in signatures if is_reusable(key)}
+
     def resolve(self,
                 config: Union[ListConfig, DictConfig],
                 force_reload: bool = False,
                 no_cache: bool = False,
-                flush_caches: bool = False) -> Union[ListConfig, DictConfig]:
-        self.load_resolvers(force_reload, no_cache, flush_caches)
-        OmegaConf.resolve(config)
+                flush_caches: bool = False,
+                max_workers: int = 1,
+                incremental: bool = False) -> Union[ListConfig, DictConfig]:
+        # in incremental mode, results of se.call nodes are reused from previous incremental resolution,
+        # unless the node, config values used by it, or se.call nodes it depends on have changed
+        if incremental:
+            # signatures of nodes do not cover plugin code, so results are not reused once plugins have changed
+            self.reload_plugins_if_changed()
+        self.load_resolvers(force_reload, no_cache, flush_caches, max_workers)
+        call_graph = None
+        call_results = None
+        if incremental:
+            with profiler.span("diff with previous resolution", "resolve") as span:
+                call_graph = CallGraph(config)
+                signatures = self._get_call_signatures(call_graph)
+                if not(force_reload or no_cache or flush_caches):
+                    call_results = self._get_reusable_call_results(call_graph, signatures)
+                span.set(nodes=len(call_graph.nodes), reused=len(call_results or {}))
+            self.resolver_manager.record_call_results = True
+        with profiler.span("resolve", "resolve"):
+            self.resolver_manager.resolve(config, call_graph, call_results)
+        if incremental:
+            results = self.resolver_manager.precomputed_call_results
+            # reused results keep expiration time of the resolution, that produced them
+            expire_on = {key: self.previous_call_results[key][2] for key in (call_results or {})}
+            expire_on.update(self.resolver_manager.call_results_expire_on)
+            self.previous_call_results = {
+                key: (signature, results[key], expire_on.get(key)) for key, signature in signatures.items() if key in results
+            }
         return config
 
     def raw_config_to_yaml(self, config: Union[ListConfig, DictConfig]) -> str:
@@ -179,31 +438,22 @@ class EnvironmentManager():
             target_env_name = self._normalize_env_or_dependency_name(target_env_name)
             return target_env_name
 
-    def get_env_chain(self, name: str, current_chain: List[str] = None, skip_dependency_loops: bool = False) -> List[str]:
-        chain = [] if current_chain is None else current_chain
-        if name in chain:
-            if skip_dependency_loops:
-                return chain
-            else:
-                raise Exception(f"Potential dependency loop detected. Environment name is already in dependency chain: '{name}'.")
-        # to catch potential dependency loops with self, add name to the chain first
-        chain.append(name)
+    def _get_env_file_stamp(self, name: str):
+        return self._get_file_stamp(self.get(name).path)
+
+    def _get_env_dependencies(self, name: str) -> List[str]:
         env = self._load_env_yaml(name, EnvironmentConfigurationMinimal)    # type: EnvironmentConfigurationMinimal
-        if env.depends_on:
-            # start with the last dependency (top layer)
-            for dep_name in reversed(env.depends_on):
-                target_env_name = self.get_target_env_name_from_dependency(name, dep_name)
-                chain = self.get_env_chain(target_env_name, chain, skip_dependency_loops)
-        return chain
+        if not(env.depends_on):
+            return []
+        return [self.get_target_env_name_from_dependency(name, dep_name) for dep_name in env.depends_on]
+
+    def get_env_chain(self, name: str, current_chain: List[str] = None, skip_dependency_loops: bool = False) -> List[str]:
+        # environment is added before its dependencies, starting with the last dependency (top layer)
+        return self.dependency_graph.walk([name], current_chain, skip_dependency_loops)
 
     def get_env_list_chain(self, names: List[str], skip_dependency_loops: bool = False):
-        chain = []
-        # start from last envrionment (the one that should be on top)
-        for name in reversed(names):
-            chain = self.get_env_chain(name, chain, skip_dependency_loops)
-        # reverse the list so environments are in the sequence, in which they need to be applied
-        chain = list(reversed(chain))
-        return chain
+        # environments in the sequence, in which they need to be applied
+        return self.dependency_graph.get_chain(names, skip_dependency_loops)
 
     def get_merged_config(self, names: List[str]) -> Union[ListConfig, DictConfig]:
         configs_to_merge = []
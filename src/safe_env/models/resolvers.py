@@ -15,6 +15,8 @@ class CacheProviderParams(CallResolverParamsBase):
     name: str
     provider: Union[str, Callable]
     required: Optional[bool] = False
+    ttl: Optional[float] = None                         # seconds, after which cached value expires
+    stale_while_revalidate: Optional[float] = None      # seconds after expiration, during which stale value is used while it is refreshed
     get_method: Optional[str] = "get"
     set_method: Optional[str] = "set"
     delete_method: Optional[str] = "delete"
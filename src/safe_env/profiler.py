@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Union
+
+
+PROFILE_FORMATS = ["table", "json", "chrome"]
+
+
+def get_callable_name(obj: Union[Callable, str]) -> str:
+    if obj is None or isinstance(obj, str):
+        return obj
+    return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', type(obj).__qualname__)}"
+
+
+class ProfileSpan():
+    # Timing of single phase or se.call node.
+    # Attributes describe what was done (names of nodes, callables and caches, hit/miss), never resolved values.
+    def __init__(self, profiler: "Profiler", name: str, category: str, attributes: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.start = None       # type: float
+        self.duration = None    # type: float
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.profiler.add_span(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "category": self.category,
+            "start_ms": round((self.start - self.profiler.started_on) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "thread": self.thread_id,
+            "attributes": self.attributes
+        }
+
+
+class NullSpan():
+    # used when profiling is disabled, so instrumented code does not need to check it
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler():
+    # Collects spans of all threads, while it is set as active profiler.
+    def __init__(self):
+        self.spans = []     # type: List[ProfileSpan]
+        self.started_on = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def span(self, name: str, category: str, **attributes) -> ProfileSpan:
+        return ProfileSpan(self, name, category, attributes)
+
+    def add_span(self, span: ProfileSpan):
+        with self.lock:
+            self.spans.append(span)
+
+    def _get_sorted_spans(self) -> List[ProfileSpan]:
+        with self.lock:
+            return sorted(self.spans, key=lambda x: x.start)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spans": [x.to_dict() for x in self._get_sorted_spans()]
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        # Trace Event Format, can be opened in chrome://tracing or https://ui.perfetto.dev
+        pid = os.getpid()
+        events = []
+        for span in self._get_sorted_spans():
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.started_on) * 1000000, 1),
+                "dur": round(span.duration * 1000000, 1),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": span.attributes
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_table(self) -> str:
+        from . import utils
+        thread_ids = dict()
+        items = []
+        for span in self._get_sorted_spans():
+            items.append({
+                "start": f"{(span.start - self.started_on) * 1000:.1f}",
+                "duration": f"{span.duration * 1000:.1f}",
+                "thread": thread_ids.setdefault(span.thread_id, len(thread_ids)),
+                "category": span.category,
+                "name": span.name,
+                "details": ", ".join(f"{k}={v}" for k, v in span.attributes.items())
+            })
+        return utils.print_table(
+            items,
+            fields=["start", "duration", "thread", "category", "name", "details"],
+            headers=["Start (ms)", "Duration (ms)", "Thread", "Category", "Name", "Details"],
+            tablefmt="simple"
+        )
+
+    def format(self, profile_format: str = "table") -> str:
+        if profile_format == "table":
+            return self.to_table()
+        if profile_format == "json":
+            return json.dumps(self.to_dict(), indent=2)
+        if profile_format == "chrome":
+            return json.dumps(self.to_chrome_trace())
+        raise Exception(f"Profile format not known: '{profile_format}'")
+
+    ACTIVE_PROFILER = None # type: Profiler
+    def set_as_active_profiler(self):
+        Profiler.ACTIVE_PROFILER = self
+
+    @staticmethod
+    def get_active_profiler():
+        return Profiler.ACTIVE_PROFILER
+
+    @staticmethod
+    def reset_active_profiler():
+        Profiler.ACTIVE_PROFILER = None
+
+
+def span(name: str, category: str, **attributes) -> Union[ProfileSpan, NullSpan]:
+    profiler = Profiler.ACTIVE_PROFILER
+    if profiler is None:
+        return NULL_SPAN
+    return profiler.span(name, category, **attributes)
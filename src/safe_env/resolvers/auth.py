@@ -1,28 +1,37 @@
 from typing import Any
 
-from azure.identity import (
-    AzureCliCredential,
-    DefaultAzureCredential,
-    DeviceCodeCredential,
-    InteractiveBrowserCredential,
-    ManagedIdentityCredential,
-    VisualStudioCodeCredential,
-)
+from .lazyregistry import LazyRegistry, LazyReference
 
-from .auth_keeper import get_keeper_login_params
+
+# credentials, that ask user to sign in (in browser or with device code)
+INTERACTIVE_AUTH_CLASS_NAMES = [
+    "azure.identity.InteractiveBrowserCredential",
+    "azure.identity.DeviceCodeCredential"
+]
+
+
+class InteractiveAuthRequired(Exception):
+    pass
+
+
+def is_interactive_auth_class(obj: Any) -> bool:
+    # classes are matched by public name, since SDKs define them in private modules
+    name = getattr(obj, "__name__", None)
+    module_name = getattr(obj, "__module__", None) or ""
+    return any(module_name.startswith(x.rsplit(".", 1)[0]) and name == x.rsplit(".", 1)[1] for x in INTERACTIVE_AUTH_CLASS_NAMES)
 
 
 def get_azure_credential_token(credential: Any, scope: str):
     credential_token = credential.get_token(scope)
     return credential_token
 
-KNOWN_AUTH_CLASSES = {
-    "azure.default": DefaultAzureCredential,
-    "azure.cli": AzureCliCredential,
-    "azure.interactive": InteractiveBrowserCredential,
-    "azure.managedidentity": ManagedIdentityCredential,
-    "azure.devicecode": DeviceCodeCredential,
-    "azure.vscode": VisualStudioCodeCredential,
+KNOWN_AUTH_CLASSES = LazyRegistry({
+    "azure.default": LazyReference("azure.identity.DefaultAzureCredential"),
+    "azure.cli": LazyReference("azure.identity.AzureCliCredential"),
+    "azure.interactive": LazyReference("azure.identity.InteractiveBrowserCredential"),
+    "azure.managedidentity": LazyReference("azure.identity.ManagedIdentityCredential"),
+    "azure.devicecode": LazyReference("azure.identity.DeviceCodeCredential"),
+    "azure.vscode": LazyReference("azure.identity.VisualStudioCodeCredential"),
     "azure.token": get_azure_credential_token,
-    "keeper": get_keeper_login_params
-}
+    "keeper": LazyReference("safe_env.resolvers.auth_keeper.get_keeper_login_params")
+})
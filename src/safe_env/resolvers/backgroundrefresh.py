@@ -0,0 +1,119 @@
+import os
+import sys
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, List, Tuple
+
+from ..clientpool import ClientPool
+
+
+class BackgroundRefreshes():
+    # Refreshes of stale cached values. Resolution returns stale values without waiting for them,
+    # so refreshes are shared by all resolutions in the process and awaited only before it exits.
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.futures = []    # type: List[Future]
+        self.executor = None # type: ThreadPoolExecutor
+        self.lock = threading.Lock()
+        # if set, refreshes are not started, but collected and run in detached process, when the command exits (CLI)
+        self.detached = False
+        self.detached_refreshes = []    # type: List[Tuple[Callable[[], Any], ClientPool, Future]]
+
+    def _run_in_context(self, func: Callable[[], Any], client_pool: ClientPool):
+        if client_pool is not None:
+            client_pool.set_as_active_pool()
+        try:
+            func()
+        except Exception as ex:
+            logging.error(f"Cannot refresh stale cached value: {ex}")
+
+    def _run(self, func: Callable[[], Any], client_pool: ClientPool):
+        # refresh runs in its own context and uses clients of the resolution it was started from,
+        # even if another resolution is running
+        contextvars.Context().run(self._run_in_context, func, client_pool)
+
+    def submit(self, func: Callable[[], Any], client_pool: ClientPool = None) -> Future:
+        if self.detached:
+            future = Future()
+            with self.lock:
+                self.detached_refreshes.append((func, client_pool, future))
+            return future
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="se-refresh")
+            self.futures = [x for x in self.futures if not(x.done())]
+            future = self.executor.submit(self._run, func, client_pool)
+            self.futures.append(future)
+        return future
+
+    def call_when_done(self, futures: List[Future], func: Callable[[], Any]):
+        # calls func (e.g. closes client pool) after all futures are done, without waiting for them
+        remaining = [len(futures)]
+        lock = threading.Lock()
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                is_last = remaining[0] == 0
+            if is_last:
+                func()
+        if not(futures):
+            func()
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def _run_collected(self, refreshes: List[Tuple[Callable[[], Any], ClientPool, Future]]):
+        for func, client_pool, future in refreshes:
+            self._run(func, client_pool)
+            # closes client pool, once all refreshes using it are done
+            future.set_result(None)
+
+    def run_detached(self):
+        # Runs collected refreshes in forked process, so the command exits (and its output can be used) without waiting for them.
+        # Forked process is detached from terminal and from output of the command.
+        with self.lock:
+            refreshes = self.detached_refreshes
+            self.detached_refreshes = []
+        if not(refreshes):
+            return
+        if not(hasattr(os, "fork")):
+            self._run_collected(refreshes)
+            return
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if os.fork() != 0:
+            return
+        try:
+            os.setsid()
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in [0, 1, 2]:
+                os.dup2(devnull, fd)
+            self._run_collected(refreshes)
+        finally:
+            # exit handlers of the command are not run again in forked process
+            os._exit(0)
+
+    def wait(self):
+        with self.lock:
+            futures = self.futures
+            executor = self.executor
+            self.futures = []
+            self.executor = None
+        for future in futures:
+            future.result()
+        if executor is not None:
+            executor.shutdown()
+
+
+BACKGROUND_REFRESHES = BackgroundRefreshes()
+
+
+def wait_for_background_refreshes():
+    BACKGROUND_REFRESHES.wait()
+
+
+def finish_background_refreshes():
+    # called when command exits: collected refreshes are detached, running ones are awaited
+    BACKGROUND_REFRESHES.run_detached()
+    BACKGROUND_REFRESHES.wait()
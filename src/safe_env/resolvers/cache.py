@@ -1,7 +1,9 @@
-from .. import cache_providers
+from .lazyregistry import LazyRegistry, LazyReference
 
-KNOWN_CACHE_CLASSES = {
-    "memory": cache_providers.MemoryCache,
-    "keyring": cache_providers.KeyringCache,
-    "azure.keyvault": cache_providers.AzureKeyVaultSecretCache
-}
+KNOWN_CACHE_CLASSES = LazyRegistry({
+    "memory": LazyReference("safe_env.cache_providers.memory_cache.MemoryCache"),
+    "keyring": LazyReference("safe_env.cache_providers.keyring_cache.KeyringCache"),
+    "azure.keyvault": LazyReference("safe_env.cache_providers.azure_keyvault_cache.AzureKeyVaultSecretCache"),
+    "file.encrypted": LazyReference("safe_env.cache_providers.encrypted_file_cache.EncryptedFileCache"),
+    "sqlite": LazyReference("safe_env.cache_providers.sqlite_cache.SQLiteCache")
+})
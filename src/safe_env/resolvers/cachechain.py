@@ -0,0 +1,158 @@
+import time
+import logging
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from ..models import CacheProviderParams, MethodParams
+from ..cache_providers import BaseCacheProvider
+from .. import profiler
+from ..profiler import get_callable_name
+
+
+class CacheLevel():
+    # Single cache configuration of se.call node.
+    # Provider instance is requested only when first needed, since creating it can require authentication.
+    def __init__(self,
+                 cache_name: str,
+                 cache_config: CacheProviderParams,
+                 provider: Callable,
+                 get_provider_instance: Callable[[], Any],
+                 load_delayed_params: Callable[[List[Any], Dict[str, Any]], Tuple[List[Any], Dict[str, Any]]]):
+        self.cache_name = cache_name
+        self.config = cache_config
+        self.provider = provider
+        self.get_provider_instance = get_provider_instance
+        self.load_delayed_params = load_delayed_params
+        self.provider_instance = None
+        # value loaded in advance together with values of other caches using the same provider
+        self.is_prefetched = False
+        self.prefetched_value = None
+
+    def _get_provider_instance(self) -> Any:
+        if self.provider_instance is None:
+            self.provider_instance = self.get_provider_instance()
+        return self.provider_instance
+
+    def _get_method(self, method_name: str) -> Callable:
+        if method_name is None:
+            # provider is called directly, without creating an instance
+            return self.provider
+        return getattr(self._get_provider_instance(), method_name)
+
+    def _get_method_params(self, method_params: MethodParams) -> Tuple[List[Any], Dict[str, Any]]:
+        if method_params is None:
+            return self.load_delayed_params(self.config.args, self.config.kwargs)
+        return self.load_delayed_params(method_params.args, method_params.kwargs)
+
+    def _call(self, method_name: str, method_params: MethodParams, **kwargs) -> Any:
+        args, loaded_kwargs = self._get_method_params(method_params)
+        loaded_kwargs["name"] = self.config.name
+        loaded_kwargs.update(kwargs)
+        return self._get_method(method_name)(*args, **loaded_kwargs)
+
+    def get_bulk_request(self) -> Union[None, Tuple[Any, List[Any], Dict[str, Any]]]:
+        # returns provider instance and parameters for get_many, if provider supports it
+        if self.config.get_method != "get":
+            return None
+        provider_instance = self._get_provider_instance()
+        if not(callable(getattr(provider_instance, "get_many", None))):
+            return None
+        args, kwargs = self._get_method_params(self.config.get_params)
+        return (provider_instance, args, kwargs)
+
+    def set_prefetched_value(self, value: Any):
+        self.is_prefetched = True
+        self.prefetched_value = value
+
+    def get(self) -> Any:
+        if self.is_prefetched:
+            self.is_prefetched = False
+            return self.prefetched_value
+        return self._call(self.config.get_method, self.config.get_params)
+
+    def unwrap_value(self, stored_value: Any) -> Tuple[Any, bool]:
+        # returns cached value (None if it is expired) and flag, if value is stale and should be refreshed
+        if stored_value is None:
+            return (None, False)
+        value, cached_on = BaseCacheProvider.unwrap_value(stored_value)
+        if self.config.ttl is None:
+            return (value, False)
+        if cached_on is None:
+            # value was cached without expiration
+            return (None, False)
+        age = time.time() - cached_on
+        if age <= self.config.ttl:
+            return (value, False)
+        if (self.config.stale_while_revalidate is not None) and (age <= self.config.ttl + self.config.stale_while_revalidate):
+            return (value, True)
+        return (None, False)
+
+    def load(self) -> Tuple[Any, bool]:
+        return self.unwrap_value(self.get())
+
+    def _stores_only_strings(self) -> bool:
+        # providers not serializing values to JSON (as_json is False) can store only strings, unless they keep objects (e.g. memory)
+        if self.config.set_method is None:
+            return False
+        provider_instance = self._get_provider_instance()
+        return not(getattr(provider_instance, "store_as_json", True)) and not(getattr(provider_instance, "stores_objects", False))
+
+    def set(self, value: Any):
+        if self.config.ttl is not None:
+            value = BaseCacheProvider.wrap_value(value, as_string=self._stores_only_strings())
+        return self._call(self.config.set_method, self.config.set_params, value=value)
+
+    def flush_writes(self):
+        # providers called directly (without instance) have nothing to flush
+        flush = getattr(self.provider_instance, "flush_writes", None)
+        if callable(flush):
+            flush()
+
+    def delete(self):
+        # set_params were used for deleting before delete_params were supported, so they are still used as fallback
+        delete_params = self.config.delete_params if self.config.delete_params is not None else self.config.set_params
+        return self._call(self.config.delete_method, delete_params)
+
+
+class CacheChain():
+    # Cache levels of se.call node, sorted by name, so they are checked in the same order every time.
+    def __init__(self, levels: List[CacheLevel]):
+        self.levels = levels
+
+    def get_min_ttl(self) -> Union[None, float]:
+        ttls = [level.config.ttl for level in self.levels if level.config.ttl is not None]
+        return min(ttls) if ttls else None
+
+    def load(self, skip_optional: bool = False) -> Tuple[Union[None, str], Union[None, Any], bool]:
+        # returns name of the cache with the value, the value and flag, if the value is stale
+        # expired values are treated as not found, so they are loaded from next cache or source
+        for level in self.levels:
+            if skip_optional and not(level.config.required):
+                continue
+            with profiler.span("cache get", "cache", cache=level.cache_name, provider=get_callable_name(level.provider), prefetched=level.is_prefetched) as span:
+                result, is_stale = level.load()
+                span.set(hit=result is not None, stale=is_stale)
+            if result is not None:
+                return (level.cache_name, result, is_stale)
+        return (None, None, False)
+
+    def save(self, value: Any, stop_at_cache_name: str = None, skip_optional: bool = False, include_stop_cache: bool = False):
+        for level in self.levels:
+            is_stop_cache = (stop_at_cache_name is not None) and (stop_at_cache_name == level.cache_name)
+            if is_stop_cache and not(include_stop_cache):
+                break
+            if not(skip_optional) or level.config.required:
+                with profiler.span("cache set", "cache", cache=level.cache_name, provider=get_callable_name(level.provider)):
+                    level.set(value)
+            if is_stop_cache:
+                break
+
+    def flush_writes(self):
+        for level in self.levels:
+            level.flush_writes()
+
+    def delete(self):
+        for level in self.levels:
+            try:
+                level.delete()
+            except Exception as ex:
+                logging.error(str(ex))
@@ -1,25 +1,11 @@
-from .callables_azure import (
-    get_azure_key_vault_secrets,
-    get_azure_key_vault_certificates,
-    get_azure_rest_resource
-)
-from .callables_azuredevops import (
-    get_azure_devops_pat
-)
-from .callables_keyring import (
-    get_keyring_secrets
-)
-from .callables_keeper import (
-    get_keeper_secrets,
-    get_keeper_secrets_by_uids
-)
+from .lazyregistry import LazyRegistry, LazyReference
 
-KNOWN_CALLABLES = {
-    "get_azure_key_vault_secrets": get_azure_key_vault_secrets,
-    "get_azure_key_vault_certificates": get_azure_key_vault_certificates,
-    "get_keyring_secrets": get_keyring_secrets,
-    "get_azure_rest_resource": get_azure_rest_resource,
-    "get_azure_devops_pat": get_azure_devops_pat,
-    "get_keeper_secrets": get_keeper_secrets,
-    "get_keeper_secrets_by_uids": get_keeper_secrets_by_uids
-}
+KNOWN_CALLABLES = LazyRegistry({
+    "get_azure_key_vault_secrets": LazyReference("safe_env.resolvers.callables_azure.get_azure_key_vault_secrets"),
+    "get_azure_key_vault_certificates": LazyReference("safe_env.resolvers.callables_azure.get_azure_key_vault_certificates"),
+    "get_keyring_secrets": LazyReference("safe_env.resolvers.callables_keyring.get_keyring_secrets"),
+    "get_azure_rest_resource": LazyReference("safe_env.resolvers.callables_azure.get_azure_rest_resource"),
+    "get_azure_devops_pat": LazyReference("safe_env.resolvers.callables_azuredevops.get_azure_devops_pat"),
+    "get_keeper_secrets": LazyReference("safe_env.resolvers.callables_keeper.get_keeper_secrets"),
+    "get_keeper_secrets_by_uids": LazyReference("safe_env.resolvers.callables_keeper.get_keeper_secrets_by_uids")
+})
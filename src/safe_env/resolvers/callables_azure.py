@@ -2,10 +2,11 @@ import urllib.parse
 from typing import Any, Dict, List
 import re
 import json
-import requests
 from azure.keyvault.secrets import SecretClient
 from azure.keyvault.certificates import CertificateClient
 
+from .. import utils
+from .. import clientpool
 from ..models import (
     AzureKeyVaultCertificate,
     AzureKeyVaultKey
@@ -17,15 +18,16 @@ def get_azure_key_vault_secrets(
     url: str,
     credential: Any,
     names: List[str],
-    include_properties: bool = False
+    include_properties: bool = False,
+    max_workers: int = 1
 ) -> Dict[str, Any]:
     if names is None:
         return None
     
     result = dict()
 
-    client = SecretClient(vault_url=url, credential=credential)
-    for name in names:
+    client = clientpool.get_client(SecretClient, url, credential)
+    def get_value(name: str) -> Any:
         value = None
         secret = client.get_secret(name)
         if secret is not None:
@@ -36,24 +38,30 @@ def get_azure_key_vault_secrets(
                 ).model_dump_json()        # ensures that the output can later be cached with regular json serializer
                 value = json.loads(value)
             else:
-                value = secret.value        
+                value = secret.value
+        return value
+
+    # secrets are retrieved concurrently via the same client, if max_workers > 1
+    values = utils.map_concurrently(get_value, names, max_workers)
+    for name, value in zip(names, values):
         result[name] = value
     return result
 
 def get_azure_key_vault_certificates(
     url: str,
     credential: Any,
-    names: List[str]
+    names: List[str],
+    max_workers: int = 1
 ) -> Dict[str, Dict[str, Any]]:
     if names is None:
         return None
     
     result = dict()
 
-    certificate_client = CertificateClient(vault_url=url, credential=credential)
-    secret_client = SecretClient(vault_url=url, credential=credential)
+    certificate_client = clientpool.get_client(CertificateClient, url, credential)
+    secret_client = clientpool.get_client(SecretClient, url, credential)
 
-    for cert_name in names:
+    def get_value(cert_name: str) -> Dict[str, Any]:
         certificate = certificate_client.get_certificate(cert_name)
         secret_parts_match = re.search(r'^https://[^/]+/secrets/([^/]+)/([^/]+)$', certificate.secret_id)
         if secret_parts_match is None:
@@ -71,6 +79,11 @@ def get_azure_key_vault_certificates(
             private_key=certificate_private_key
         ).model_dump_json()                 # ensures that the output can later be cached with regular json serializer
         value = json.loads(value)
+        return value
+
+    # certificates are retrieved concurrently via the same clients, if max_workers > 1
+    values = utils.map_concurrently(get_value, names, max_workers)
+    for cert_name, value in zip(names, values):
         result[cert_name] = value
 
     return result
@@ -87,5 +100,6 @@ def get_azure_rest_resource(
     url = urllib.parse.urljoin(AZURE_MANAGEMENT_URL, url)
     credential_token = credential.get_token(AZURE_MANAGEMENT_SCOPE)
     headers = {"Authorization": 'Bearer ' + credential_token.token}
-    resp = requests.request(method=method, url=url, headers=headers, timeout=timeout)
+    http_session = clientpool.get_http_session()
+    resp = http_session.request(method=method, url=url, headers=headers, timeout=timeout)
     return resp.json()
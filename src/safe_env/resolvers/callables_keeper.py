@@ -1,8 +1,37 @@
+import weakref
 from typing import List, Dict, Any
 from keepercommander import api, subfolder
 from keepercommander.api import KeeperParams
 
 
+# record indexes for every KeeperParams session: {folder uid: {casefolded record title: record uid}}
+_RECORD_INDEXES = weakref.WeakKeyDictionary()
+
+
+def _get_folder_record_index(login_params: KeeperParams, folder_uid: str) -> Dict[str, str]:
+    session_index = _RECORD_INDEXES.get(login_params)
+    if (session_index is None) or (session_index["revision"] != login_params.revision):
+        # index is rebuilt when records are synced down again
+        session_index = {
+            "revision": login_params.revision,
+            "folders": dict()
+        }
+        _RECORD_INDEXES[login_params] = session_index
+
+    folder_index = session_index["folders"].get(folder_uid)
+    if folder_index is None:
+        folder_index = dict()
+        # params.subfolder_record_cache holds record uids for every folder
+        for uid in login_params.subfolder_record_cache.get(folder_uid, []):
+            # load a record by record UID
+            r = api.get_record(login_params, uid)
+            if r is not None:
+                # keep the first record with the same title
+                folder_index.setdefault(r.title.casefold(), uid)
+        session_index["folders"][folder_uid] = folder_index
+    return folder_index
+
+
 def get_keeper_secrets(
     login_params: KeeperParams,
     names: List[str] = None
@@ -17,14 +46,9 @@ def get_keeper_secrets(
         if record_info:
             # record_info is a tuple (subfolder.BaseFolderNode, record title)
             folder, record_title = record_info
-            # params.subfolder_record_cache holds record uids for every folder
-            for uid in login_params.subfolder_record_cache[folder.uid or '']:
-                # load a record by record UID
-                r = api.get_record(login_params, uid)
-                # compare record title with the last component of the full record path
-                if r.title.casefold() == record_title.casefold():
-                    record_uid = uid
-                    break
+            # compare record title with the last component of the full record path
+            folder_index = _get_folder_record_index(login_params, folder.uid or '')
+            record_uid = folder_index.get(record_title.casefold())
         if not record_uid:
             raise Exception(f"Cannot retrieve Keeper Record UID for '{record_name}'")
         else:
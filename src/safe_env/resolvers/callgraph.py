@@ -0,0 +1,252 @@
+import re
+from typing import Any, Dict, List, Set, Tuple, Union, Optional
+from omegaconf import OmegaConf, ListConfig, DictConfig
+
+
+# resolvers that do not read other config nodes, except ones used in their arguments
+NODE_INDEPENDENT_RESOLVERS = ["se.cache", "oc.env", "oc.decode", "oc.create", "oc.deprecated"]
+# resolvers that read config nodes under the same parent (via _parent_)
+PARENT_DEPENDENT_RESOLVERS = ["se.auth", "se.delayed"]
+# resolvers that read config node specified by the first argument
+NODE_SELECTING_RESOLVERS = ["oc.select", "oc.dict.keys", "oc.dict.values"]
+
+CALL_RESOLVER_REGEX = re.compile(r"^\s*\$\{\s*se\.call\s*:")
+KEY_TOKEN_REGEX = re.compile(r"^[A-Za-z0-9_\-]+$")
+PATH_TOKEN_REGEX = re.compile(r"[^.\[\]\s]+")
+UNSUPPORTED_PATH_REGEX = re.compile(r"[^\w\-.\[\]\s]")
+
+# path of config node, list indexes are stored as strings since interpolations can use both "a[0]" and "a.0"
+Tokens = Tuple[str, ...]
+
+
+class UnknownDependencies(Exception):
+    pass
+
+
+class CallNode():
+    def __init__(self, tokens: Tokens, key: str):
+        self.tokens = tokens
+        # same format as OmegaConf full key of the node, e.g. "a.b[0].c"
+        self.key = key
+        # keys of other se.call nodes that need to be resolved first, None if dependencies cannot be detected
+        self.dependencies = set()   # type: Optional[Set[str]]
+        # paths of all other config nodes, which values are used to resolve this node
+        self.inputs = set()         # type: Set[Tokens]
+
+
+class CallGraph():
+    # Discovers se.call nodes in unresolved config and dependencies between them by analyzing interpolations.
+    # If dependencies of the node cannot be reliably detected, they are marked as unknown, and the node
+    # is left for regular OmegaConf resolution.
+    def __init__(self, config: Union[ListConfig, DictConfig]):
+        self.leaves = dict()            # type: Dict[Tokens, Any]
+        self.keys = dict()              # type: Dict[Tokens, str]
+        self.leaves_by_prefix = dict()  # type: Dict[Tokens, List[Tokens]]
+        self.nodes = dict()             # type: Dict[Tokens, CallNode]
+        self.nodes_by_prefix = dict()   # type: Dict[Tokens, List[CallNode]]
+
+        self._flatten(OmegaConf.to_container(config, resolve=False), tuple(), "")
+        for tokens, value in self.leaves.items():
+            if isinstance(value, str) and CALL_RESOLVER_REGEX.match(value) and self._is_single_interpolation(value):
+                node = CallNode(tokens, self.keys[tokens])
+                self.nodes[tokens] = node
+                for i in range(len(tokens) + 1):
+                    self.nodes_by_prefix.setdefault(tokens[:i], []).append(node)
+
+        for node in self.nodes.values():
+            self._detect_dependencies(node)
+
+    def _flatten(self, value: Any, tokens: Tokens, key: str):
+        if isinstance(value, (dict, list)):
+            self.keys[tokens] = key
+        if isinstance(value, dict):
+            items = [(str(k), f"{key}.{k}" if key else str(k), v) for k, v in value.items()]
+        elif isinstance(value, list):
+            items = [(str(i), f"{key}[{i}]", v) for i, v in enumerate(value)]
+        else:
+            self.leaves[tokens] = value
+            self.keys[tokens] = key
+            for i in range(len(tokens) + 1):
+                self.leaves_by_prefix.setdefault(tokens[:i], []).append(tokens)
+            return
+        for item_token, item_key, item in items:
+            self._flatten(item, tokens + (item_token,), item_key)
+
+    def _split_interpolations(self, value: str) -> List[str]:
+        # returns content of all top level interpolations in a string
+        result = []
+        depth = 0
+        start = None
+        i = 0
+        while i < len(value):
+            if value[i] == "\\":
+                # skip escaped characters
+                i += 2
+                continue
+            if value.startswith("${", i):
+                if depth == 0:
+                    start = i + 2
+                depth += 1
+                i += 2
+                continue
+            if value[i] == "}" and depth > 0:
+                depth -= 1
+                if depth == 0:
+                    result.append(value[start:i])
+            elif value[i] in "'\"" and depth > 0:
+                # skip quoted resolver arguments
+                end = value.find(value[i], i + 1)
+                if end > 0:
+                    i = end
+            i += 1
+        if depth != 0:
+            raise UnknownDependencies()
+        return result
+
+    def _is_single_interpolation(self, value: str) -> bool:
+        value = value.strip()
+        try:
+            interpolations = self._split_interpolations(value)
+        except UnknownDependencies:
+            return False
+        return len(interpolations) == 1 and value == "${" + interpolations[0] + "}"
+
+    def _parse_path(self, path: str, container_tokens: Tokens) -> Tokens:
+        path = path.strip()
+        if UNSUPPORTED_PATH_REGEX.search(path):
+            # e.g. quoted keys
+            raise UnknownDependencies()
+        if path.startswith("."):
+            # relative path: "." is current container, every additional "." is one level up
+            level_up = len(path) - len(path.lstrip(".")) - 1
+            if level_up > len(container_tokens):
+                raise UnknownDependencies()
+            base_tokens = container_tokens[:len(container_tokens) - level_up]
+            path = path.lstrip(".")
+        else:
+            base_tokens = tuple()
+        return base_tokens + tuple(PATH_TOKEN_REGEX.findall(path))
+
+    def _get_references(self, value: str, container_tokens: Tokens) -> List[Tokens]:
+        # returns paths of all config nodes referenced by interpolations in a string
+        references = []
+        for content in self._split_interpolations(value):
+            nested_start = content.find("${")
+            if nested_start >= 0:
+                references += self._get_references(content[nested_start:], container_tokens)
+                content = content[:nested_start]
+                if ":" not in content:
+                    # node path is constructed dynamically, so only its static prefix is known
+                    prefix = content[:content.rfind(".")] if "." in content else ""
+                    if not(prefix.strip(".")):
+                        raise UnknownDependencies()
+                    references.append(self._parse_path(prefix, container_tokens))
+                    continue
+            if ":" in content:
+                resolver_name, args = content.split(":", 1)
+                resolver_name = resolver_name.strip()
+                if resolver_name in NODE_INDEPENDENT_RESOLVERS:
+                    continue
+                elif resolver_name in PARENT_DEPENDENT_RESOLVERS:
+                    references.append(container_tokens)
+                elif (resolver_name in NODE_SELECTING_RESOLVERS) and (nested_start < 0):
+                    references.append(self._parse_path(args.split(",")[0], container_tokens))
+                else:
+                    raise UnknownDependencies()
+            else:
+                references.append(self._parse_path(content, container_tokens))
+        return references
+
+    def _get_overlapping_nodes(self, tokens: Tokens) -> List[CallNode]:
+        # se.call nodes under specified path, and se.call node which result contains specified path
+        nodes = list(self.nodes_by_prefix.get(tokens, []))
+        for i in range(len(tokens)):
+            node = self.nodes.get(tokens[:i])
+            if node is not None:
+                nodes.append(node)
+        return nodes
+
+    def _get_dependencies(self, start_tokens: Tokens, node: CallNode = None) -> Tuple[Set[str], Set[Tokens]]:
+        # returns keys of se.call nodes and paths of other config nodes, which are used to resolve config node
+        dependencies = set()
+        inputs = set()
+        targets = [start_tokens]
+        visited = set()
+        while targets:
+            target = targets.pop()
+            if target in visited:
+                continue
+            visited.add(target)
+
+            is_result_of_other_node = False
+            for other_node in self._get_overlapping_nodes(target):
+                if other_node is node:
+                    if target != start_tokens:
+                        # node depends on its own result
+                        raise UnknownDependencies()
+                else:
+                    dependencies.add(other_node.key)
+                    if len(other_node.tokens) <= len(target):
+                        is_result_of_other_node = True
+            if is_result_of_other_node:
+                continue
+
+            for leaf_tokens in self.leaves_by_prefix.get(target, []):
+                if leaf_tokens in self.nodes:
+                    continue
+                inputs.add(leaf_tokens)
+                value = self.leaves[leaf_tokens]
+                if isinstance(value, str) and ("${" in value):
+                    targets += self._get_references(value, leaf_tokens[:-1])
+        return (dependencies, inputs)
+
+    def _detect_dependencies(self, node: CallNode):
+        try:
+            # se.call reads all attributes of the parent node
+            node.dependencies, node.inputs = self._get_dependencies(node.tokens[:-1], node)
+        except UnknownDependencies:
+            node.dependencies = None
+
+    def is_node_key_supported(self, node: CallNode) -> bool:
+        # node is selected by its key, so keys with special characters are not supported
+        return all(KEY_TOKEN_REGEX.match(x) for x in node.tokens)
+
+    def get_independent_attributes(self, attribute_name: str) -> List[Tuple[CallNode, str]]:
+        # returns se.call nodes with keys of their attribute (e.g. cache configuration),
+        # which can be resolved without resolving any se.call node
+        result = []
+        for node in self.nodes.values():
+            attribute_tokens = node.tokens[:-1] + (attribute_name,)
+            attribute_key = self.keys.get(attribute_tokens)
+            if (attribute_key is None) or not(self.is_node_key_supported(node)):
+                continue
+            try:
+                dependencies, _ = self._get_dependencies(attribute_tokens)
+            except UnknownDependencies:
+                continue
+            if not(dependencies):
+                result.append((node, attribute_key))
+        return result
+
+    def get_resolution_levels(self) -> List[List[CallNode]]:
+        # groups se.call nodes into levels, where nodes in the same level do not depend on each other
+        # and depend only on nodes from previous levels
+        # nodes with unknown or circular dependencies are not included
+        pending = {
+            node.key: node for node in self.nodes.values()
+                if (node.dependencies is not None) and self.is_node_key_supported(node)
+        }
+        levels = []
+        resolved = set()
+        while pending:
+            level = [
+                node for node in pending.values()
+                    if all(x in resolved for x in node.dependencies)
+            ]
+            if not(level):
+                break
+            for node in level:
+                del pending[node.key]
+                resolved.add(node.key)
+            levels.append(level)
+        return levels
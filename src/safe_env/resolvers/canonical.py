@@ -0,0 +1,34 @@
+import json
+import hashlib
+from typing import Any
+from pydantic import BaseModel
+from omegaconf import Container
+
+from .delayedcallable import DelayedCallable
+
+
+def to_canonical(obj: Any) -> Any:
+    # converts object to JSON serializable structure, that is the same for equal configurations
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, BaseModel):
+        return to_canonical(obj.model_dump())
+    if isinstance(obj, Container):
+        # config nodes are identified by their location in config
+        return {"node": obj._get_full_key(None)}
+    if isinstance(obj, dict):
+        return {"dict": sorted([str(k), to_canonical(v)] for k, v in obj.items())}
+    if isinstance(obj, (list, tuple)):
+        return [to_canonical(x) for x in obj]
+    if isinstance(obj, DelayedCallable):
+        # delayed callables are created every time config node is accessed, so they are identified by their parameters
+        return {"delayed": [to_canonical(obj.func), to_canonical(obj.args), to_canonical(obj.kwargs)]}
+    if isinstance(obj, type) or callable(obj):
+        return {"callable": f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"}
+    # other objects (e.g. credentials) are identified by object identity
+    return {"object": f"{type(obj).__module__}.{type(obj).__qualname__}", "id": id(obj)}
+
+
+def get_canonical_hash(obj: Any) -> str:
+    canonical_json = json.dumps(to_canonical(obj), sort_keys=True)
+    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
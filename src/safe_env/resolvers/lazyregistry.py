@@ -0,0 +1,46 @@
+from collections.abc import MutableMapping
+from importlib import import_module
+from typing import Any, Dict, Iterator
+
+
+class LazyReference():
+    # Full name of module attribute. Module is imported only when the attribute is first requested,
+    # so heavy SDKs (azure, keeper, ...) are not loaded by configurations that do not use them.
+    def __init__(self, full_name: str):
+        self.full_name = full_name
+
+    def load(self) -> Any:
+        module_name, attr_name = self.full_name.rsplit(".", 1)
+        return getattr(import_module(module_name), attr_name)
+
+    def __repr__(self) -> str:
+        return f"LazyReference('{self.full_name}')"
+
+
+class LazyRegistry(MutableMapping):
+    # Mapping of short names to callables/classes, where values can be lazy references resolved on first access.
+    def __init__(self, entries: Dict[str, Any] = None):
+        self.entries = dict(entries or {})
+
+    def __getitem__(self, name: str) -> Any:
+        value = self.entries[name]
+        if isinstance(value, LazyReference):
+            value = value.load()
+            self.entries[name] = value
+        return value
+
+    def __setitem__(self, name: str, value: Any):
+        self.entries[name] = value
+
+    def __delitem__(self, name: str):
+        del self.entries[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def copy(self) -> "LazyRegistry":
+        # references, that were not resolved yet, stay lazy in the copy
+        return LazyRegistry(self.entries)
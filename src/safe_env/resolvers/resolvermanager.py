@@ -5,20 +5,40 @@ from .auth import KNOWN_AUTH_CLASSES
 from .cache import KNOWN_CACHE_CLASSES
 
 
+import time
 import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
 from operator import attrgetter
 from importlib import import_module
-from typing import Union, Callable, Tuple, Any, List
-from collections import OrderedDict
+from typing import Union, Callable, Tuple, Any, List, Dict
+from functools import lru_cache, partial
+from omegaconf import ListConfig, DictConfig, Container
 from omegaconf.resolvers import oc
 import jmespath
 from ..models import (
     CallResolverParams,
-    CacheProviderParams,
+    MethodParams,
     ResolverConfiguration
 )
 
 from .delayedcallable import DelayedCallable
+from .callgraph import CallGraph, CallNode
+from .cachechain import CacheChain, CacheLevel
+from .tokencache import TokenCache, CachedTokenCredential
+from .auth import InteractiveAuthRequired, is_interactive_auth_class
+from .backgroundrefresh import BACKGROUND_REFRESHES
+from .canonical import get_canonical_hash
+from ..clientpool import ClientPool
+from .. import profiler
+from ..profiler import get_callable_name
+
+@lru_cache(maxsize=256)
+def compile_selector(selector: str) -> jmespath.parser.ParsedResult:
+    # the same selectors are used by many nodes, so they are parsed only once
+    return jmespath.compile(selector)
+
 
 class ResolverManager():
     def __init__(self,
@@ -28,7 +48,10 @@ class ResolverManager():
                  no_cache: bool=False,
                  flush_caches: bool=False,
                  disable_unregistered_callables: bool = False,
-                 load_known_callables_from_modules: List[str] = None):
+                 load_known_callables_from_modules: List[str] = None,
+                 max_workers: int = 1,
+                 token_cache: TokenCache = None,
+                 disable_interactive_auth: bool = False):
         self.plugins_module_name = plugins_module_name
         self.plugins_module = plugins_module
         self.force_reload = force_reload
@@ -36,6 +59,43 @@ class ResolverManager():
         self.flush_caches = flush_caches
         self.disable_unregistered_callables = disable_unregistered_callables
         self.load_known_callables_from_modules = load_known_callables_from_modules
+        self.max_workers = max_workers
+        # set when there is no user to sign in (e.g. in background agent)
+        self.disable_interactive_auth = disable_interactive_auth
+        # SDK clients and HTTP sessions shared by all resolver calls and cache providers
+        self.client_pool = ClientPool()
+        # access tokens shared by all credentials created via se.auth
+        self.token_cache = TokenCache() if token_cache is None else token_cache
+
+        # results of se.call nodes resolved in advance, by node key
+        self.precompute_call_keys = set()
+        self.precomputed_call_results = dict()
+        self.precomputed_call_results_lock = threading.Lock()
+        # if set, results of all se.call nodes are kept, so they can be reused by incremental resolution
+        self.record_call_results = False
+        # time after which recorded results must not be reused, for nodes cached with ttl
+        self.call_results_expire_on = dict()    # type: Dict[str, float]
+
+        # compiled cache configurations by node key, and cache provider instances by their configuration
+        self.cache_chains = dict()
+        self.cache_chains_lock = threading.Lock()
+        self.cache_provider_instances = dict()
+        self.cache_provider_instances_lock = threading.Lock()
+
+        # validated parameters of se.call nodes by path of parent node
+        self.call_params = dict()
+        self.call_params_lock = threading.Lock()
+
+        # results of calls to sources by call key, shared by nodes with identical calls
+        self.call_results = dict()
+        self.call_results_lock = threading.Lock()
+        # selectors applied to results of the same call by different nodes, and their values
+        self.call_selectors = dict()
+        self.selected_values = dict()
+
+        # refreshes of stale cached values started by this resolution, they continue after it returns
+        self.background_refreshes = []
+        self.background_refreshes_lock = threading.Lock()
 
         self.builtin_resolvers = [
             ResolverConfiguration(
@@ -127,11 +187,61 @@ class ResolverManager():
         if auth_class is None:
             raise Exception(f"Authentication class mapping not known: '{name}'")
         
-        return self.call_delayed_resolver(
+        return DelayedCallable(
+            func=self._call_auth_class_resolver,
             class_name_str=auth_class,
             _parent_=_parent_
         )
-        # return self.call_by_type_name_resolver(auth_class, _parent_=_parent_)
+
+    def _get_node_path(self, node: Container) -> Tuple:
+        # path of config node, unlike full key it is unique also for nodes in lists
+        path = []
+        while (node is not None) and (node._get_parent() is not None):
+            path.append(node._key())
+            node = node._get_parent()
+        return tuple(reversed(path))
+
+    def _to_plain_params(self, _parent_: Container) -> Any:
+        # only attributes used by resolver are converted to plain containers, value of the node itself is not touched
+        if not(isinstance(_parent_, DictConfig)):
+            return _parent_
+        params = dict()
+        for field_name in CallResolverParams.model_fields:
+            if field_name in _parent_:
+                value = _parent_[field_name]
+                if isinstance(value, Container):
+                    value = OmegaConf.to_container(value, resolve=True)
+                params[field_name] = value
+        return params
+
+    def _get_call_params(self, _parent_: Container) -> CallResolverParams:
+        # parameters are validated once per parent node, since se.call/se.auth/se.delayed nodes can be accessed many times
+        parent_path = self._get_node_path(_parent_)
+        call_params = self.call_params.get(parent_path)
+        if call_params is None:
+            call_params = CallResolverParams.model_validate(self._to_plain_params(_parent_))
+            with self.call_params_lock:
+                call_params = self.call_params.setdefault(parent_path, call_params)
+        return call_params
+
+    def _get_call_key(self, class_name_str: Union[Callable, str], call_params: CallResolverParams) -> str:
+        # calls with the same key return the same result (selector is not included)
+        return get_canonical_hash([
+            class_name_str,
+            call_params.init_params,
+            call_params.method,
+            call_params.args,
+            call_params.kwargs
+        ])
+
+    def _call_auth_class_resolver(self, class_name_str: Union[Callable, str], *, _parent_):
+        with profiler.span("se.auth", "auth", node=_parent_._get_full_key(None), callable=get_callable_name(class_name_str)):
+            result = self.call_by_type_name_resolver(class_name_str, _parent_=_parent_)
+            if callable(getattr(result, "get_token", None)) and not(isinstance(result, CachedTokenCredential)):
+                # credentials with the same configuration share access tokens
+                credential_key = self._get_call_key(class_name_str, self._get_call_params(_parent_))
+                result = CachedTokenCredential(result, self.token_cache, credential_key)
+        return result
 
     def _get_callable_by_name(self, class_name_str: str):
         if class_name_str is None:
@@ -175,129 +285,427 @@ class ResolverManager():
         else:
             return obj
 
-    def _load_delayed_params(self, args, kwargs):
+    def _load_delayed_params(self, args, kwargs, as_containers: bool = False):
         loaded_args = []
         loaded_kwargs = {}
         if args:
-            loaded_args = [self._load_delayed_param(x) for x in args]
+            loaded_args = [self._load_param(x, as_containers) for x in args]
         if kwargs:
-            loaded_kwargs = {k: self._load_delayed_param(v) for k, v in kwargs.items()}
+            loaded_kwargs = {k: self._load_param(v, as_containers) for k, v in kwargs.items()}
         return (loaded_args, loaded_kwargs)
 
-    def _call_by_type_name(self, class_name_str: Union[Callable, str], call_params: CallResolverParams):
+    def _load_param(self, obj, as_containers: bool):
+        # parameters are validated from plain lists and dicts, but callables outside of safe_env (e.g. plugins)
+        # receive nested parameters as OmegaConf containers, like config nodes
+        if as_containers and isinstance(obj, (list, dict)):
+            return OmegaConf.create(obj, flags={"allow_objects": True})
+        return self._load_delayed_param(obj)
+
+    def _is_builtin_callable(self, callable_or_class: Any) -> bool:
+        # built-in callables, auth and cache classes accept plain lists and dicts
+        return getattr(callable_or_class, "__module__", "").split(".")[0] == "safe_env"
+
+    def _prepare_call(self, class_name_str: Union[Callable, str], call_params: CallResolverParams) -> Callable[[], Any]:
+        # loads all parameters in advance, so returned function does not access config and can be called from any thread
         callable_or_class = (class_name_str if isinstance(class_name_str, Callable)
                                 else self._get_callable_by_name(class_name_str))
+        if self.disable_interactive_auth and is_interactive_auth_class(callable_or_class):
+            raise InteractiveAuthRequired(f"Interactive authentication is disabled: '{get_callable_name(callable_or_class)}'")
+        as_containers = not(self._is_builtin_callable(callable_or_class))
         if call_params.method is None:
             args, kwargs = self._load_delayed_params(
                 call_params.args,
-                call_params.kwargs
-            )
-            result = callable_or_class(*args, **kwargs)
-        else:
-            args, kwargs = self._load_delayed_params(
-                call_params.init_params.args,
-                call_params.init_params.kwargs
-            )
-            class_instance = callable_or_class(*args, **kwargs)
-            callable_method = getattr(class_instance, call_params.method)
-            args, kwargs = self._load_delayed_params(
-                call_params.args,
-                call_params.kwargs
+                call_params.kwargs,
+                as_containers
             )
-            result = callable_method(*args, **kwargs)
+            return partial(callable_or_class, *args, **kwargs)
+
+        init_args, init_kwargs = self._load_delayed_params(
+            call_params.init_params.args,
+            call_params.init_params.kwargs,
+            as_containers
+        )
+        args, kwargs = self._load_delayed_params(
+            call_params.args,
+            call_params.kwargs,
+            as_containers
+        )
+        method_name = call_params.method
+        def call_method():
+            class_instance = callable_or_class(*init_args, **init_kwargs)
+            callable_method = getattr(class_instance, method_name)
+            return callable_method(*args, **kwargs)
+        return call_method
+
+    def _call_by_type_name(self, class_name_str: Union[Callable, str], call_params: CallResolverParams):
+        return self._prepare_call(class_name_str, call_params)()
+
+    def _call_coalesced(self, call_key: str, class_name_str: Union[Callable, str], call_params: CallResolverParams) -> Any:
+        # identical calls from different nodes are executed only once per resolution,
+        # and every node applies its own selector to the shared result
+        with self.call_results_lock:
+            future = self.call_results.get(call_key)
+            is_first_call = future is None
+            if is_first_call:
+                future = Future()
+                self.call_results[call_key] = future
+        if is_first_call:
+            try:
+                with profiler.span("source fetch", "source", callable=get_callable_name(class_name_str)):
+                    future.set_result(self._call_by_type_name(class_name_str, call_params))
+            except Exception as ex:
+                # failed calls are retried by next nodes
+                with self.call_results_lock:
+                    del self.call_results[call_key]
+                future.set_exception(ex)
+        return future.result()
+
+    def _apply_selector(self, result: Any, selector: str) -> Any:
+        if selector is not None:
+            # apply jmespath selector to filter parts of response
+            result = compile_selector(selector).search(result)
         return result
 
-    def _load_from_cache_config(self, cache_config: CacheProviderParams):
-        if not(cache_config.required) and (self.force_reload or self.no_cache):
-            return None
-        
-        class_name_str = cache_config.provider
-        call_params = cache_config.model_copy(deep=True)
-        call_params.method = call_params.get_method
-        if call_params.get_params:
-            call_params.args = call_params.get_params.args
-            call_params.kwargs = call_params.get_params.kwargs
-        call_params.kwargs["name"] = cache_config.name
-        return self._call_by_type_name(class_name_str, call_params)
-
-    def _save_to_cache_config(self, cache_config: CacheProviderParams, value: Any):
-        if not(cache_config.required) and self.no_cache:
-            return None
-        class_name_str = cache_config.provider
-        call_params = cache_config.model_copy(deep=True)
-        call_params.method = call_params.set_method
-        if call_params.set_params:
-            call_params.args = call_params.set_params.args
-            call_params.kwargs = call_params.set_params.kwargs
-        call_params.kwargs["name"] = cache_config.name
-        call_params.kwargs["value"] = value
-        return self._call_by_type_name(class_name_str, call_params)
-    
-    def _delete_from_cache_config(self, cache_config: CacheProviderParams):
-        class_name_str = cache_config.provider
-        call_params = cache_config.model_copy(deep=True)
-        call_params.method = call_params.delete_method
-        if call_params.set_params:
-            call_params.args = call_params.set_params.args
-            call_params.kwargs = call_params.set_params.kwargs
-        call_params.kwargs["name"] = cache_config.name
+    def _apply_selectors(self, result: Any, selectors: List[str]) -> Dict[str, Any]:
+        # evaluates multiple selectors in one pass, as a single multiselect expression
+        expression = "{" + ", ".join(f"s{i}: ({selector})" for i, selector in enumerate(selectors)) + "}"
         try:
-            self._call_by_type_name(class_name_str, call_params)
-        except Exception as ex:
-            logging.error(str(ex))
+            values = compile_selector(expression).search(result)
+        except jmespath.exceptions.JMESPathError:
+            # invalid selectors are reported by nodes using them
+            return dict()
+        return {selector: values[f"s{i}"] for i, selector in enumerate(selectors)}
 
-    def _load_from_cache(self, call_params: CallResolverParams) -> Tuple[Union[None, str], Union[None, Any]]:
-        if call_params.cache:
-            # sort cache configs by name
-            ordered_cache_configs = OrderedDict(sorted(call_params.cache.items()))
-            for cache_name, cache_config in ordered_cache_configs.items():
-                result = self._load_from_cache_config(cache_config)
-                if result is not None:
-                    return (cache_name, result)
-        return (None, None)
-    
-    def _save_to_cache(self, call_params: CallResolverParams, value: Any, stop_at_cache_name: str = None):
-        if call_params.cache:
-            # sort cache configs by name
-            ordered_cache_configs = OrderedDict(sorted(call_params.cache.items()))
-            for cache_name, cache_config in ordered_cache_configs.items():
-                if (stop_at_cache_name is not None) and (stop_at_cache_name == cache_name):
-                    break
-                self._save_to_cache_config(cache_config, value)
+    def _call_and_select(self, class_name_str: Union[Callable, str], call_params: CallResolverParams) -> Any:
+        call_key = self._get_call_key(class_name_str, call_params)
+        result = self._call_coalesced(call_key, class_name_str, call_params)
+        selector = call_params.selector
+        selectors = self.call_selectors.get(call_key)
+        if (selector is None) or (result is None) or (selectors is None) or (selector not in selectors):
+            return self._apply_selector(result, selector)
+
+        with self.call_results_lock:
+            selected_values = self.selected_values.get(call_key)
+        if selected_values is None:
+            selected_values = self._apply_selectors(result, sorted(selectors))
+            with self.call_results_lock:
+                selected_values = self.selected_values.setdefault(call_key, selected_values)
+        if selector in selected_values:
+            return selected_values[selector]
+        return self._apply_selector(result, selector)
+
+    def register_call_selectors(self, config: Union[ListConfig, DictConfig], call_graph: CallGraph):
+        # find identical calls with different selectors, so selectors can be applied to shared result in one pass
+        # only nodes that do not depend on other se.call nodes are checked, since their parameters can be loaded in advance
+        selectors = dict()
+        for node in call_graph.nodes.values():
+            parent_key = call_graph.keys.get(node.tokens[:-1])
+            if (node.dependencies != set()) or (parent_key is None) or not(call_graph.is_node_key_supported(node)):
+                continue
+            try:
+                value = call_graph.leaves[node.tokens]
+                class_name_str = value[value.index(":") + 1:value.rindex("}")].strip()
+                call_params = self._get_call_params(OmegaConf.select(config, parent_key) if parent_key else config)
+            except Exception as ex:
+                logging.debug(f"Cannot load parameters of '{node.key}' in advance: {ex}")
+                continue
+            if call_params.selector is not None:
+                call_key = self._get_call_key(class_name_str, call_params)
+                selectors.setdefault(call_key, set()).add(call_params.selector)
+        self.call_selectors = {k: v for k, v in selectors.items() if len(v) > 1}
+
+    def _prepare_load_from_source(self, class_name_str: Union[Callable, str], call_params: CallResolverParams) -> Callable[[], Any]:
+        call = self._prepare_call(class_name_str, call_params)
+        selector = call_params.selector
+        def load_from_source():
+            return self._apply_selector(call(), selector)
+        return load_from_source
 
-    def _delete_from_cache(self, call_params: CallResolverParams):
+    def _get_cache_provider_instance(self, provider: Callable, init_params: MethodParams) -> Any:
+        # caches with the same provider configuration share provider instance (and its clients)
+        instance_key = get_canonical_hash([provider, init_params])
+        with self.cache_provider_instances_lock:
+            instance = self.cache_provider_instances.get(instance_key)
+        if instance is None:
+            args, kwargs = self._load_delayed_params(init_params.args, init_params.kwargs, not(self._is_builtin_callable(provider)))
+            instance = provider(*args, **kwargs)
+            with self.cache_provider_instances_lock:
+                instance = self.cache_provider_instances.setdefault(instance_key, instance)
+        return instance
+
+    def _compile_cache_chain(self, call_params: CallResolverParams) -> CacheChain:
+        levels = []
         if call_params.cache:
             # sort cache configs by name
-            ordered_cache_configs = OrderedDict(sorted(call_params.cache.items()))
-            for cache_name, cache_config in ordered_cache_configs.items():
-                self._delete_from_cache_config(cache_config)
+            for cache_name, cache_config in sorted(call_params.cache.items()):
+                provider = (cache_config.provider if isinstance(cache_config.provider, Callable)
+                                else self._get_callable_by_name(cache_config.provider))
+                levels.append(CacheLevel(
+                    cache_name,
+                    cache_config,
+                    provider,
+                    partial(self._get_cache_provider_instance, provider, cache_config.init_params),
+                    partial(self._load_delayed_params, as_containers=not(self._is_builtin_callable(provider)))
+                ))
+        return CacheChain(levels)
+
+    def _get_cache_chain(self, call_params: CallResolverParams, node_key: str = None) -> CacheChain:
+        if node_key is None:
+            return self._compile_cache_chain(call_params)
+        with self.cache_chains_lock:
+            cache_chain = self.cache_chains.get(node_key)
+        if cache_chain is None:
+            cache_chain = self._compile_cache_chain(call_params)
+            with self.cache_chains_lock:
+                cache_chain = self.cache_chains.setdefault(node_key, cache_chain)
+        return cache_chain
+
+    def _load_from_cache(self, cache_chain: CacheChain) -> Tuple[Union[None, str], Union[None, Any], bool]:
+        # optional caches are skipped, if values must be reloaded or caches are disabled
+        return cache_chain.load(skip_optional=(self.force_reload or self.no_cache))
+
+    def _save_to_cache(self, cache_chain: CacheChain, value: Any, stop_at_cache_name: str = None):
+        cache_chain.save(value, stop_at_cache_name, skip_optional=self.no_cache)
+
+    def _delete_from_cache(self, cache_chain: CacheChain):
+        cache_chain.delete()
 
-    def call_by_type_name_resolver(self, class_name_str: str, *, _parent_):
-        call_params = CallResolverParams.model_validate(_parent_)
+    def _refresh_in_background(self, load_from_source: Callable[[], Any], cache_chain: CacheChain, stale_cache_name: str):
+        # stale cached value is already used, new value is loaded from source and saved to caches up to the stale one
+        def refresh():
+            with profiler.span("background refresh", "source", cache=stale_cache_name):
+                result = load_from_source()
+                cache_chain.save(result, stale_cache_name, skip_optional=self.no_cache, include_stop_cache=True)
+                cache_chain.flush_writes()
+        future = BACKGROUND_REFRESHES.submit(refresh, self.client_pool)
+        with self.background_refreshes_lock:
+            self.background_refreshes.append(future)
+
+    def _flush_cache_providers(self):
+        # cache providers buffering writes (e.g. file.encrypted) write all values saved during resolution at once
+        with self.cache_provider_instances_lock:
+            instances = list(self.cache_provider_instances.values())
+        for instance in instances:
+            flush = getattr(instance, "flush_writes", None)
+            if not(callable(flush)):
+                continue
+            with profiler.span("cache flush", "cache", provider=get_callable_name(type(instance))):
+                try:
+                    flush()
+                except Exception as ex:
+                    logging.error(f"Cannot write cached values: {ex}")
+
+    def _close_client_pool(self):
+        # clients (also the ones held by cache providers) are closed once background refreshes using them are done
+        with self.background_refreshes_lock:
+            futures = self.background_refreshes
+            client_pool = self.client_pool
+            self.background_refreshes = []
+            self.client_pool = ClientPool()
+        BACKGROUND_REFRESHES.call_when_done(futures, client_pool.close)
+
+    def call_by_type_name_resolver(self, class_name_str: str, *, _parent_, _node_=None):
+        node_key = None if _node_ is None else _node_._get_full_key(None)
+        with profiler.span("se.call", "call", node=node_key, callable=get_callable_name(class_name_str)) as span:
+            precomputed_result = self.precomputed_call_results.get(node_key)
+            if precomputed_result is not None:
+                as_container, result = precomputed_result
+                span.set(precomputed=True)
+                if as_container:
+                    result = oc.create(result, _parent_)
+                return result
+
+            call_params = self._get_call_params(_parent_)
+            result = self._load_call_result(class_name_str, call_params, node_key, span)
+        
+            if call_params.as_container:
+                # use OmegaConf standard oc.create resolver to convert value to oc config node
+                result = oc.create(result, _parent_)
         
+            return result
+
+    def _load_call_result(self, class_name_str: Union[Callable, str], call_params: CallResolverParams, node_key: str, span: Any) -> Any:
+        # loads value from caches or source, config is not accessed
+        cache_chain = self._get_cache_chain(call_params, node_key)
+
         result = None
         result_from_cache_name = None
+        is_stale = False
         
         if self.flush_caches:
-            self._delete_from_cache(call_params)
+            self._delete_from_cache(cache_chain)
         else:
             # try loading from cache
-            result_from_cache_name, result = self._load_from_cache(call_params)
+            result_from_cache_name, result, is_stale = self._load_from_cache(cache_chain)
+            span.set(cache=result_from_cache_name, stale=is_stale)
         
         # even if flush caches is called, reload value from source to make sure that all downstream resolvers are called and caches are flushed for these as well
         if result is None:
             # value not found in cache - retrieve from source
-            result = self._call_by_type_name(class_name_str, call_params)
-            if call_params.selector is not None:
-                # apply jmespath selector to filter parts of response
-                result = jmespath.search(call_params.selector, result)
-            
-        if not(self.flush_caches):
-            # update cache
-            self._save_to_cache(call_params, result, result_from_cache_name)
-        
-        if call_params.as_container:
-            # use OmegaConf standard oc.create resolver to convert value to oc config node
-            result = oc.create(result, _parent_)
+            result = self._call_and_select(class_name_str, call_params)
+        elif is_stale:
+            self._refresh_in_background(
+                self._prepare_load_from_source(class_name_str, call_params),
+                cache_chain,
+                result_from_cache_name
+            )
         
-        return result
\ No newline at end of file
+        if not(self.flush_caches) and not(is_stale):
+            # update cache
+            self._save_to_cache(cache_chain, result, result_from_cache_name)
+
+        if (node_key is not None) and (self.record_call_results or (node_key in self.precompute_call_keys)):
+            ttl = cache_chain.get_min_ttl()
+            with self.precomputed_call_results_lock:
+                self.precomputed_call_results[node_key] = (call_params.as_container, result)
+                if self.record_call_results and (ttl is not None):
+                    # stale value is being refreshed, so it is never reused
+                    self.call_results_expire_on[node_key] = time.time() + (0 if is_stale else ttl)
+
+        return result
+
+    def _preload_delayed_params(self, call_params: CallResolverParams):
+        # parameters of delayed callables (se.auth, se.delayed) are loaded as well,
+        # so calling them later reads only already validated parameters
+        param_sets = [call_params.init_params, call_params]
+        for cache_config in (call_params.cache or dict()).values():
+            param_sets += [cache_config.init_params, cache_config]
+        for params in param_sets:
+            if params is None:
+                continue
+            values = list(params.args or []) + list((params.kwargs or dict()).values())
+            for value in values:
+                if isinstance(value, DelayedCallable) and (value.kwargs.get("_parent_") is not None):
+                    self._preload_delayed_params(self._get_call_params(value.kwargs["_parent_"]))
+
+    def _load_call_node_params(self, config: Union[ListConfig, DictConfig], call_graph: CallGraph, node: CallNode) -> Union[None, Tuple[Union[Callable, str], CallResolverParams]]:
+        # parameters are resolved on the main thread, since OmegaConf config nodes are not safe to resolve concurrently
+        parent_key = call_graph.keys.get(node.tokens[:-1])
+        if (parent_key is None) or not(call_graph.is_node_key_supported(node)):
+            return None
+        value = call_graph.leaves[node.tokens]
+        class_name_str = value[value.index(":") + 1:value.rindex("}")].strip()
+        if "${" in class_name_str:
+            return None
+        call_params = self._get_call_params(OmegaConf.select(config, parent_key, throw_on_missing=True) if parent_key else config)
+        self._preload_delayed_params(call_params)
+        return class_name_str, call_params
+
+    def _precompute_call_node(self, class_name_str: Union[Callable, str], call_params: CallResolverParams, node_key: str):
+        # runs only the call and cache lookups, result is stored and used when the node is resolved
+        with profiler.span("se.call", "call", node=node_key, callable=get_callable_name(class_name_str)) as span:
+            self._load_call_result(class_name_str, call_params, node_key, span)
+
+    def prefetch_caches(self, config: Union[ListConfig, DictConfig], call_graph: CallGraph):
+        # load cached values of se.call nodes in advance, so lookups are sent as one batch per cache provider
+        # cache levels are prefetched in rounds: next level of the node is requested only if previous one had no value
+        skip_optional = self.force_reload or self.no_cache
+        pending = []
+        for node, cache_key in call_graph.get_independent_attributes("cache"):
+            if node.key in self.precomputed_call_results:
+                # result is already known (reused from previous resolution)
+                continue
+            try:
+                cache_config = OmegaConf.select(config, cache_key)
+                if not(cache_config):
+                    continue
+                call_params = CallResolverParams.model_validate({"cache": cache_config})
+                pending.append((self._get_cache_chain(call_params, node.key), 0))
+            except Exception as ex:
+                logging.info(f"Cannot prefetch cached value of '{node.key}': {ex}")
+
+        while pending:
+            batches = dict()
+            for cache_chain, index in pending:
+                while (index < len(cache_chain.levels)) and skip_optional and not(cache_chain.levels[index].config.required):
+                    index += 1
+                if index >= len(cache_chain.levels):
+                    continue
+                level = cache_chain.levels[index]
+                try:
+                    bulk_request = level.get_bulk_request()
+                except Exception as ex:
+                    logging.info(f"Cannot prefetch cached value of '{level.config.name}': {ex}")
+                    continue
+                if bulk_request is None:
+                    # remaining levels are loaded one by one during resolution
+                    continue
+                provider_instance, args, kwargs = bulk_request
+                batch_key = (id(provider_instance), get_canonical_hash([args, kwargs]))
+                batch = batches.setdefault(batch_key, (provider_instance, args, kwargs, []))
+                batch[3].append((cache_chain, index))
+
+            pending = []
+            for provider_instance, args, kwargs, items in batches.values():
+                names = list(dict.fromkeys(cache_chain.levels[index].config.name for cache_chain, index in items))
+                try:
+                    with profiler.span("cache get_many", "cache", provider=get_callable_name(type(provider_instance)), names=len(names)):
+                        values = provider_instance.get_many(names, *args, **kwargs)
+                except Exception as ex:
+                    logging.info(f"Cannot prefetch cached values from '{type(provider_instance).__name__}': {ex}")
+                    continue
+                for cache_chain, index in items:
+                    level = cache_chain.levels[index]
+                    value = values.get(level.config.name)
+                    level.set_prefetched_value(value)
+                    if level.unwrap_value(value)[0] is None:
+                        pending.append((cache_chain, index + 1))
+
+    def precompute_call_nodes(self, config: Union[ListConfig, DictConfig], call_graph: CallGraph):
+        # resolve independent se.call nodes concurrently, level by level
+        levels = call_graph.get_resolution_levels()
+        self.precompute_call_keys = set(node.key for level in levels for node in level)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for level in levels:
+                futures = []
+                for node in level:
+                    if node.key in self.precomputed_call_results:
+                        # result is already known (reused from previous resolution)
+                        continue
+                    try:
+                        call_node_params = self._load_call_node_params(config, call_graph, node)
+                    except Exception as ex:
+                        # node is resolved with the rest of the config, where the error is reported
+                        logging.debug(f"Cannot load parameters of '{node.key}' in advance: {ex}")
+                        call_node_params = None
+                    if call_node_params is None:
+                        self.precompute_call_keys.discard(node.key)
+                        continue
+                    # node is computed in copy of current context, with active client pool of this resolution
+                    futures.append(executor.submit(contextvars.copy_context().run, self._precompute_call_node, *call_node_params, node.key))
+                for future in futures:
+                    future.result()
+
+    def resolve(self,
+                config: Union[ListConfig, DictConfig],
+                call_graph: CallGraph = None,
+                call_results: Dict[str, Tuple[bool, Any]] = None):
+        # call_results - results of se.call nodes by node key, which are used instead of resolving these nodes
+        client_pool_token = self.client_pool.set_as_active_pool()
+        try:
+            if call_results:
+                self.precomputed_call_results.update(call_results)
+            with profiler.span("call graph", "resolve") as span:
+                call_graph = CallGraph(config) if call_graph is None else call_graph
+                self.register_call_selectors(config, call_graph)
+                span.set(nodes=len(call_graph.nodes))
+            if not(self.flush_caches):
+                with profiler.span("prefetch caches", "cache"):
+                    self.prefetch_caches(config, call_graph)
+            if (self.max_workers is not None) and (self.max_workers > 1):
+                with profiler.span("precompute", "resolve", max_workers=self.max_workers):
+                    self.precompute_call_nodes(config, call_graph)
+            # resolve remaining nodes and replace interpolations with resolved values
+            with profiler.span("interpolate", "resolve"):
+                OmegaConf.resolve(config)
+        finally:
+            self._flush_cache_providers()
+            ClientPool.reset_active_pool(client_pool_token)
+            self._close_client_pool()
+            # provider instances can hold clients from the closed pool
+            self.cache_chains = dict()
+            self.cache_provider_instances = dict()
+            self.call_params = dict()
+            self.call_results = dict()
+            self.call_selectors = dict()
+            self.selected_values = dict()
@@ -0,0 +1,213 @@
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+from importlib import import_module
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..cache_providers import BaseCacheProvider
+from ..cache_providers.base_cache_provider import get_default_cache_dir
+from .. import profiler
+from .canonical import get_canonical_hash
+
+
+TOKEN_CACHE_SERVICE_NAME = "safe-env-tokens"
+# only tokens of these types can be restored from persistent token cache
+PERSISTABLE_TOKEN_MODULES = ["azure.core.credentials"]
+TOKEN_FIELDS = ["token", "expires_on", "token_type", "refresh_on"]
+# attributes of credentials (azure-identity), that select account tokens are issued for
+CREDENTIAL_IDENTITY_ATTRIBUTES = ["tenant_id", "_tenant_id", "client_id", "_client_id", "username", "_username"]
+# environment variables, that select account of credentials without explicit parameters (e.g. azure.default)
+CREDENTIAL_IDENTITY_ENV_VARS = ["AZURE_TENANT_ID", "AZURE_CLIENT_ID", "AZURE_USERNAME"]
+# credentials using account signed in via "az login"
+AZURE_CLI_CREDENTIAL_NAMES = ["AzureCliCredential", "DefaultAzureCredential"]
+
+
+def get_azure_cli_account() -> Optional[Dict[str, Any]]:
+    # account of default subscription, changes after "az login" or "az account set"
+    config_dir = Path(os.environ.get("AZURE_CONFIG_DIR") or Path.home().joinpath(".azure"))
+    try:
+        profile = json.loads(config_dir.joinpath("azureProfile.json").read_text(encoding="utf-8-sig"))
+        for subscription in profile.get("subscriptions", []):
+            if subscription.get("isDefault"):
+                return {"user": subscription.get("user", dict()).get("name"), "tenant_id": subscription.get("tenantId")}
+    except Exception as ex:
+        logging.debug(f"Cannot read Azure CLI account: {ex}")
+    return None
+
+
+def get_credential_identity(credential: Any) -> Dict[str, Any]:
+    # Account, for which credential issues tokens, as far as it can be detected.
+    # Credentials with the same configuration can issue tokens for different accounts (e.g. after "az login" as another user),
+    # so tokens are cached separately for every identity.
+    identity = dict()
+    for name in CREDENTIAL_IDENTITY_ATTRIBUTES:
+        value = getattr(credential, name, None)
+        if isinstance(value, str):
+            identity[name.lstrip("_")] = value
+    chained_credentials = getattr(credential, "credentials", None)
+    if isinstance(chained_credentials, (list, tuple)):
+        identity["credentials"] = [get_credential_identity(x) for x in chained_credentials]
+    if type(credential).__name__ in AZURE_CLI_CREDENTIAL_NAMES:
+        identity["env"] = {name: os.environ.get(name) for name in CREDENTIAL_IDENTITY_ENV_VARS}
+        identity["azure_cli_account"] = get_azure_cli_account()
+    return identity
+
+
+class PersistentTokenStore():
+    # Stores access tokens in cache provider (e.g. OS keyring), so they can be reused by other processes.
+    def __init__(self, cache_provider: BaseCacheProvider):
+        self.cache_provider = cache_provider
+
+    def _get_name(self, key: Tuple) -> str:
+        key_hash = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        return f"token-{key_hash}"
+
+    def _token_to_dict(self, token: Any) -> Dict[str, Any]:
+        token_type = type(token)
+        if hasattr(token, "_asdict"):
+            fields = token._asdict()
+        else:
+            fields = {x: getattr(token, x) for x in TOKEN_FIELDS if hasattr(token, x)}
+        return {
+            "module": token_type.__module__,
+            "class": token_type.__qualname__,
+            "fields": fields
+        }
+
+    def _dict_to_token(self, value: Dict[str, Any]) -> Any:
+        if value["module"] not in PERSISTABLE_TOKEN_MODULES:
+            return None
+        token_type = getattr(import_module(value["module"]), value["class"])
+        return token_type(**value["fields"])
+
+    def get(self, key: Tuple) -> Any:
+        try:
+            value = self.cache_provider.get(self._get_name(key))
+            if value is None:
+                return None
+            return self._dict_to_token(value)
+        except Exception as ex:
+            logging.info(f"Cannot load access token from persistent token cache: {ex}")
+            return None
+
+    def set(self, key: Tuple, token: Any):
+        try:
+            value = self._token_to_dict(token)
+            if value["module"] not in PERSISTABLE_TOKEN_MODULES:
+                return
+            self.cache_provider.set(self._get_name(key), value)
+            self.cache_provider.flush_writes()
+        except Exception as ex:
+            logging.info(f"Cannot save access token to persistent token cache: {ex}")
+
+
+def create_persistent_token_store(provider_name: str) -> PersistentTokenStore:
+    if provider_name is None:
+        return None
+    provider_name = provider_name.lower()
+    if provider_name == "keyring":
+        from ..cache_providers import KeyringCache
+        return PersistentTokenStore(KeyringCache(service_name=TOKEN_CACHE_SERVICE_NAME))
+    if provider_name == "file.encrypted":
+        from ..cache_providers import EncryptedFileCache
+        return PersistentTokenStore(EncryptedFileCache(path=str(get_default_cache_dir().joinpath(f"{TOKEN_CACHE_SERVICE_NAME}.bin"))))
+    if provider_name == "sqlite":
+        from ..cache_providers import SQLiteCache
+        # access tokens are always stored encrypted, even if encryption of sqlite cache values can be disabled
+        return PersistentTokenStore(SQLiteCache(namespace=TOKEN_CACHE_SERVICE_NAME, encrypt=True))
+    raise Exception(f"Token cache provider not known: '{provider_name}'")
+
+
+class TokenCache():
+    # Keeps access tokens in memory until they expire.
+    # Tokens are considered expired a bit earlier, so they are not expiring while being used.
+    # If persistent store is provided, tokens are also shared with other processes.
+    def __init__(self, expiration_margin: int = 300, persistent_store: PersistentTokenStore = None):
+        self.expiration_margin = expiration_margin
+        self.persistent_store = persistent_store
+        self.tokens = dict()    # type: Dict[Tuple, Any]
+        self.locks = dict()     # type: Dict[Tuple, threading.Lock]
+        self.lock = threading.Lock()
+
+    def _is_valid(self, token: Any) -> bool:
+        expires_on = getattr(token, "expires_on", None)
+        if expires_on is None:
+            return False
+        return expires_on - self.expiration_margin > time.time()
+
+    def get(self, key: Tuple) -> Any:
+        token = self.tokens.get(key)
+        if ((token is None) or not(self._is_valid(token))) and (self.persistent_store is not None):
+            # token could be already refreshed by another process
+            token = self.persistent_store.get(key)
+            if token is not None:
+                self.tokens[key] = token
+        if (token is not None) and self._is_valid(token):
+            return token
+        return None
+
+    def set(self, key: Tuple, token: Any):
+        self.tokens[key] = token
+        if (self.persistent_store is not None) and self._is_valid(token):
+            self.persistent_store.set(key, token)
+
+    def get_or_fetch(self, key: Tuple, fetch: Callable[[], Any]) -> Any:
+        with profiler.span("access token", "auth") as span:
+            token = self.get(key)
+            if token is not None:
+                span.set(hit=True)
+                return token
+            with self.lock:
+                key_lock = self.locks.setdefault(key, threading.Lock())
+            # concurrent requests for the same token wait for the first one, instead of fetching it again
+            with key_lock:
+                token = self.get(key)
+                span.set(hit=token is not None)
+                if token is None:
+                    token = fetch()
+                    self.set(key, token)
+            return token
+
+
+class CachedTokenCredential():
+    # Wraps credential object (e.g. azure-identity credential) and returns cached tokens until they expire.
+    # All wrappers with the same credential_key share tokens.
+    def __init__(self, credential: Any, token_cache: TokenCache, credential_key: str):
+        self.credential = credential
+        self.token_cache = token_cache
+        self.credential_key = credential_key
+        # detected when credential is created, so it is up to date for every resolution
+        self.identity_key = get_canonical_hash(get_credential_identity(credential))
+
+    def _get_token_key(self, method_name: str, scopes: Tuple[str], kwargs: Dict[str, Any]) -> Tuple:
+        return (self.credential_key, self.identity_key, method_name, scopes, repr(sorted(kwargs.items())))
+
+    def get_token(self, *scopes: str, **kwargs) -> Any:
+        return self.token_cache.get_or_fetch(
+            self._get_token_key("get_token", scopes, kwargs),
+            lambda: self.credential.get_token(*scopes, **kwargs)
+        )
+
+    def _get_token_info(self, *scopes: str, **kwargs) -> Any:
+        return self.token_cache.get_or_fetch(
+            self._get_token_key("get_token_info", scopes, kwargs),
+            lambda: self.credential.get_token_info(*scopes, **kwargs)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "get_token_info" and hasattr(self.credential, name):
+            # exposed only if wrapped credential supports it, since SDK clients check if this method exists
+            return self._get_token_info
+        # delegate all other attributes (e.g. close) to wrapped credential
+        return getattr(self.credential, name)
+
+    def __enter__(self):
+        self.credential.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self.credential.__exit__(*args)
@@ -1,9 +1,9 @@
 import os
-from tabulate import tabulate
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 from pydantic import BaseModel
-from typing import List, Any, Dict, Type
-from azure.identity import DefaultAzureCredential, AzureCliCredential
+from typing import List, Any, Dict, Type, Callable, Iterable
 
 
 def obj_to_dict(item: Any) -> Dict:
@@ -15,7 +15,19 @@ def obj_to_dict(item: Any) -> Dict:
         item_dict = item.__dict__
     return item_dict
 
+def map_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int = None) -> List[Any]:
+    # returns results in the same order as items
+    # all items are processed, even if some of them fail - the first error (in items order) is raised afterwards
+    items = list(items)
+    if (max_workers is None) or (max_workers <= 1) or (len(items) <= 1):
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        # items are processed in copy of current context (e.g. with active client pool)
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+    return [future.result() for future in futures]
+
 def print_table(items: List[Any], fields: List[str], headers: List[str], tablefmt:str = "pretty", sort_by_field_index: int = None) -> str:
+    from tabulate import tabulate
     table = []
     for item in items:
         item_dict = obj_to_dict(item)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+import pytest
+
+from safe_env import agent
+
+
+REFRESH_RELEASED = threading.Event()
+REFRESHED_VALUES = []
+
+
+def get_env_value(name: str):
+    # blocks background refresh until the test releases it
+    REFRESH_RELEASED.wait(5)
+    REFRESHED_VALUES.append(os.environ.get(name))
+    return os.environ.get(name)
+
+
+@pytest.fixture
+def agent_server(tmp_path):
+    socket_path = tmp_path.joinpath("agent", "agent.sock")
+    server = agent.AgentServer(socket_path)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while agent.try_send_request({"command": "status"}, socket_path) is None:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    yield server
+    if agent.try_send_request({"command": "stop"}, socket_path) is not None:
+        thread.join(5)
+
+
+@pytest.mark.skipif(not(agent.is_agent_supported()), reason="Unix domain sockets are not supported")
+def test_agent(agent_server, simple_env):
+    (working_dir, config_dir) = simple_env
+    socket_path = agent_server.socket_path
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+    assert os.stat(socket_path.parent).st_mode & 0o777 == 0o700
+
+    request = agent.create_resolve_request("activate", ["dev"], config_dir)
+    for _ in range(2):
+        response = agent.send_request(request, socket_path)
+        assert response["envs"] == {"a": "1", "b": "2", "c": "3", "a1": "1", "b2": "2", "d": "4"}
+    response = agent.send_request(agent.create_resolve_request("resolve", ["base"], config_dir), socket_path)
+    assert "a: 1" in response["yaml"]
+
+    # environment managers are kept warm between requests
+    status = agent.send_request({"command": "status"}, socket_path)
+    assert (status["processed_requests"], len(agent_server.app_contexts)) == (3, 1)
+
+    with pytest.raises(Exception, match="Environment 'missing' cannot be found"):
+        agent.send_request(agent.create_resolve_request("activate", ["missing"], config_dir), socket_path)
+
+    agent.send_request({"command": "stop"}, socket_path)
+    deadline = time.time() + 5
+    while socket_path.exists():
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert agent.try_send_request({"command": "status"}, socket_path) is None
+
+
+@pytest.mark.skipif(not(agent.is_agent_supported()), reason="Unix domain sockets are not supported")
+def test_agent_local_resolution(agent_server, simple_env, tmp_path):
+    socket_path = agent_server.socket_path
+    config_dir = tmp_path.joinpath("envs")
+    config_dir.mkdir()
+    config_dir.joinpath("interactive.yaml").write_text(
+        "secrets:\n"
+        "  credential: ${se.call:azure.identity.DeviceCodeCredential}\n"
+        "envs:\n"
+        "  A: ${secrets.credential}\n"
+    )
+
+    # agent cannot ask user to sign in
+    request = agent.create_resolve_request("activate", ["interactive"], config_dir)
+    with pytest.raises(agent.LocalResolutionRequired, match="Interactive authentication is disabled"):
+        agent.send_request(request, socket_path)
+    assert agent.try_send_request(request, socket_path) is None
+
+    # requests are not queued behind long-running request of another client
+    (working_dir, simple_config_dir) = simple_env
+    request = agent.create_resolve_request("activate", ["dev"], simple_config_dir)
+    agent_server.busy_timeout = 0.1
+    with agent_server.lock:
+        assert agent.try_send_request(request, socket_path) is None
+        # client does not wait for agent response forever
+        agent_server.busy_timeout = 5
+        assert agent.try_send_request(request, socket_path, timeout=0.1) is None
+    assert agent.try_send_request(request, socket_path)["envs"]["a"] == "1"
+
+
+def write_plugin_env(config_dir, value: str):
+    plugins_dir = config_dir.joinpath("plugins")
+    plugins_dir.mkdir(parents=True, exist_ok=True)
+    plugin_path = plugins_dir.joinpath("__init__.py")
+    plugin_path.write_text(f"def get_value():\n    return {value!r}\n")
+    # make sure modification time changes even on file systems with coarse timestamps
+    stat = plugin_path.stat()
+    os.utime(plugin_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    config_dir.joinpath("dev.yaml").write_text("envs:\n  VALUE: ${se.call:_plugins_.get_value}\n")
+
+
+@pytest.mark.skipif(not(agent.is_agent_supported()), reason="Unix domain sockets are not supported")
+def test_agent_plugins_of_config_dirs(agent_server, tmp_path):
+    socket_path = agent_server.socket_path
+    config_dirs = [tmp_path.joinpath("d1", "envs"), tmp_path.joinpath("d2", "envs")]
+    for index, config_dir in enumerate(config_dirs):
+        write_plugin_env(config_dir, f"v{index + 1}")
+
+    def activate(config_dir):
+        return agent.send_request(agent.create_resolve_request("activate", ["dev"], config_dir), socket_path)["envs"]["VALUE"]
+
+    # plugins of one config dir do not replace plugins of another
+    assert [activate(config_dirs[0]), activate(config_dirs[1]), activate(config_dirs[0])] == ["v1", "v2", "v1"]
+    # edited plugins are loaded again
+    write_plugin_env(config_dirs[0], "v1-changed")
+    assert [activate(config_dirs[0]), activate(config_dirs[1])] == ["v1-changed", "v2"]
+
+
+@pytest.mark.skipif(not(agent.is_agent_supported()), reason="Unix domain sockets are not supported")
+def test_agent_background_refresh_in_client_context(agent_server, tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from safe_env.cache_providers import BaseCacheProvider, MemoryCache
+    socket_path = agent_server.socket_path
+    config_dir = tmp_path.joinpath("envs")
+    config_dir.mkdir()
+    config_dir.joinpath("dev.yaml").write_text(
+        "secrets:\n"
+        "  value:\n"
+        "    value: ${se.call:tests.test_agent.get_env_value}\n"
+        "    kwargs:\n"
+        "      name: TEST_AGENT_CLIENT\n"
+        "    cache:\n"
+        "      memory:\n"
+        "        name: value\n"
+        "        provider: safe_env.cache_providers.MemoryCache\n"
+        "        ttl: 10\n"
+        "        stale_while_revalidate: 60\n"
+        "        init_params:\n"
+        "          kwargs:\n"
+        "            namespace: test_agent_background_refresh\n"
+        "envs:\n"
+        "  VALUE: ${secrets.value.value}\n"
+    )
+    cache = MemoryCache(namespace="test_agent_background_refresh")
+    cache.set("value", BaseCacheProvider.wrap_value("stale", time.time() - 15))
+    REFRESH_RELEASED.clear()
+    REFRESHED_VALUES.clear()
+
+    # agent runs in the same process, so environment of the client is set only in the request
+    monkeypatch.delenv("TEST_AGENT_CLIENT", raising=False)
+    request = agent.create_resolve_request("activate", ["dev"], config_dir)
+    request["env"]["TEST_AGENT_CLIENT"] = "client1"
+    # client gets stale value without waiting for refresh
+    assert agent.send_request(request, socket_path)["envs"]["VALUE"] == "stale"
+    # refresh runs with environment of the client, that started it, and is finished before the next request
+    REFRESH_RELEASED.set()
+    assert agent.send_request(request, socket_path)["envs"]["VALUE"] == "client1"
+    assert REFRESHED_VALUES == ["client1"]
@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from benchmarks.generator import SCALES, generate_config_tree
+from benchmarks.run import run_benchmarks, create_report, compare_reports
+
+
+def test_benchmarks_smoke(tmp_path: Path):
+    config_dir = tmp_path.joinpath("envs")
+    scale = SCALES["smoke"]
+    names = generate_config_tree(config_dir, scale)
+    assert len(names) == scale.environments
+
+    results = run_benchmarks(config_dir, scale, repeats=1, include_cli=False)
+    names = [x["name"] for x in results]
+    assert "load.deep_chain.cold" in names
+    assert "resolve.calls.cold_cache.workers8" in names
+    assert all(x["median_ms"] >= 0 for x in results)
+
+    report = create_report("smoke", scale, results)
+    assert compare_reports(report, report, max_slowdown=1.5) == []
+    baseline = dict(report, results=[dict(x, median_ms=x["median_ms"] / 10) for x in results])
+    assert len(compare_reports(report, baseline, max_slowdown=1.5)) > 0
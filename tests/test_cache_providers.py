@@ -0,0 +1,166 @@
+import time
+import pytest
+
+from safe_env.cache_providers import MemoryCache
+
+
+def test_memory_cache_lru():
+    cache = MemoryCache(namespace="test_memory_cache_lru", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" is least recently used
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    cache.delete("a")
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 1, "bytes": cache.stats()["bytes"], "hits": 3, "misses": 2, "evictions": 1}
+
+
+def test_memory_cache_max_bytes_and_ttl():
+    cache = MemoryCache(namespace="test_memory_cache_max_bytes", max_bytes=1000, ttl=0.05)
+    cache.set("a", "x" * 400)
+    cache.set("b", "y" * 400)
+    cache.set("c", "z" * 400)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    cache.set("big", "x" * 2000)
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] <= 1000
+    time.sleep(0.1)
+    assert cache.get("c") is None
+
+
+def test_memory_cache_namespaces():
+    MemoryCache(namespace="test_ns1").set("a", 1)
+    assert MemoryCache(namespace="test_ns1").get("a") == 1
+    assert MemoryCache(namespace="test_ns2").get("a") is None
+
+
+def test_memory_cache_limits_shared_by_namespace():
+    cache = MemoryCache(namespace="test_memory_cache_limits", max_entries=10)
+    for name in "abcd":
+        cache.set(name, name)
+    # the strictest limit of instances using the namespace applies to all of them
+    strict_cache = MemoryCache(namespace="test_memory_cache_limits", max_entries=2)
+    assert cache.stats()["entries"] == 2
+    cache.set("e", "e")
+    assert [cache.get(name) for name in "cde"] == [None, "d", "e"]
+    assert strict_cache.stats()["entries"] == 2
+
+
+def test_encrypted_file_cache(tmp_path, monkeypatch):
+    from cryptography.fernet import Fernet
+    from safe_env.cache_providers import EncryptedFileCache
+    from safe_env.cache_providers.encrypted_file_cache import EncryptedFile
+
+    monkeypatch.setenv("SAFE_ENV_FILE_CACHE_KEY", Fernet.generate_key().decode("utf-8"))
+    path = tmp_path.joinpath("cache", "cache.bin")
+    cache = EncryptedFileCache(path=str(path))
+    cache.set("a", {"secret": "value-a"})
+    cache.set_many({"b": "value-b", "c": "value-c"})
+    # changes are written once, when flushed
+    assert not(path.exists())
+    # instances using the same file share its content
+    assert EncryptedFileCache(path=str(path)).get_many(["a", "b", "x"]) == {"a": {"secret": "value-a"}, "b": "value-b", "x": None}
+    cache.flush_writes()
+    assert b"value-a" not in path.read_bytes()
+    assert (path.stat().st_mode & 0o777) == 0o600
+
+    # changes made by another process are merged on write
+    other_process_file = EncryptedFile(path, cache.file.fernet)
+    other_process_file.update(values={"d": '"value-d"'})
+    other_process_file.flush_writes()
+    cache.delete("c")
+    cache.flush_writes()
+    other_process_file._read()
+    assert sorted(other_process_file.entries) == ["a", "b", "d"]
+
+    # file, that cannot be decrypted, is treated as empty
+    other_key_file = EncryptedFile(path, Fernet(Fernet.generate_key()))
+    assert other_key_file.get("a") is None
+
+
+def test_encrypted_file_cache_written_once_per_resolution(tmp_path, monkeypatch):
+    from cryptography.fernet import Fernet
+    from safe_env.cache_providers.encrypted_file_cache import EncryptedFile
+    from omegaconf import OmegaConf
+    from safe_env.envmanager import EnvironmentManager
+
+    monkeypatch.setenv("SAFE_ENV_FILE_CACHE_KEY", Fernet.generate_key().decode("utf-8"))
+    writes = []
+    write = EncryptedFile._write
+    monkeypatch.setattr(EncryptedFile, "_write", lambda self: writes.append(self.path) or write(self))
+    path = tmp_path.joinpath("cache.bin")
+    config = OmegaConf.create("\n".join(f"""
+n{index}:
+  value: ${{se.call:json.loads}}
+  args:
+    - '"v{index}"'
+  cache:
+    file:
+      name: n{index}
+      provider: ${{se.cache:file.encrypted}}
+      init_params:
+        kwargs:
+          path: {path}
+""" for index in range(10)), flags={"allow_objects": True})
+    config = EnvironmentManager().resolve(config)
+    assert [config[f"n{index}"].value for index in range(10)] == [f"v{index}" for index in range(10)]
+    assert writes == [path]
+
+
+def test_sqlite_cache(tmp_path):
+    from safe_env.cache_providers import SQLiteCache
+
+    path = tmp_path.joinpath("cache", "cache.db")
+    cache = SQLiteCache(path=str(path), namespace="ns1", encrypt=False)
+    cache.set("a", {"secret": "value-a"})
+    cache.set_many({"b": "value-b", "c": "value-c"})
+    cache.set("b", "value-b2")
+    assert (path.stat().st_mode & 0o777) == 0o600
+    assert SQLiteCache(path=str(path), namespace="ns1", encrypt=False).get_many(["a", "b", "x"]) == {"a": {"secret": "value-a"}, "b": "value-b2", "x": None}
+    assert SQLiteCache(path=str(path), namespace="ns2", encrypt=False).get("a") is None
+
+    cache.delete_many(["a", "c"])
+    assert cache.get_many(["a", "b", "c"]) == {"a": None, "b": "value-b2", "c": None}
+
+    expiring_cache = SQLiteCache(path=str(path), namespace="ns1", ttl=0.05, encrypt=False)
+    expiring_cache.set("d", "value-d")
+    assert expiring_cache.get("d") == "value-d"
+    time.sleep(0.1)
+    assert expiring_cache.get("d") is None
+
+
+def test_sqlite_cache_encrypted_by_default(tmp_path, monkeypatch):
+    from cryptography.fernet import Fernet
+    from safe_env.cache_providers import SQLiteCache
+
+    monkeypatch.setenv("SAFE_ENV_FILE_CACHE_KEY", Fernet.generate_key().decode("utf-8"))
+    path = str(tmp_path.joinpath("cache.db"))
+    cache = SQLiteCache(path=path)
+    cache.set_many({"a": "value-a", "b": "value-b"})
+    assert SQLiteCache(path=path).get("a") == "value-a"
+    stored_value = cache._get_connection().execute("SELECT value FROM cache_entries WHERE name = 'a'").fetchone()[0]
+    assert "value-a" not in stored_value
+    # values stored with another key or unencrypted are treated as missing
+    SQLiteCache(path=path, encrypt=False).set("c", "value-c")
+    assert SQLiteCache(path=path, key=Fernet.generate_key().decode("utf-8")).get_many(["a", "b"]) == {"a": None, "b": None}
+    assert cache.get_many(["a", "c"]) == {"a": "value-a", "c": None}
+
+
+def test_sqlite_cache_concurrent_writes(tmp_path):
+    import threading
+    from cryptography.fernet import Fernet
+    from safe_env.cache_providers import SQLiteCache
+
+    cache = SQLiteCache(path=str(tmp_path.joinpath("cache.db")), encrypt=True, key=Fernet.generate_key().decode("utf-8"))
+    threads = [threading.Thread(target=cache.set_many, args=({f"{i}-{j}": j for j in range(20)},)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.get_many([f"{i}-19" for i in range(4)]) == {f"{i}-19": 19 for i in range(4)}
+    stored_value = cache._get_connection().execute("SELECT value FROM cache_entries WHERE name = '0-19'").fetchone()[0]
+    assert stored_value != "19"
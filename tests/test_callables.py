@@ -0,0 +1,124 @@
+import threading
+import pytest
+
+from safe_env.resolvers import callables_azure
+from safe_env.clientpool import ClientPool
+
+
+class FakeSecret():
+    def __init__(self, name: str):
+        self.value = f"{name}-value"
+
+
+class FakeSecretClient():
+    barrier = None
+
+    def __init__(self, vault_url: str, credential):
+        self.vault_url = vault_url
+
+    def get_secret(self, name: str, version: str = None):
+        if self.barrier is not None:
+            self.barrier.wait()
+        if name == "missing":
+            raise ValueError(name)
+        return FakeSecret(name)
+
+
+@pytest.fixture
+def fake_secret_client(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(callables_azure, "SecretClient", FakeSecretClient)
+    monkeypatch.setattr(FakeSecretClient, "barrier", None)
+    return FakeSecretClient
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_get_azure_key_vault_secrets(fake_secret_client, max_workers):
+    if max_workers > 1:
+        # fails if secrets are retrieved sequentially
+        fake_secret_client.barrier = threading.Barrier(3, timeout=5)
+    names = ["c", "a", "b"]
+    result = callables_azure.get_azure_key_vault_secrets("https://kv", None, names, max_workers=max_workers)
+    assert list(result.items()) == [("c", "c-value"), ("a", "a-value"), ("b", "b-value")]
+
+
+def test_get_azure_key_vault_secrets_error(fake_secret_client):
+    with pytest.raises(ValueError, match="missing"):
+        callables_azure.get_azure_key_vault_secrets("https://kv", None, ["a", "missing", "b"], max_workers=3)
+
+
+def test_clients_shared_via_client_pool(fake_secret_client, monkeypatch: pytest.MonkeyPatch):
+    created_clients = []
+    monkeypatch.setattr(FakeSecretClient, "close", lambda self: None, raising=False)
+    monkeypatch.setattr(FakeSecretClient, "get_secret", lambda self, name: created_clients.append(self) or FakeSecret(name))
+    credential = object()
+    other_credential = object()
+
+    pool = ClientPool()
+    pool.set_as_active_pool()
+    try:
+        callables_azure.get_azure_key_vault_secrets("https://kv", credential, ["a"])
+        callables_azure.get_azure_key_vault_secrets("https://kv", credential, ["b"])
+        callables_azure.get_azure_key_vault_secrets("https://kv", other_credential, ["c"])
+    finally:
+        ClientPool.reset_active_pool()
+        pool.close()
+    assert created_clients[0] is created_clients[1]
+    assert created_clients[0] is not created_clients[2]
+
+
+def test_active_client_pool_per_context():
+    import threading
+    from safe_env import utils
+
+    pool = ClientPool()
+    token = pool.set_as_active_pool()
+    other_pools = []
+    def use_other_pool():
+        # pool of another thread is not visible, and resetting own pool does not reset it
+        other_pools.append(ClientPool.get_active_pool())
+        other_token = ClientPool().set_as_active_pool()
+        other_pools.append(ClientPool.get_active_pool())
+        ClientPool.reset_active_pool(other_token)
+    try:
+        thread = threading.Thread(target=use_other_pool)
+        thread.start()
+        thread.join()
+        assert other_pools[0] is None and other_pools[1] not in [None, pool]
+        assert ClientPool.get_active_pool() is pool
+        # tasks of executors use pool of the caller
+        assert utils.map_concurrently(lambda _: ClientPool.get_active_pool(), range(4), max_workers=4) == [pool] * 4
+    finally:
+        ClientPool.reset_active_pool(token)
+    assert ClientPool.get_active_pool() is None
+
+
+def test_get_keeper_secrets_uses_record_index(monkeypatch: pytest.MonkeyPatch):
+    from types import SimpleNamespace
+    from keepercommander.api import KeeperParams
+    from safe_env.resolvers import callables_keeper
+
+    records = {
+        "uid1": SimpleNamespace(title="First", to_dictionary=lambda: {"title": "First"}),
+        "uid2": SimpleNamespace(title="Second", to_dictionary=lambda: {"title": "Second"}),
+    }
+    loaded_uids = []
+    def get_record(params, uid):
+        loaded_uids.append(uid)
+        return records[uid]
+    monkeypatch.setattr(callables_keeper.api, "get_record", get_record)
+    monkeypatch.setattr(
+        callables_keeper.subfolder,
+        "try_resolve_path",
+        lambda params, path: (SimpleNamespace(uid="folder"), path.split("/")[-1])
+    )
+    login_params = KeeperParams()
+    login_params.subfolder_record_cache = {"folder": ["uid1", "uid2"]}
+
+    result = callables_keeper.get_keeper_secrets(login_params, ["f/first", "f/SECOND"])
+    result.update(callables_keeper.get_keeper_secrets(login_params, ["f/Second"]))
+    assert result == {"f/first": {"title": "First"}, "f/SECOND": {"title": "Second"}, "f/Second": {"title": "Second"}}
+    # all records in folder are loaded only once to build index
+    assert sorted(loaded_uids) == ["uid1", "uid1", "uid2", "uid2", "uid2"]
+
+    with pytest.raises(Exception, match="Cannot retrieve Keeper Record UID for 'f/third'"):
+        callables_keeper.get_keeper_secrets(login_params, ["f/third"])
@@ -0,0 +1,180 @@
+import re
+import random
+import os
+from pathlib import Path
+import pytest
+
+from safe_env.envmanager import EnvironmentManager
+
+
+@pytest.fixture
+def envman(simple_env):
+    (working_dir, config_dir) = simple_env
+    envman = EnvironmentManager()
+    envman.load_from_folder(Path(config_dir))
+    return envman
+
+
+def test_yaml_parsed_once(envman, monkeypatch: pytest.MonkeyPatch):
+    parsed_files = []
+    parse_yaml = envman._parse_yaml
+    def do_parse_yaml(file_path):
+        parsed_files.append(str(file_path))
+        return parse_yaml(file_path)
+    monkeypatch.setattr(envman, "_parse_yaml", do_parse_yaml)
+
+    envman.load(["dev", "local"])
+    envman.load(["dev", "local"])
+    assert sorted(parsed_files) == sorted(str(envman.get(x).path) for x in ["base", "dev", "local"])
+
+
+def test_yaml_reparsed_when_changed(tmp_path):
+    env_path = tmp_path.joinpath("env.yaml")
+    env_path.write_text("envs:\n  a: 1\n")
+    envman = EnvironmentManager()
+    envman.load_from_folder(tmp_path)
+    assert envman.get_env_variables(envman.load(["env"])) == {"a": "1"}
+
+    env_path.write_text("envs:\n  a: 22\n")
+    # make sure modification time changes even on file systems with coarse timestamps
+    stat = env_path.stat()
+    os.utime(env_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert envman.get_env_variables(envman.load(["env"])) == {"a": "22"}
+
+
+def test_config_cache(simple_env, tmp_path, monkeypatch: pytest.MonkeyPatch):
+    (working_dir, config_dir) = simple_env
+    def do_load(names):
+        envman = EnvironmentManager(config_cache_dir=tmp_path)
+        envman.load_from_folder(Path(config_dir))
+        envman.load_plugins(Path(config_dir).joinpath("plugins"))
+        return envman, envman.load(names)
+
+    envman, config = do_load(["dev", "local"])
+    expected_yaml = envman.raw_config_to_yaml(config)
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    def fail_merge(*args, **kwargs):
+        raise AssertionError("Merged configuration should be loaded from cache")
+    monkeypatch.setattr(EnvironmentManager, "get_merged_config", fail_merge)
+    envman, config = do_load(["dev", "local"])
+    assert envman.raw_config_to_yaml(config) == expected_yaml
+
+
+def test_config_cache_invalidated_when_changed(tmp_path):
+    config_dir = tmp_path.joinpath("envs")
+    config_dir.mkdir()
+    config_dir.joinpath("base.yaml").write_text("envs:\n  a: 1\n")
+    config_dir.joinpath("dev.yaml").write_text("depends_on:\n  - base\n")
+    def do_load():
+        envman = EnvironmentManager(config_cache_dir=tmp_path.joinpath("cache"))
+        envman.load_from_folder(config_dir)
+        return envman.get_env_variables(envman.load(["dev"]))
+
+    assert do_load() == {"a": "1"}
+    config_dir.joinpath("base.yaml").write_text("envs:\n  a: 2\n")
+    assert do_load() == {"a": "2"}
+
+
+def test_config_cache_skipped_for_non_string_keys(tmp_path):
+    config_dir = tmp_path.joinpath("envs")
+    config_dir.mkdir()
+    config_dir.joinpath("dev.yaml").write_text("ports:\n  80: http\n  443: https\nenvs:\n  a: ${ports.443}\n")
+    def do_load():
+        envman = EnvironmentManager(config_cache_dir=tmp_path.joinpath("cache"))
+        envman.load_from_folder(config_dir)
+        return envman.load(["dev"])
+
+    assert list(do_load().ports.keys()) == [80, 443]
+    assert list(do_load().ports.keys()) == [80, 443]
+    assert not(tmp_path.joinpath("cache").exists()) or list(tmp_path.joinpath("cache").glob("*.json")) == []
+
+
+def test_get_by_name_and_path(envman):
+    env_info = envman.get("dev")
+    assert env_info.name == "dev"
+    assert envman.get_by_path(env_info.path) is env_info
+    with pytest.raises(Exception, match="Environment 'unknown' cannot be found."):
+        envman.get("unknown")
+
+
+def test_lazy_discovery(simple_env, monkeypatch: pytest.MonkeyPatch):
+    (working_dir, config_dir) = simple_env
+    envman = EnvironmentManager()
+    envman.load_from_folder(Path(config_dir), lazy=True)
+    assert envman.env_info_list == []
+
+    config = envman.load(["dev1"])
+    assert sorted(x.name for x in envman.env_info_list) == ["base", "dev", "dev1"]
+    assert envman.get_env_variables(config)["d"] == "5"
+    with pytest.raises(Exception, match="Environment '../envs/dev' cannot be found."):
+        envman.get("../envs/dev")
+
+    assert sorted(x.name for x in envman.list()) == ["base", "dev", "dev1", "dev2", "local"]
+
+
+def get_reference_chain(graph, names, skip_dependency_loops):
+    # dependency chain as it was computed by recursive walk, before dependency graph was introduced
+    def walk(name, chain):
+        if name in chain:
+            if skip_dependency_loops:
+                return chain
+            raise Exception(f"Potential dependency loop detected. Environment name is already in dependency chain: '{name}'.")
+        chain.append(name)
+        for dep_name in reversed(graph[name]):
+            chain = walk(dep_name, chain)
+        return chain
+    chain = []
+    for name in reversed(names):
+        chain = walk(name, chain)
+    return list(reversed(chain))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_dependency_chain_same_as_recursive_walk(tmp_path, seed):
+    rnd = random.Random(seed)
+    names = [f"e{i}" for i in range(12)]
+    # mostly acyclic graphs with shared dependencies, some with loops
+    graph = dict()
+    for i, name in enumerate(names):
+        candidates = names[i + 1:] if rnd.random() < 0.7 else names
+        graph[name] = rnd.sample(candidates, k=rnd.randint(0, min(3, len(candidates))))
+    for name, dependencies in graph.items():
+        content = "envs:\n  a: 1\n" if not(dependencies) else "depends_on:\n" + "".join(f"  - {x}\n" for x in dependencies)
+        tmp_path.joinpath(f"{name}.yaml").write_text(content)
+    envman = EnvironmentManager()
+    envman.load_from_folder(tmp_path, lazy=True)
+
+    for requested in [rnd.sample(names, k=rnd.randint(1, 3)) for _ in range(5)]:
+        for skip_dependency_loops in [False, True]:
+            try:
+                expected = get_reference_chain(graph, requested, skip_dependency_loops)
+            except Exception as ex:
+                with pytest.raises(Exception, match=re.escape(str(ex))):
+                    envman.get_env_list_chain(requested, skip_dependency_loops)
+                continue
+            assert envman.get_env_list_chain(requested, skip_dependency_loops) == expected
+            # second call is served from cached chain
+            assert envman.get_env_list_chain(requested, skip_dependency_loops) == expected
+
+
+def test_dependency_chain_cached_until_changed(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    tmp_path.joinpath("base.yaml").write_text("envs:\n  a: 1\n")
+    tmp_path.joinpath("extra.yaml").write_text("envs:\n  b: 1\n")
+    dev_path = tmp_path.joinpath("dev.yaml")
+    dev_path.write_text("depends_on:\n  - base\n")
+    envman = EnvironmentManager()
+    envman.load_from_folder(tmp_path)
+    assert envman.get_env_list_chain(["dev"]) == ["base", "dev"]
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError("Dependencies should not be loaded again")
+    with monkeypatch.context() as m:
+        m.setattr(envman.dependency_graph, "load_dependencies", fail_load)
+        assert envman.get_env_list_chain(["dev"]) == ["base", "dev"]
+
+    dev_path.write_text("depends_on:\n  - base\n  - extra\n")
+    # make sure modification time changes even on file systems with coarse timestamps
+    stat = dev_path.stat()
+    os.utime(dev_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert envman.get_env_list_chain(["dev"]) == ["base", "extra", "dev"]
@@ -0,0 +1,51 @@
+import sys
+import json
+import subprocess
+
+from safe_env.resolvers.lazyregistry import LazyRegistry, LazyReference
+from safe_env.resolvers.callables import KNOWN_CALLABLES
+from safe_env.resolvers.cache import KNOWN_CACHE_CLASSES
+
+
+HEAVY_MODULES = ["azure", "keepercommander", "fsspec", "tqdm", "keyring", "requests", "tabulate"]
+
+
+def get_loaded_heavy_modules(code: str, cwd=None):
+    # code is executed in new interpreter, so modules imported by other tests do not affect the result
+    script = code + f"\nimport sys, json\nprint(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY_MODULES!r}))))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cli_import_does_not_load_heavy_modules():
+    assert get_loaded_heavy_modules("import safe_env.cli") == []
+
+
+def test_resolve_without_sdk_callables_does_not_load_heavy_modules(simple_env):
+    (working_dir, config_dir) = simple_env
+    code = "\n".join([
+        "from pathlib import Path",
+        "from safe_env.envmanager import EnvironmentManager",
+        "envman = EnvironmentManager()",
+        f"envman.load_from_folder(Path({str(config_dir)!r}))",
+        "envman.resolve(envman.load(['dev']))"
+    ])
+    assert get_loaded_heavy_modules(code, cwd=str(working_dir)) == []
+
+
+def test_lazy_registry():
+    registry = LazyRegistry({"dumps": LazyReference("json.dumps")})
+    registry_copy = registry.copy()
+    registry_copy.update({"loads": json.loads})
+    assert registry_copy.get("dumps") is json.dumps
+    assert registry_copy.get("loads") is json.loads
+    assert registry_copy.get("missing") is None
+    # original registry is not changed by the copy
+    assert "loads" not in registry
+    assert isinstance(registry.entries["dumps"], LazyReference)
+
+
+def test_known_names_resolved():
+    for registry in [KNOWN_CALLABLES, KNOWN_CACHE_CLASSES]:
+        for name in registry.copy():
+            assert callable(registry.copy()[name])
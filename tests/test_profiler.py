@@ -0,0 +1,62 @@
+import os
+import json
+from pathlib import Path
+from omegaconf import OmegaConf
+
+from safe_env import api
+from safe_env.envmanager import EnvironmentManager
+from safe_env.profiler import Profiler
+
+
+def get_secret(name: str):
+    return f"secret-value-{name}"
+
+
+CONFIG_YAML = """
+a:
+  value: ${se.call:tests.test_profiler.get_secret}
+  kwargs:
+    name: a
+  cache:
+    local:
+      name: profiler-test-a
+      provider: ${se.cache:memory}
+      init_params:
+        kwargs:
+          namespace: profiler-test
+"""
+
+
+def test_call_nodes_profiled_without_values():
+    profiler = Profiler()
+    profiler.set_as_active_profiler()
+    try:
+        for _ in range(2):
+            EnvironmentManager().resolve(OmegaConf.create(CONFIG_YAML, flags={"allow_objects": True}))
+    finally:
+        Profiler.reset_active_profiler()
+
+    spans = profiler.to_dict()["spans"]
+    call_spans = [x for x in spans if x["name"] == "se.call"]
+    assert [x["attributes"]["callable"] for x in call_spans] == ["tests.test_profiler.get_secret"] * 2
+    assert [x["attributes"]["cache"] for x in call_spans] == [None, "local"]
+    assert [x["attributes"]["hit"] for x in spans if x["name"] == "cache get"] == [False, True]
+    assert len([x for x in spans if x["name"] == "source fetch"]) == 1
+    # resolved values are never recorded
+    for profile_format in ["table", "json", "chrome"]:
+        assert "secret-value" not in profiler.format(profile_format)
+
+
+def test_activate_profiler_hook(simple_env, monkeypatch):
+    (working_dir, config_dir) = simple_env
+    monkeypatch.chdir(working_dir)
+    # activate updates environment variables of the process
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    profiler = Profiler()
+    api.activate("dev", config_dir=Path(config_dir), profiler=profiler)
+    assert Profiler.get_active_profiler() is None
+
+    categories = set(x["category"] for x in profiler.to_dict()["spans"])
+    assert {"startup", "discovery", "parse", "chain", "merge", "resolve"} <= categories
+    trace = json.loads(profiler.format("chrome"))
+    assert all(x["ph"] == "X" and x["dur"] >= 0 for x in trace["traceEvents"])
@@ -0,0 +1,783 @@
+import os
+import time
+import threading
+from collections import namedtuple
+import pytest
+from omegaconf import OmegaConf
+
+from safe_env.envmanager import EnvironmentManager
+from safe_env.cache_providers import BaseCacheProvider
+from safe_env.resolvers.callgraph import CallGraph
+from safe_env.clientpool import ClientPool
+from safe_env.resolvers.backgroundrefresh import BACKGROUND_REFRESHES, wait_for_background_refreshes, finish_background_refreshes
+
+
+CALLS = []
+BARRIER = threading.Barrier(2, timeout=5)
+RELEASED = threading.Event()
+
+
+def record_call(name: str, value=None, wait: bool = False, blocked: bool = False):
+    if wait:
+        # fails if called sequentially
+        BARRIER.wait()
+    if blocked:
+        RELEASED.wait(5)
+    CALLS.append(name)
+    return {"name": name, "value": value}
+
+
+ACTIVE_POOLS = dict()
+
+
+def record_active_pool(name: str) -> str:
+    ACTIVE_POOLS[name] = ClientPool.get_active_pool()
+    return name
+
+
+def get_string(name: str) -> str:
+    CALLS.append(name)
+    return f"value-{name}"
+
+
+AccessToken = namedtuple("AccessToken", ["token", "expires_on"])
+
+
+class FakeCredential():
+    get_token_calls = []
+
+    def __init__(self, tenant_id: str = None):
+        self.tenant_id = tenant_id
+
+    def get_token(self, *scopes, **kwargs):
+        FakeCredential.get_token_calls.append(scopes)
+        return AccessToken(f"{self.tenant_id}-{len(FakeCredential.get_token_calls)}", time.time() + 3600)
+
+
+def get_token_value(credential, scope: str):
+    return credential.get_token(scope).token
+
+
+CUSTOM_AUTH_CLASSES = {
+    "fake": FakeCredential
+}
+
+
+@pytest.fixture
+def envman():
+    CALLS.clear()
+    BARRIER.reset()
+    return EnvironmentManager()
+
+
+def create_config(config_yaml: str):
+    return OmegaConf.create(config_yaml, flags={"allow_objects": True})
+
+
+CONFIG_YAML = """
+params:
+  prefix: p
+a:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: a
+    value: ${params.prefix}
+    wait: ${params.wait}
+b:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: name
+  kwargs:
+    name: b
+    wait: ${params.wait}
+c:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: c
+    value: ${a.value.value}
+envs:
+  A: ${a.value.name}
+  B: ${b.value}
+  C: ${c.value.value}
+"""
+
+
+def test_call_graph():
+    config = create_config(CONFIG_YAML)
+    call_graph = CallGraph(config)
+    levels = call_graph.get_resolution_levels()
+    assert [sorted(x.key for x in level) for level in levels] == [["a.value", "b.value"], ["c.value"]]
+
+
+def test_call_graph_unknown_dependencies():
+    config = create_config("""
+a:
+  value: ${se.call:x}
+  kwargs:
+    cred: ${creds.value}
+    custom: ${my.resolver:1}
+b:
+  value: ${se.call:x}
+  kwargs:
+    v: ${a.value.${params.name}}
+creds:
+  value: ${se.auth:azure.cli}
+  kwargs:
+    tenant_id: ${params.tenant_id}
+""")
+    call_graph = CallGraph(config)
+    nodes = {x.key: x for x in call_graph.nodes.values()}
+    assert nodes["a.value"].dependencies is None
+    assert nodes["b.value"].dependencies == {"a.value"}
+    assert call_graph.get_resolution_levels() == []
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_resolve(envman, max_workers):
+    config = create_config(CONFIG_YAML)
+    config.params.wait = max_workers > 1
+    config = envman.resolve(config, max_workers=max_workers)
+    assert envman.get_env_variables(config) == {"A": "a", "B": "b", "C": "p"}
+    assert sorted(CALLS) == ["a", "b", "c"]
+    assert CALLS[-1] == "c"
+
+
+def test_precomputed_nodes_sharing_params(envman, monkeypatch):
+    # config is accessed only on the main thread, worker threads run only the calls
+    config_access_threads = set()
+    def record_thread(func):
+        def wrapper(*args, **kwargs):
+            config_access_threads.add(threading.current_thread())
+            return func(*args, **kwargs)
+        return staticmethod(wrapper)
+    monkeypatch.setattr(OmegaConf, "select", record_thread(OmegaConf.select))
+    monkeypatch.setattr(OmegaConf, "to_container", record_thread(OmegaConf.to_container))
+    config = create_config("""
+params:
+  kwargs:
+    value: p
+    wait: True
+a:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: a
+    value: ${params.kwargs.value}
+    wait: ${params.kwargs.wait}
+b:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: value
+  kwargs:
+    name: b
+    value: ${params.kwargs.value}
+    wait: ${params.kwargs.wait}
+dependent:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: value
+  kwargs:
+    name: dependent
+    value: ${a.value.value}
+""")
+    config = envman.resolve(config, max_workers=4)
+    assert (config.a.value.value, config.b.value, config.dependent.value) == ("p", "p", "p")
+    assert sorted(CALLS) == ["a", "b", "dependent"]
+    assert config_access_threads == {threading.main_thread()}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_client_pool_active_in_precomputed_nodes(max_workers):
+    ACTIVE_POOLS.clear()
+    config = create_config("""
+a:
+  value: ${se.call:tests.test_resolvers.record_active_pool}
+  kwargs:
+    name: a
+b:
+  value: ${se.call:tests.test_resolvers.record_active_pool}
+  kwargs:
+    name: b
+""")
+    envman = EnvironmentManager()
+    config = envman.resolve(config, max_workers=max_workers)
+    assert (config.a.value, config.b.value) == ("a", "b")
+    # nodes computed by worker threads use client pool of the resolution
+    assert ACTIVE_POOLS["a"] is not None
+    assert ACTIVE_POOLS["a"] is ACTIVE_POOLS["b"]
+    assert ClientPool.get_active_pool() is None
+
+
+def test_tokens_shared_between_credentials():
+    FakeCredential.get_token_calls = []
+    envman = EnvironmentManager(load_known_callables_from_modules=["tests.test_resolvers"])
+    config = create_config("""
+creds:
+  value: ${se.auth:fake}
+  kwargs:
+    tenant_id: t1
+other_creds:
+  value: ${se.auth:fake}
+  kwargs:
+    tenant_id: t2
+envs:
+  A:
+    value: ${se.call:tests.test_resolvers.get_token_value}
+    kwargs:
+      credential: ${creds.value}
+      scope: s1
+  B:
+    value: ${se.call:tests.test_resolvers.get_token_value}
+    kwargs:
+      credential: ${creds.value}
+      scope: s1
+  C:
+    value: ${se.call:tests.test_resolvers.get_token_value}
+    kwargs:
+      credential: ${other_creds.value}
+      scope: s1
+""")
+    config = envman.resolve(config)
+    assert {k: v.value for k, v in config.envs.items()} == {"A": "t1-1", "B": "t1-1", "C": "t2-2"}
+    assert FakeCredential.get_token_calls == [("s1",), ("s1",)]
+
+
+class AzureCliCredential(FakeCredential):
+    pass
+
+
+def test_tokens_cached_per_identity(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    import json
+    from safe_env.resolvers.tokencache import TokenCache, CachedTokenCredential
+
+    FakeCredential.get_token_calls = []
+    monkeypatch.setenv("AZURE_CONFIG_DIR", str(tmp_path))
+    def az_login(user: str):
+        profile = {"subscriptions": [{"isDefault": True, "tenantId": "t", "user": {"name": user}}]}
+        tmp_path.joinpath("azureProfile.json").write_text(json.dumps(profile), encoding="utf-8-sig")
+
+    token_cache = TokenCache()
+    def get_token():
+        # credential with the same configuration is created by every resolution
+        return CachedTokenCredential(AzureCliCredential(), token_cache, "azure.cli").get_token("s1")
+
+    az_login("user1")
+    assert get_token() == get_token()
+    # tokens of previous account are not used after "az login" as another user
+    az_login("user2")
+    get_token()
+    assert len(FakeCredential.get_token_calls) == 2
+    # explicit tenant is part of identity
+    CachedTokenCredential(FakeCredential("t1"), token_cache, "fake").get_token("s1")
+    CachedTokenCredential(FakeCredential("t2"), token_cache, "fake").get_token("s1")
+    assert len(FakeCredential.get_token_calls) == 4
+
+
+def test_persistent_token_cache():
+    from azure.core.credentials import AccessToken as AzureAccessToken
+    from safe_env.cache_providers import MemoryCache
+    from safe_env.resolvers.tokencache import TokenCache, PersistentTokenStore
+
+    store = PersistentTokenStore(MemoryCache())
+    key = ("test_persistent_token_cache", "get_token", ("s1",), "[]")
+    fetched_tokens = []
+    def fetch():
+        fetched_tokens.append(AzureAccessToken("t", int(time.time()) + 3600))
+        return fetched_tokens[-1]
+
+    # another process is simulated by another token cache with the same persistent store
+    assert TokenCache(persistent_store=store).get_or_fetch(key, fetch).token == "t"
+    assert TokenCache(persistent_store=store).get_or_fetch(key, fetch).token == "t"
+    assert len(fetched_tokens) == 1
+
+    # expired tokens are fetched again
+    store.set(key, AzureAccessToken("expired", int(time.time()) + 10))
+    assert TokenCache(persistent_store=store).get_or_fetch(key, fetch).token == "t"
+    assert len(fetched_tokens) == 2
+
+
+def test_persistent_token_store_encrypted(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from azure.core.credentials import AccessToken as AzureAccessToken
+    from cryptography.fernet import Fernet
+    from safe_env.resolvers.tokencache import create_persistent_token_store
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("SAFE_ENV_FILE_CACHE_KEY", Fernet.generate_key().decode("utf-8"))
+    key = ("test_persistent_token_store_encrypted", "get_token", ("s1",), "[]")
+    create_persistent_token_store("sqlite").set(key, AzureAccessToken("secret-token", int(time.time()) + 3600))
+    assert create_persistent_token_store("sqlite").get(key).token == "secret-token"
+    # including write-ahead log
+    assert all(b"secret-token" not in x.read_bytes() for x in tmp_path.joinpath("safe-env").glob("cache.db*"))
+
+
+class CountingCache():
+    instances = []
+
+    def __init__(self, prefix: str = None):
+        self.prefix = prefix
+        self.values = dict()
+        self.calls = []
+        CountingCache.instances.append(self)
+
+    def get(self, name: str):
+        self.calls.append(("get", name))
+        return self.values.get(name)
+
+    def set(self, name: str, value):
+        self.calls.append(("set", name))
+        self.values[name] = value
+
+    def delete(self, name: str, scope: str = None):
+        self.calls.append(("delete", name, scope))
+
+
+def test_cache_providers_shared_between_nodes():
+    CountingCache.instances = []
+    envman = EnvironmentManager()
+    config_yaml = """
+a:
+  value: ${se.call:tests.test_resolvers.record_call}
+  kwargs:
+    name: a
+  cache:
+    local:
+      name: a
+      provider: tests.test_resolvers.CountingCache
+      init_params:
+        kwargs:
+          prefix: p
+b:
+  value: ${se.call:tests.test_resolvers.record_call}
+  kwargs:
+    name: b
+  cache:
+    local:
+      name: b
+      provider: tests.test_resolvers.CountingCache
+      init_params:
+        kwargs:
+          prefix: p
+      delete_params:
+        kwargs:
+          scope: s
+c:
+  value: ${se.call:tests.test_resolvers.record_call}
+  kwargs:
+    name: c
+  cache:
+    local:
+      name: c
+      provider: tests.test_resolvers.CountingCache
+      init_params:
+        kwargs:
+          prefix: other
+"""
+    envman.resolve(create_config(config_yaml))
+    # caches with the same provider configuration share provider instance
+    assert [x.prefix for x in CountingCache.instances] == ["p", "other"]
+    assert CountingCache.instances[0].calls == [("get", "a"), ("set", "a"), ("get", "b"), ("set", "b")]
+
+    envman.resolve(create_config(config_yaml), flush_caches=True)
+    assert CountingCache.instances[2].calls == [("delete", "a", None), ("delete", "b", "s")]
+
+
+class BulkCache(BaseCacheProvider):
+    values = dict()
+    calls = []
+
+    def __init__(self, store: str):
+        super().__init__(as_json=False)
+        self.store = store
+
+    def _get(self, name: str):
+        BulkCache.calls.append(("get", self.store, name))
+        return BulkCache.values.get((self.store, name))
+
+    def _set(self, name: str, value):
+        BulkCache.calls.append(("set", self.store, name))
+        BulkCache.values[(self.store, name)] = value
+
+    def _delete(self, name: str):
+        pass
+
+    def get_many(self, names, *args, **kwargs):
+        BulkCache.calls.append(("get_many", self.store, sorted(names)))
+        return {name: BulkCache.values.get((self.store, name)) for name in names}
+
+
+def test_cache_lookups_prefetched_in_batches():
+    BulkCache.values = {("local", "a"): "cached-a", ("remote", "b"): "cached-b"}
+    BulkCache.calls = []
+    nodes = []
+    for name in ["a", "b", "c"]:
+        nodes.append(f"""
+{name}:
+  value: ${{se.call:tests.test_resolvers.record_call}}
+  selector: name
+  kwargs:
+    name: {name}
+  cache:
+    1_local:
+      name: {name}
+      provider: tests.test_resolvers.BulkCache
+      init_params:
+        kwargs:
+          store: local
+    2_remote:
+      name: {name}
+      provider: tests.test_resolvers.BulkCache
+      init_params:
+        kwargs:
+          store: remote
+""")
+    config = create_config("".join(nodes) + """
+d:
+  value: ${se.call:tests.test_resolvers.record_call}
+  kwargs:
+    name: d
+  cache:
+    local:
+      name: ${c.value}
+      provider: tests.test_resolvers.BulkCache
+      init_params:
+        kwargs:
+          store: local
+""")
+    config = EnvironmentManager().resolve(config)
+    assert [config.a.value, config.b.value, config.c.value] == ["cached-a", "cached-b", "c"]
+    # cache key of node d depends on result of node c, so it is not prefetched
+    assert BulkCache.calls[:2] == [
+        ("get_many", "local", ["a", "b", "c"]),
+        ("get_many", "remote", ["b", "c"])
+    ]
+    assert sorted(BulkCache.calls[2:]) == [
+        ("get", "local", "c"),
+        ("set", "local", "b"),
+        ("set", "local", "c"),
+        ("set", "remote", "c")
+    ]
+
+
+def test_cache_ttl_and_stale_while_revalidate():
+    now = time.time()
+    BulkCache.values = {
+        ("local", "fresh"): BaseCacheProvider.wrap_value("cached", now - 5),
+        ("local", "stale"): BaseCacheProvider.wrap_value("cached", now - 15),
+        ("local", "expired"): BaseCacheProvider.wrap_value("cached", now - 100),
+        ("local", "legacy"): "cached",
+    }
+    BulkCache.calls = []
+    CALLS.clear()
+    config = create_config("\n".join(f"""
+{name}:
+  value: ${{se.call:tests.test_resolvers.record_call}}
+  selector: name
+  kwargs:
+    name: {name}
+    blocked: {str(name == "stale").lower()}
+  cache:
+    local:
+      name: {name}
+      provider: tests.test_resolvers.BulkCache
+      ttl: 10
+      stale_while_revalidate: 60
+      init_params:
+        kwargs:
+          store: local
+""" for name in ["fresh", "stale", "expired", "legacy"]))
+    RELEASED.clear()
+    config = EnvironmentManager().resolve(config)
+    assert {k: v.value for k, v in config.items()} == {"fresh": "cached", "stale": "cached", "expired": "expired", "legacy": "legacy"}
+    # resolution does not wait for refresh of stale value
+    assert BaseCacheProvider.unwrap_value(BulkCache.values[("local", "stale")])[0] == "cached"
+    RELEASED.set()
+    wait_for_background_refreshes()
+    assert sorted(CALLS) == ["expired", "legacy", "stale"]
+    for name in ["stale", "expired", "legacy"]:
+        value, cached_on = BaseCacheProvider.unwrap_value(BulkCache.values[("local", name)])
+        assert value == name
+        assert cached_on >= now
+
+
+def test_stale_while_revalidate_detached(monkeypatch):
+    BulkCache.values = {
+        ("local", "stale"): BaseCacheProvider.wrap_value("cached", time.time() - 15),
+    }
+    BulkCache.calls = []
+    CALLS.clear()
+    config = create_config("""
+stale:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: name
+  kwargs:
+    name: stale
+  cache:
+    local:
+      name: stale
+      provider: tests.test_resolvers.BulkCache
+      ttl: 10
+      stale_while_revalidate: 60
+      init_params:
+        kwargs:
+          store: local
+""")
+    # refreshes are run synchronously, where detached process cannot be forked
+    monkeypatch.delattr(os, "fork", raising=False)
+    monkeypatch.setattr(BACKGROUND_REFRESHES, "detached", True)
+    config = EnvironmentManager().resolve(config)
+    assert config.stale.value == "cached"
+    # refresh is not started until the command exits
+    assert CALLS == [] and BACKGROUND_REFRESHES.detached_refreshes
+    finish_background_refreshes()
+    assert CALLS == ["stale"]
+    assert BACKGROUND_REFRESHES.detached_refreshes == []
+    assert BaseCacheProvider.unwrap_value(BulkCache.values[("local", "stale")])[0] == "stale"
+
+
+class StringCache(BaseCacheProvider):
+    # stores only strings, like OS keyring
+    values = dict()
+
+    def __init__(self):
+        super().__init__(as_json=False)
+
+    def _get(self, name: str):
+        return StringCache.values.get(name)
+
+    def _set(self, name: str, value):
+        assert isinstance(value, str)
+        StringCache.values[name] = value
+
+    def _delete(self, name: str):
+        StringCache.values.pop(name, None)
+
+
+def test_cache_ttl_of_providers_storing_strings():
+    StringCache.values = dict()
+    CALLS.clear()
+    config_yaml = """
+a:
+  value: ${se.call:tests.test_resolvers.get_string}
+  kwargs:
+    name: a
+  cache:
+    local:
+      name: a
+      provider: tests.test_resolvers.StringCache
+      ttl: 10
+"""
+    for expected_calls in [["a"], ["a"]]:
+        config = EnvironmentManager().resolve(create_config(config_yaml))
+        assert config.a.value == "value-a"
+        assert CALLS == expected_calls
+    assert BaseCacheProvider.unwrap_value(StringCache.values["a"])[0] == "value-a"
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_identical_calls_coalesced(envman, max_workers):
+    config = create_config("""
+a:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: name
+  kwargs:
+    name: x
+    value: v
+b:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: value
+  kwargs:
+    value: v
+    name: x
+c:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: x
+    value: v
+d:
+  value: ${se.call:tests.test_resolvers.record_call}
+  kwargs:
+    name: y
+""")
+    config = envman.resolve(config, max_workers=max_workers)
+    assert (config.a.value, config.b.value, config.c.value.name, config.d.value["name"]) == ("x", "v", "x", "y")
+    assert sorted(CALLS) == ["x", "y"]
+
+
+def test_selectors_of_coalesced_calls_applied_in_one_pass(envman, monkeypatch: pytest.MonkeyPatch):
+    from safe_env.resolvers import resolvermanager
+    compiled_selectors = []
+    compile_selector = resolvermanager.compile_selector
+    monkeypatch.setattr(resolvermanager, "compile_selector", lambda x: compiled_selectors.append(x) or compile_selector(x))
+    config = create_config("""
+a:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: "[name, value] | join('-', @)"
+  kwargs:
+    name: x
+    value: v
+b:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: name
+  kwargs:
+    name: x
+    value: v
+c:
+  value: ${se.call:tests.test_resolvers.record_call}
+  selector: name
+  kwargs:
+    name: y
+""")
+    config = envman.resolve(config)
+    assert (config.a.value, config.b.value, config.c.value) == ("x-v", "x", "y")
+    assert compiled_selectors == ["{s0: ([name, value] | join('-', @)), s1: (name)}", "name"]
+
+
+def get_arg_types(items, options):
+    return [type(items).__name__, type(options).__name__, options.x]
+
+
+def test_call_params_validated_from_plain_containers(envman, monkeypatch: pytest.MonkeyPatch):
+    from safe_env.resolvers.resolvermanager import CallResolverParams
+    validated = []
+    model_validate = CallResolverParams.model_validate
+    monkeypatch.setattr(CallResolverParams, "model_validate", lambda obj: validated.append(obj) or model_validate(obj))
+    config = create_config("""
+a:
+  value: ${se.delayed:tests.test_resolvers.get_arg_types}
+  kwargs:
+    items: [1, 2]
+    options:
+      x: 1
+b:
+  - value: ${se.call:tests.test_resolvers.get_arg_types}
+    kwargs:
+      items: ${a.kwargs.items}
+      options: ${a.kwargs.options}
+""")
+    config = envman.resolve(config)
+    # parameters are validated from plain containers, plugins receive OmegaConf containers as before
+    assert list(config.b[0].value) == ["ListConfig", "DictConfig", 1]
+    assert config.a.value.value == ["ListConfig", "DictConfig", 1]
+    assert [type(x) for x in validated] == [dict, dict]
+    resolver_manager = envman.resolver_manager
+    assert resolver_manager._is_builtin_callable(resolver_manager.known_callables["get_keyring_secrets"])
+    assert not(resolver_manager._is_builtin_callable(get_arg_types))
+
+
+INCREMENTAL_BASE_YAML = """
+params:
+  prefix: p
+a:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: a
+    value: ${params.prefix}
+b:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: b
+    value: ${a.value.value}
+c:
+  value: ${se.call:tests.test_resolvers.record_call}
+  as_container: True
+  kwargs:
+    name: c
+    value: ${oc.env:SAFE_ENV_TEST_INCREMENTAL,default}
+envs:
+  a: ${a.value.value}
+  b: ${b.value.value}
+  c: ${c.value.value}
+"""
+
+
+def test_incremental_resolution(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("SAFE_ENV_TEST_INCREMENTAL", raising=False)
+    tmp_path.joinpath("base.yaml").write_text(INCREMENTAL_BASE_YAML)
+    dev_path = tmp_path.joinpath("dev.yaml")
+    def write_dev(prefix: str):
+        dev_path.write_text(f"depends_on:\n  - base\nparams:\n  prefix: {prefix}\n")
+        # make sure modification time changes even on file systems with coarse timestamps
+        stat = dev_path.stat()
+        os.utime(dev_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    write_dev("p1")
+    envman = EnvironmentManager()
+    envman.load_from_folder(tmp_path)
+    def do_resolve(**kwargs):
+        CALLS.clear()
+        config = envman.resolve(envman.load(["dev"]), incremental=True, **kwargs)
+        return envman.get_env_variables(config), sorted(CALLS)
+
+    assert do_resolve() == ({"a": "p1", "b": "p1", "c": "default"}, ["a", "b", "c"])
+    # nothing changed
+    assert do_resolve() == ({"a": "p1", "b": "p1", "c": "default"}, [])
+    # changed input of a, b depends on a
+    write_dev("p2")
+    assert do_resolve(max_workers=4) == ({"a": "p2", "b": "p2", "c": "default"}, ["a", "b"])
+    # changed environment variable used by c
+    monkeypatch.setenv("SAFE_ENV_TEST_INCREMENTAL", "e")
+    assert do_resolve() == ({"a": "p2", "b": "p2", "c": "e"}, ["c"])
+    # values are not reused, if they must be reloaded
+    assert do_resolve(force_reload=True) == ({"a": "p2", "b": "p2", "c": "e"}, ["a", "b", "c"])
+
+
+def test_incremental_resolution_respects_cache_ttl(tmp_path):
+    tmp_path.joinpath("dev.yaml").write_text(INCREMENTAL_BASE_YAML.replace("""    name: a
+    value: ${params.prefix}
+""", """    name: a
+    value: ${params.prefix}
+  cache:
+    memory:
+      name: a
+      provider: safe_env.cache_providers.MemoryCache
+      ttl: 0.5
+      init_params:
+        kwargs:
+          namespace: test_incremental_resolution_respects_cache_ttl
+"""))
+    envman = EnvironmentManager()
+    envman.load_from_folder(tmp_path)
+    def do_resolve():
+        CALLS.clear()
+        envman.resolve(envman.load(["dev"]), incremental=True)
+        return sorted(CALLS)
+
+    assert do_resolve() == ["a", "b", "c"]
+    assert do_resolve() == []
+    # a is reloaded once its ttl has passed, b depends on a
+    time.sleep(0.6)
+    assert do_resolve() == ["a", "b"]
+    assert do_resolve() == []
+
+
+def test_incremental_activation(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from safe_env import api
+    monkeypatch.setattr(api, "INCREMENTAL_APP_CONTEXTS", dict())
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    tmp_path.joinpath("dev.yaml").write_text(INCREMENTAL_BASE_YAML)
+    for expected_calls in [["a", "b", "c"], []]:
+        CALLS.clear()
+        api.activate("dev", config_dir=tmp_path, disable_plugins=True, incremental=True)
+        assert sorted(CALLS) == expected_calls
+        assert os.environ["b"] == "p"
+
+
+def test_incremental_activation_with_plugins(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    from safe_env import api
+    from tests.test_agent import write_plugin_env
+    monkeypatch.setattr(api, "INCREMENTAL_APP_CONTEXTS", dict())
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    config_dirs = [tmp_path.joinpath("d1", "envs"), tmp_path.joinpath("d2", "envs")]
+    for index, config_dir in enumerate(config_dirs):
+        write_plugin_env(config_dir, f"v{index + 1}")
+
+    def activate(config_dir):
+        api.activate("dev", config_dir=config_dir, incremental=True)
+        return os.environ["VALUE"]
+
+    assert [activate(config_dirs[0]), activate(config_dirs[1]), activate(config_dirs[0])] == ["v1", "v2", "v1"]
+    # results of plugin callables are not reused, once plugins have changed
+    write_plugin_env(config_dirs[0], "v1-changed")
+    assert activate(config_dirs[0]) == "v1-changed"